@@ -0,0 +1,159 @@
+import java.io.BufferedInputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.io.PrintWriter;
+import java.io.StringWriter;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.util.HashSet;
+import java.util.Properties;
+import java.util.Set;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.FutureTask;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.TimeoutException;
+
+/**
+ * 批量编译 harness (由 src/compiler_harness.py 驱动)
+ *
+ * 启动一次 JVM，每个用例用新的 ClassLoader 加载 Compiler.jar 并调用 Compiler.main，
+ * 被测编译器在本进程的工作目录中读写 testfile.txt / mips.txt。
+ *
+ * 协议 (stdin/stdout, 二进制):
+ *   请求: "RUN <timeout_ms>\n"
+ *   响应: "<OK|ERROR|TIMEOUT|LEAK> <len>\n" + 编译器的 stdout/stderr
+ * LEAK 表示本次运行留下了无法清理的全局状态 (存活线程、修改的系统属性)，
+ * 此时 harness 退出，由 Python 端回退到每个用例单独启动进程的方式。
+ */
+public class CompilerHarness {
+
+    public static void main(String[] args) throws Exception {
+        URL jarUrl = new File(args[0]).toURI().toURL();
+        String mainClass = args.length > 1 ? args[1] : "Compiler";
+
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        OutputStream out = new FileOutputStream(FileDescriptor.out);
+        PrintStream realErr = System.err;
+
+        respond(out, "READY", new byte[0]);
+
+        String header;
+        while ((header = readLine(in)) != null) {
+            String[] parts = header.trim().split(" ");
+            if (parts.length == 1 && parts[0].equals("QUIT")) {
+                break;
+            }
+            if (parts.length != 2 || !parts[0].equals("RUN")) {
+                respond(out, "ERROR", ("bad request: " + header).getBytes(StandardCharsets.UTF_8));
+                continue;
+            }
+            long timeoutMs = Long.parseLong(parts[1]);
+
+            ByteArrayOutputStream buf = new ByteArrayOutputStream();
+            String status = run(jarUrl, mainClass, timeoutMs, buf);
+            System.setErr(realErr);
+            respond(out, status, buf.toByteArray());
+            if (status.equals("TIMEOUT") || status.equals("LEAK")) {
+                System.exit(3);
+            }
+        }
+        System.exit(0);
+    }
+
+    private static String run(URL jarUrl, String mainClass, long timeoutMs, ByteArrayOutputStream buf) {
+        PrintStream capture = new PrintStream(buf, true);
+        InputStream emptyIn = new ByteArrayInputStream(new byte[0]);
+        System.setIn(emptyIn);
+        System.setOut(capture);
+        System.setErr(capture);
+
+        Set<Thread> threadsBefore = new HashSet<>(Thread.getAllStackTraces().keySet());
+        Properties propsBefore = (Properties) System.getProperties().clone();
+
+        URLClassLoader loader = new URLClassLoader(new URL[]{jarUrl}, ClassLoader.getSystemClassLoader().getParent());
+        FutureTask<Void> task = new FutureTask<>(() -> {
+            Class<?> cls = Class.forName(mainClass, true, loader);
+            Method main = cls.getMethod("main", String[].class);
+            main.invoke(null, (Object) new String[0]);
+            return null;
+        });
+        Thread worker = new Thread(task, "compiler-main");
+        worker.setContextClassLoader(loader);
+        worker.start();
+
+        String status;
+        try {
+            task.get(timeoutMs, TimeUnit.MILLISECONDS);
+            joinQuietly(worker);
+            status = leaked(threadsBefore, propsBefore) ? "LEAK" : "OK";
+        } catch (TimeoutException e) {
+            status = "TIMEOUT";
+        } catch (ExecutionException e) {
+            Throwable cause = e.getCause();
+            if (cause instanceof InvocationTargetException && cause.getCause() != null) {
+                cause = cause.getCause();
+            }
+            StringWriter sw = new StringWriter();
+            cause.printStackTrace(new PrintWriter(sw));
+            capture.print(sw);
+            joinQuietly(worker);
+            status = leaked(threadsBefore, propsBefore) ? "LEAK" : "ERROR";
+        } catch (InterruptedException e) {
+            status = "LEAK";
+        } finally {
+            capture.flush();
+        }
+
+        try {
+            loader.close();
+        } catch (IOException ignored) {
+        }
+        return status;
+    }
+
+    private static void joinQuietly(Thread t) {
+        try {
+            t.join(1000);
+        } catch (InterruptedException ignored) {
+        }
+    }
+
+    /** 被测编译器是否留下了存活的线程或修改了系统属性 */
+    private static boolean leaked(Set<Thread> threadsBefore, Properties propsBefore) {
+        for (Thread t : Thread.getAllStackTraces().keySet()) {
+            if (t.isAlive() && !t.isDaemon() && !threadsBefore.contains(t)) {
+                return true;
+            }
+        }
+        return !propsBefore.equals(System.getProperties());
+    }
+
+    private static void respond(OutputStream out, String status, byte[] body) throws IOException {
+        out.write((status + " " + body.length + "\n").getBytes(StandardCharsets.US_ASCII));
+        out.write(body);
+        out.flush();
+    }
+
+    private static String readLine(DataInputStream in) throws IOException {
+        StringBuilder sb = new StringBuilder();
+        int c;
+        while ((c = in.read()) != -1) {
+            if (c == '\n') {
+                return sb.toString();
+            }
+            sb.append((char) c);
+        }
+        return sb.length() > 0 ? sb.toString() : null;
+    }
+}
@@ -0,0 +1,168 @@
+import mars.ErrorList;
+import mars.Globals;
+import mars.MIPSprogram;
+import mars.ProcessingException;
+import mars.mips.hardware.Coprocessor0;
+import mars.mips.hardware.Coprocessor1;
+import mars.mips.hardware.RegisterFile;
+import mars.util.SystemIO;
+
+import java.io.BufferedInputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.Field;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.FutureTask;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.TimeoutException;
+
+/**
+ * 常驻 Mars 模拟服务 (由 src/mars_server.py 驱动)
+ *
+ * 协议 (stdin/stdout, 二进制):
+ *   请求: "RUN <timeout_ms> <path_len> <stdin_len>\n" + path(UTF-8) + stdin
+ *   响应: "<OK|ERROR|TIMEOUT> <out_len>\n" + 程序输出
+ * 超时后模拟线程无法安全回收，服务在响应后退出，由 Python 端重启。
+ */
+public class MarsServer {
+
+    private static final PrintStream SINK = new PrintStream(new OutputStream() {
+        @Override
+        public void write(int b) {
+        }
+    });
+
+    public static void main(String[] args) throws Exception {
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        OutputStream out = new FileOutputStream(FileDescriptor.out);
+
+        System.setOut(SINK);
+        System.setErr(SINK);
+        Globals.initialize(true);
+
+        respond(out, "READY", new byte[0]);
+
+        String header;
+        while ((header = readLine(in)) != null) {
+            String[] parts = header.trim().split(" ");
+            if (parts.length == 1 && parts[0].equals("QUIT")) {
+                break;
+            }
+            if (parts.length != 4 || !parts[0].equals("RUN")) {
+                respond(out, "ERROR", ("bad request: " + header).getBytes(StandardCharsets.UTF_8));
+                continue;
+            }
+            long timeoutMs = Long.parseLong(parts[1]);
+            byte[] path = new byte[Integer.parseInt(parts[2])];
+            byte[] input = new byte[Integer.parseInt(parts[3])];
+            in.readFully(path);
+            in.readFully(input);
+
+            ByteArrayOutputStream buf = new ByteArrayOutputStream();
+            String status = run(new String(path, StandardCharsets.UTF_8), input, timeoutMs, buf);
+            respond(out, status, buf.toByteArray());
+            if (status.equals("TIMEOUT")) {
+                System.exit(3);
+            }
+        }
+        System.exit(0);
+    }
+
+    private static String run(String path, byte[] input, long timeoutMs, ByteArrayOutputStream buf) {
+        PrintStream capture = new PrintStream(buf, true);
+        System.setIn(new ByteArrayInputStream(input));
+        System.setOut(capture);
+        resetState();
+
+        FutureTask<Void> task = new FutureTask<>(() -> {
+            simulate(path);
+            return null;
+        });
+        Thread worker = new Thread(task, "mars-run");
+        worker.setDaemon(true);
+        worker.start();
+
+        try {
+            task.get(timeoutMs, TimeUnit.MILLISECONDS);
+            return "OK";
+        } catch (TimeoutException e) {
+            return "TIMEOUT";
+        } catch (ExecutionException e) {
+            Throwable cause = e.getCause();
+            if (cause instanceof ProcessingException) {
+                ProcessingException pe = (ProcessingException) cause;
+                // 与 java -jar Mars.jar nc 的输出一致 (MarsLaunch.runCommand)
+                if (pe.errors() != null) {
+                    capture.println(pe.errors().generateErrorAndWarningReport());
+                }
+                capture.println("Processing terminated due to errors.");
+                return "OK";
+            }
+            capture.print(String.valueOf(cause));
+            return "ERROR";
+        } catch (InterruptedException e) {
+            return "ERROR";
+        } finally {
+            capture.flush();
+            System.setOut(SINK);
+        }
+    }
+
+    private static void simulate(String path) throws ProcessingException {
+        MIPSprogram program = new MIPSprogram();
+        Globals.program = program;
+        ArrayList<String> files = new ArrayList<>();
+        files.add(path);
+        Globals.memory.clear();
+        ArrayList programs = program.prepareFilesForAssembly(files, path, null);
+        ErrorList warnings = program.assemble(programs, true, false);
+        if (warnings != null && warnings.warningsOccurred()) {
+            System.out.println(warnings.generateWarningReport());
+        }
+        RegisterFile.resetRegisters();
+        Coprocessor1.resetRegisters();
+        Coprocessor0.resetRegisters();
+        RegisterFile.initializeProgramCounter(false);
+        program.simulate(-1);
+    }
+
+    /** 清理上一个程序留下的 SystemIO 状态 (缓存的输入流和打开的文件) */
+    private static void resetState() {
+        try {
+            SystemIO.resetFiles();
+        } catch (Throwable ignored) {
+        }
+        try {
+            Field reader = SystemIO.class.getDeclaredField("inputReader");
+            reader.setAccessible(true);
+            reader.set(null, null);
+        } catch (Throwable ignored) {
+        }
+    }
+
+    private static void respond(OutputStream out, String status, byte[] body) throws IOException {
+        out.write((status + " " + body.length + "\n").getBytes(StandardCharsets.US_ASCII));
+        out.write(body);
+        out.flush();
+    }
+
+    private static String readLine(DataInputStream in) throws IOException {
+        StringBuilder sb = new StringBuilder();
+        int c;
+        while ((c = in.read()) != -1) {
+            if (c == '\n') {
+                return sb.toString();
+            }
+            sb.append((char) c);
+        }
+        return sb.length() > 0 ? sb.toString() : null;
+    }
+}
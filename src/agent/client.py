@@ -7,14 +7,18 @@ from typing import Callable, Optional, AsyncGenerator
 from dataclasses import dataclass
 from pathlib import Path
 
-try:
-    import httpx
-except ImportError:
-    httpx = None
-
 from .server import SysYToolServer, ToolResult
 
 
+def _load_httpx():
+    """httpx 导入较慢，只在真正发请求时加载；未安装时返回 None"""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx
+
+
 @dataclass
 class AgentConfig:
     """Agent 配置"""
@@ -141,7 +145,7 @@ class AgentClient:
             user_message: 用户消息
             on_message: 消息回调函数
         """
-        if httpx is None:
+        if _load_httpx() is None:
             on_message(Message("system", "错误: 请安装 httpx 库 (pip install httpx)"))
             return
         
@@ -247,6 +251,7 @@ class AgentClient:
             "tools": self.tool_server.get_tools_schema()
         }
         
+        httpx = _load_httpx()
         async with httpx.AsyncClient(timeout=120) as client:
             response = await client.post(url, headers=headers, json=payload)
             
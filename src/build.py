@@ -0,0 +1,752 @@
+"""
+增量构建 - 源码指纹跳过未变化的构建、按依赖只重编受影响的部分、合并并发的相同构建
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .cache import hash_parts
+
+
+# ========== 合并并发构建 ==========
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Tuple[bool, str] = (False, "")
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(key: str, build: Callable[[], Tuple[bool, str]]) -> Tuple[bool, str]:
+    """
+    同一 key 的构建同一时间只执行一次
+
+    构建进行中再次请求时等待它完成并返回同一结果 (例如 "编译" 按钮和 "运行" 同时触发)
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        owner = flight is None
+        if owner:
+            flight = _flights[key] = _Flight()
+    if not owner:
+        flight.done.wait()
+        return flight.result
+
+    try:
+        flight.result = build()
+    except Exception as e:
+        flight.result = (False, str(e))
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+    return flight.result
+
+
+# ========== 源码指纹 ==========
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_sources(root: Path, files: List[Path], previous: Dict[str, list]) -> Dict[str, list]:
+    """
+    计算源文件指纹 {相对路径: [size, mtime_ns, sha256]}
+
+    size 和 mtime 与上次相同的文件沿用上次的哈希，不重新读取
+    """
+    result = {}
+    for path in files:
+        rel = path.relative_to(root).as_posix()
+        st = path.stat()
+        old = previous.get(rel)
+        if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+            result[rel] = old
+        else:
+            result[rel] = [st.st_size, st.st_mtime_ns, sha256_file(path)]
+    return result
+
+
+def tool_identity(cmd: str) -> str:
+    """工具的路径、大小和修改时间 (不启动工具本身)"""
+    path = shutil.which(cmd) or cmd
+    try:
+        st = Path(path).resolve().stat()
+        return f"{Path(path).resolve()}:{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        return path
+
+
+def load_state(path: Path) -> dict:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path: Path, state: dict):
+    """原子写入构建状态"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def file_signature(path: Path) -> Optional[list]:
+    try:
+        st = Path(path).stat()
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        return None
+
+
+# ========== class 文件常量池 ==========
+
+_CLASS_DESCRIPTOR = re.compile(r"L([\w/$]+);")
+
+
+def read_class_file(path: Path) -> Tuple[str, Optional[str], Set[str]]:
+    """
+    解析 class 文件
+
+    Returns:
+        (本类内部名, SourceFile 属性, 常量池中引用的类内部名)
+
+    Raises:
+        ValueError: 不是合法的 class 文件
+    """
+    data = Path(path).read_bytes()
+    if data[:4] != b"\xca\xfe\xba\xbe":
+        raise ValueError(f"不是class文件: {path}")
+    pos = 8
+    (count,) = struct.unpack_from(">H", data, pos)
+    pos += 2
+
+    utf8: Dict[int, str] = {}
+    classes: Dict[int, int] = {}   # Class 常量槽位 -> 名字的 Utf8 槽位
+    i = 1
+    while i < count:
+        tag = data[pos]
+        pos += 1
+        if tag == 1:  # Utf8
+            (length,) = struct.unpack_from(">H", data, pos)
+            utf8[i] = data[pos + 2:pos + 2 + length].decode("utf-8", errors="replace")
+            pos += 2 + length
+        elif tag == 7:  # Class
+            classes[i] = struct.unpack_from(">H", data, pos)[0]
+            pos += 2
+        elif tag in (8, 16, 19, 20):  # String, MethodType, Module, Package
+            pos += 2
+        elif tag == 15:  # MethodHandle
+            pos += 3
+        elif tag in (3, 4, 9, 10, 11, 12, 17, 18):
+            pos += 4
+        elif tag in (5, 6):  # Long, Double 占两个槽位
+            pos += 8
+            i += 1
+        else:
+            raise ValueError(f"未知常量池标签 {tag}: {path}")
+        i += 1
+
+    _, this_index = struct.unpack_from(">HH", data, pos)
+    this_name = utf8.get(classes.get(this_index, 0), "")
+    pos += 6
+    (interfaces,) = struct.unpack_from(">H", data, pos)
+    pos += 2 + 2 * interfaces
+
+    def skip_members(pos: int) -> int:
+        (n,) = struct.unpack_from(">H", data, pos)
+        pos += 2
+        for _ in range(n):
+            (attrs,) = struct.unpack_from(">H", data, pos + 6)
+            pos += 8
+            for _ in range(attrs):
+                (length,) = struct.unpack_from(">I", data, pos + 2)
+                pos += 6 + length
+        return pos
+
+    pos = skip_members(pos)  # fields
+    pos = skip_members(pos)  # methods
+    source_file = None
+    (attrs,) = struct.unpack_from(">H", data, pos)
+    pos += 2
+    for _ in range(attrs):
+        name_index, length = struct.unpack_from(">HI", data, pos)
+        if utf8.get(name_index) == "SourceFile":
+            source_file = utf8.get(struct.unpack_from(">H", data, pos + 6)[0])
+        pos += 6 + length
+
+    refs: Set[str] = set()
+    for name_index in classes.values():
+        name = utf8.get(name_index, "")
+        if name.startswith("["):
+            refs.update(_CLASS_DESCRIPTOR.findall(name))
+        elif name:
+            refs.add(name)
+    # 字段/方法描述符和泛型签名中的类型
+    for text in utf8.values():
+        if "L" in text and ";" in text:
+            refs.update(_CLASS_DESCRIPTOR.findall(text))
+    refs.discard(this_name)
+    return this_name, source_file, refs
+
+
+# ========== Java 增量构建 ==========
+
+class JavaBuild:
+    """
+    Java 编译器项目的增量构建
+
+    - 源码指纹 (路径 + 内容哈希 + javac 标识) 与上次成功构建相同且 jar 未被改动时直接跳过
+    - 有变化时解析构建目录中 class 文件的常量池得到类之间的依赖，
+      只重编变化的源文件及 (传递) 依赖它们的源文件；
+      javac 会内联编译期常量，所以源码中直接提到变化类名的文件也一并重编
+    - 无法建立依赖关系或需要重编的文件过多时退回全量编译
+    """
+
+    # 需要重编的文件超过这个比例时直接全量编译
+    FULL_REBUILD_RATIO = 0.5
+
+    def __init__(self, src_dir: Path, build_dir: Path, jar_path: Path, state_path: Path,
+                 javac: str, jar_tool: str, timeout: float, main_class: str = "Compiler"):
+        self.src_dir = Path(src_dir)
+        self.build_dir = Path(build_dir)
+        self.jar_path = Path(jar_path)
+        self.state_path = Path(state_path)
+        self.javac = javac
+        self.jar_tool = jar_tool
+        self.timeout = timeout
+        self.main_class = main_class
+
+    def build(self) -> Tuple[bool, str]:
+        """构建 jar，返回 (是否成功, 信息)"""
+        try:
+            return self._build()
+        except subprocess.TimeoutExpired:
+            return False, "编译超时"
+        except FileNotFoundError as e:
+            return False, f"找不到命令: {e.filename}，请确保已安装JDK并配置PATH或在config.yaml中指定路径"
+        except Exception as e:
+            return False, str(e)
+
+    def _build(self) -> Tuple[bool, str]:
+        java_files = sorted(self.src_dir.rglob("*.java"))
+        if not java_files:
+            return False, "找不到Java源文件"
+
+        state = load_state(self.state_path)
+        javac_id = tool_identity(self.javac)
+        files = scan_sources(self.src_dir, java_files, state.get("files", {}))
+        fingerprint = hash_parts(javac_id, *(f"{rel}:{entry[2]}" for rel, entry in sorted(files.items())))
+        total = len(java_files)
+
+        if (state.get("fingerprint") == fingerprint and self.build_dir.exists()
+                and file_signature(self.jar_path) == state.get("jar")):
+            if files != state.get("files"):
+                # 只是 mtime 变了，记下来下次不必重新哈希
+                state["files"] = files
+                save_state(self.state_path, state)
+            return True, f"[Java] 源码未变化，跳过编译 ({total} 个文件)"
+
+        plan = None
+        if state.get("javac") == javac_id and state.get("files") and self.build_dir.exists():
+            plan = self._plan_incremental(state["files"], files)
+
+        if plan is None or len(plan[0]) > total * self.FULL_REBUILD_RATIO:
+            ok, msg = self._compile_full(java_files)
+            desc = f"[Java] 成功编译 {total} 个文件 -> {self.jar_path.name}"
+        else:
+            dirty, stale_classes = plan
+            ok, msg = self._compile_subset(sorted(dirty), stale_classes)
+            desc = f"[Java] 增量编译 {len(dirty)}/{total} 个文件 -> {self.jar_path.name}"
+
+        if ok:
+            ok, msg = self._package()
+        if not ok:
+            # 构建目录可能处于半更新状态，下次全量编译
+            try:
+                self.state_path.unlink()
+            except OSError:
+                pass
+            return False, msg
+
+        save_state(self.state_path, {
+            "fingerprint": fingerprint,
+            "javac": javac_id,
+            "files": files,
+            "jar": file_signature(self.jar_path),
+        })
+        return True, desc
+
+    def _class_index(self, sources: Set[str]) -> Optional[Tuple[Dict[str, List[Path]], Dict[str, Set[str]]]]:
+        """
+        由构建目录中的 class 文件建立 源文件 -> class 文件、源文件 -> 依赖的源文件
+
+        class 文件无法对应到源文件时返回 None
+        """
+        by_location = {}
+        by_name: Dict[str, List[str]] = {}
+        for rel in sources:
+            parent, _, name = rel.rpartition("/")
+            by_location[(parent, name)] = rel
+            by_name.setdefault(name, []).append(rel)
+
+        class_source: Dict[str, str] = {}
+        class_refs: Dict[str, Set[str]] = {}
+        source_classes: Dict[str, List[Path]] = {}
+        for class_file in self.build_dir.rglob("*.class"):
+            try:
+                this_name, source_file, refs = read_class_file(class_file)
+            except (ValueError, struct.error, IndexError, OSError):
+                return None
+            if not this_name or not source_file:
+                return None
+            package = this_name.rpartition("/")[0]
+            rel = by_location.get((package, source_file))
+            if rel is None:
+                # 目录结构与包名不一致时按唯一的文件名匹配
+                candidates = by_name.get(source_file, [])
+                if len(candidates) != 1:
+                    return None
+                rel = candidates[0]
+            class_source[this_name] = rel
+            class_refs[this_name] = refs
+            source_classes.setdefault(rel, []).append(class_file)
+
+        deps: Dict[str, Set[str]] = {}
+        for this_name, refs in class_refs.items():
+            rel = class_source[this_name]
+            for ref in refs:
+                target = class_source.get(ref)
+                if target is not None and target != rel:
+                    deps.setdefault(rel, set()).add(target)
+        return source_classes, deps
+
+    def _plan_incremental(self, old: Dict[str, list], new: Dict[str, list]) -> Optional[Tuple[Set[str], List[Path]]]:
+        """
+        Returns:
+            (需要重编的源文件, 需要删除的旧 class 文件)；无法增量时返回 None
+        """
+        changed = {rel for rel, entry in new.items() if rel not in old or old[rel][2] != entry[2]}
+        removed = set(old) - set(new)
+        if not changed and not removed:
+            return set(), []
+
+        index = self._class_index(set(new) | removed)
+        if index is None:
+            return None
+        source_classes, deps = index
+
+        dependents: Dict[str, Set[str]] = {}
+        for rel, targets in deps.items():
+            for target in targets:
+                dependents.setdefault(target, set()).add(rel)
+
+        # 编译期常量会被内联，常量池中看不到引用；按类名在源码中查找补上
+        names = {Path(rel).stem for rel in changed | removed}
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(n) for n in sorted(names)) + r")\b")
+        mentioned = set()
+        for rel in new:
+            if rel in changed:
+                continue
+            try:
+                text = (self.src_dir / rel).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                return None
+            if pattern.search(text):
+                mentioned.add(rel)
+
+        dirty = set(changed) | mentioned
+        queue = list(changed | removed | mentioned)
+        while queue:
+            rel = queue.pop()
+            for dependent in dependents.get(rel, ()):
+                if dependent in new and dependent not in dirty:
+                    dirty.add(dependent)
+                    queue.append(dependent)
+
+        stale = [c for rel in dirty | removed for c in source_classes.get(rel, [])]
+        return dirty, stale
+
+    def _javac(self, sources: List[Path], extra: List[str]) -> Tuple[bool, str]:
+        cmd = [self.javac, "-encoding", "UTF-8", "-d", str(self.build_dir)] + extra + [str(f) for f in sources]
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, errors="replace", timeout=self.timeout
+        )
+        if result.returncode != 0:
+            return False, f"编译失败:\n{result.stderr}"
+        return True, ""
+
+    def _compile_full(self, java_files: List[Path]) -> Tuple[bool, str]:
+        # 清空构建目录，避免已删除源文件的 class 残留在 jar 中
+        if self.build_dir.exists():
+            shutil.rmtree(self.build_dir)
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        return self._javac(java_files, [])
+
+    def _compile_subset(self, dirty: List[str], stale_classes: List[Path]) -> Tuple[bool, str]:
+        for class_file in stale_classes:
+            try:
+                class_file.unlink()
+            except OSError:
+                pass
+        if not dirty:
+            return True, ""
+        return self._javac(
+            [self.src_dir / rel for rel in dirty],
+            ["-cp", str(self.build_dir), "-sourcepath", str(self.src_dir)]
+        )
+
+    def _package(self) -> Tuple[bool, str]:
+        manifest_path = self.build_dir / "MANIFEST.MF"
+        manifest_path.write_text(f"Main-Class: {self.main_class}\n", encoding="utf-8")
+        jar_cmd = [self.jar_tool, "cfm", str(self.jar_path), str(manifest_path), "-C", str(self.build_dir), "."]
+        result = subprocess.run(jar_cmd, capture_output=True, text=True, errors="replace", timeout=30)
+        if result.returncode != 0:
+            return False, f"打包jar失败:\n{result.stderr}"
+        return True, ""
+
+
+# ========== C/C++ 逐文件增量构建 ==========
+
+def parse_depfile(text: str) -> List[str]:
+    """解析 gcc -MMD 生成的依赖文件，返回依赖的文件列表 (第一个是源文件本身)"""
+    text = text.replace("\\\r\n", " ").replace("\\\n", " ")
+    deps: List[str] = []
+    for line in text.splitlines():
+        # 只取第一条规则；-MP 生成的空规则等其余行忽略
+        _, sep, rest = line.partition(": ")
+        if not sep:
+            continue
+        for token in re.split(r"(?<!\\)\s+", rest.strip()):
+            if token:
+                deps.append(token.replace("\\ ", " ").replace("$$", "$"))
+        break
+    return deps
+
+
+class CxxBuild:
+    """
+    不使用 CMake 时的 C/C++ 增量构建
+
+    每个源文件单独编译为目标文件 (线程池中并行调用 g++)，用 -MMD 记录包含的头文件；
+    源文件和它包含的头文件都没变、编译参数也没变时沿用已有目标文件。
+    只有目标文件有变化或可执行文件缺失时才重新链接。
+    """
+
+    def __init__(self, src_dir: Path, obj_dir: Path, exe_path: Path, state_path: Path,
+                 compiler: str, flags: List[str], timeout: float, jobs: int = 0):
+        self.src_dir = Path(src_dir)
+        self.obj_dir = Path(obj_dir)
+        self.exe_path = Path(exe_path)
+        self.state_path = Path(state_path)
+        self.compiler = compiler
+        self.flags = list(flags)
+        self.timeout = timeout
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+
+    def build(self, sources: List[Path], label: str) -> Tuple[bool, str]:
+        """构建可执行文件，返回 (是否成功, 信息)"""
+        try:
+            return self._build(sources, label)
+        except subprocess.TimeoutExpired:
+            return False, "编译超时"
+        except FileNotFoundError as e:
+            return False, f"找不到命令: {e.filename}，请确保已安装GCC并配置PATH或在config.yaml中指定路径"
+        except Exception as e:
+            return False, str(e)
+
+    def _object_path(self, rel: str) -> Path:
+        return self.obj_dir / f"{rel}.o"
+
+    @staticmethod
+    def _up_to_date(entry: Optional[dict], obj: Path) -> bool:
+        if not entry or file_signature(obj) != entry.get("obj"):
+            return False
+        return all(file_signature(Path(dep)) == sig for dep, sig in entry.get("deps", {}).items())
+
+    def _compile_one(self, source: Path, obj: Path) -> Tuple[bool, str, Optional[dict]]:
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        depfile = obj.with_suffix(".d")
+        source = source.resolve()
+        cmd = [self.compiler] + self.flags + ["-c", str(source), "-o", str(obj), "-MMD", "-MF", str(depfile)]
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, errors="replace", timeout=self.timeout
+        )
+        if result.returncode != 0:
+            return False, result.stderr, None
+        try:
+            deps = parse_depfile(depfile.read_text(encoding="utf-8", errors="replace"))
+        except OSError:
+            deps = []
+        if not deps:
+            deps = [str(source)]
+        # 依赖文件中的相对路径相对于 g++ 的工作目录 (即当前目录)
+        deps = {os.path.abspath(dep) for dep in deps}
+        entry = {
+            "obj": file_signature(obj),
+            "deps": {dep: file_signature(Path(dep)) for dep in sorted(deps)},
+        }
+        return True, result.stderr, entry
+
+    def _build(self, sources: List[Path], label: str) -> Tuple[bool, str]:
+        state = load_state(self.state_path)
+        config_key = hash_parts(tool_identity(self.compiler), *self.flags)
+        previous = state.get("objects", {}) if state.get("config") == config_key else {}
+
+        units = {path.relative_to(self.src_dir).as_posix(): path for path in sources}
+        objects: Dict[str, dict] = {}
+        stale = []
+        for rel in sorted(units):
+            entry = previous.get(rel)
+            if self._up_to_date(entry, self._object_path(rel)):
+                objects[rel] = entry
+            else:
+                stale.append(rel)
+
+        # 删除已不存在的源文件留下的目标文件
+        for rel in set(state.get("objects", {})) - set(units):
+            for path in (self._object_path(rel), self._object_path(rel).with_suffix(".d")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+        errors = []
+        if stale:
+            # g++ 在子进程中运行，线程池足以并行
+            with ThreadPoolExecutor(max_workers=min(self.jobs, len(stale))) as pool:
+                futures = {
+                    rel: pool.submit(self._compile_one, units[rel], self._object_path(rel))
+                    for rel in stale
+                }
+                for rel, future in futures.items():
+                    ok, stderr, entry = future.result()
+                    if ok:
+                        objects[rel] = entry
+                    else:
+                        errors.append(stderr)
+
+        link_key = hash_parts(config_key, *(f"{rel}:{objects[rel]['obj']}" for rel in sorted(objects)))
+        state = {"config": config_key, "objects": objects, "link": state.get("link"), "exe": state.get("exe")}
+        if errors:
+            # 编译成功的目标文件仍然记录下来，修复后只需重编失败的部分
+            save_state(self.state_path, state)
+            return False, "编译失败:\n" + "\n".join(errors)
+
+        total = len(units)
+        if state["link"] == link_key and file_signature(self.exe_path) == state["exe"]:
+            return True, f"[{label}] 源码未变化，跳过编译 ({total} 个文件)"
+
+        cmd = [self.compiler] + self.flags + ["-o", str(self.exe_path)]
+        cmd += [str(self._object_path(rel)) for rel in sorted(objects)]
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, errors="replace", timeout=self.timeout
+        )
+        if result.returncode != 0:
+            state["link"] = state["exe"] = None
+            save_state(self.state_path, state)
+            return False, f"链接失败:\n{result.stderr}"
+
+        state["link"] = link_key
+        state["exe"] = file_signature(self.exe_path)
+        save_state(self.state_path, state)
+        if not stale:
+            return True, f"[{label}] 源码未变化，重新链接 -> {self.exe_path.name}"
+        if len(stale) == total:
+            return True, f"[{label}] 成功编译 {total} 个文件 -> {self.exe_path.name}"
+        return True, f"[{label}] 重新编译 {len(stale)}/{total} 个文件 -> {self.exe_path.name}"
+
+
+# ========== CMake ==========
+
+CMAKE_SOURCE_SUFFIXES = (".c", ".cc", ".cpp", ".cxx", ".h", ".hh", ".hpp", ".hxx", ".inc", ".ipp", ".cmake")
+
+
+def collect_cmake_sources(root: Path) -> List[Path]:
+    """
+    CMake 项目中影响构建结果的文件 (源码、头文件、CMakeLists.txt、*.cmake)
+
+    跳过隐藏目录和项目内的构建目录 (含 CMakeCache.txt 或名为 cmake-build-*)
+    """
+    result = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not d.startswith(".") and not d.startswith("cmake-build-")
+            and not os.path.exists(os.path.join(dirpath, d, "CMakeCache.txt"))
+        )
+        for name in sorted(filenames):
+            if name == "CMakeLists.txt" or name.lower().endswith(CMAKE_SOURCE_SUFFIXES):
+                result.append(Path(dirpath) / name)
+    return result
+
+
+def cmake_file_api_query(build_dir: Path):
+    """登记 codemodel 查询，cmake 配置时在 .cmake/api/v1/reply 下生成目标信息"""
+    query = Path(build_dir) / ".cmake" / "api" / "v1" / "query" / "codemodel-v2"
+    if not query.exists():
+        query.parent.mkdir(parents=True, exist_ok=True)
+        query.touch()
+
+
+def cmake_executables(build_dir: Path, config: str = "Release") -> Optional[List[Path]]:
+    """
+    从 CMake file API 的回复中读取可执行目标的产物路径
+
+    没有回复 (cmake 早于 3.14 或尚未重新配置) 时返回 None
+    """
+    reply = Path(build_dir) / ".cmake" / "api" / "v1" / "reply"
+    try:
+        indexes = sorted(reply.glob("index-*.json"))
+        if not indexes:
+            return None
+        index = json.loads(indexes[-1].read_text(encoding="utf-8"))
+        codemodel_file = next(
+            obj["jsonFile"] for obj in index.get("objects", []) if obj.get("kind") == "codemodel"
+        )
+        codemodel = json.loads((reply / codemodel_file).read_text(encoding="utf-8"))
+        build_top = Path(codemodel.get("paths", {}).get("build", build_dir))
+        configurations = codemodel.get("configurations", [])
+        if not configurations:
+            return None
+        chosen = next((c for c in configurations if c.get("name") == config), configurations[0])
+
+        result = []
+        for target_ref in chosen.get("targets", []):
+            target = json.loads((reply / target_ref["jsonFile"]).read_text(encoding="utf-8"))
+            if target.get("type") != "EXECUTABLE":
+                continue
+            for artifact in target.get("artifacts", []):
+                path = Path(artifact["path"])
+                result.append(path if path.is_absolute() else build_top / path)
+        return result
+    except (OSError, ValueError, KeyError, StopIteration):
+        return None
+
+
+def scan_executables(build_dir: Path) -> List[Path]:
+    """没有 file API 时遍历构建目录查找可执行文件"""
+    result = []
+    for dirpath, dirnames, filenames in os.walk(build_dir):
+        dirnames[:] = [d for d in dirnames if d != "CMakeFiles" and not d.startswith(".")]
+        for name in filenames:
+            path = Path(dirpath) / name
+            if os.name == "nt":
+                if name.lower().endswith(".exe"):
+                    result.append(path)
+            elif "." not in name or name.endswith((".exe", ".out")):
+                if os.access(path, os.X_OK) and path.is_file():
+                    result.append(path)
+    return result
+
+
+def choose_executable(candidates: List[Path]) -> Optional[Path]:
+    """优先名为 Compiler 的目标，其次唯一的一个，否则取最新生成的"""
+    existing = [p for p in candidates if p.is_file()]
+    if not existing:
+        return None
+    preferred = [p for p in existing if p.name.lower() in ("compiler.exe", "compiler")]
+    if preferred:
+        return preferred[0]
+    if len(existing) == 1:
+        return existing[0]
+    return max(existing, key=lambda p: p.stat().st_mtime)
+
+
+def sync_artifact(source: Path, target: Path, recorded: Optional[dict]) -> Tuple[bool, dict]:
+    """
+    把构建产物复制到 target，内容未变时不复制 (保持 target 的修改时间，下游缓存不失效)
+
+    Returns:
+        (是否复制, 新的记录 {"sha256", "target"})
+    """
+    sha = sha256_file(source)
+    if recorded and recorded.get("sha256") == sha and file_signature(target) == recorded.get("target"):
+        return False, recorded
+    shutil.copy2(source, target)
+    return True, {"sha256": sha, "target": file_signature(target)}
+
+
+def find_cmake_executable(cmake: str, source_dir: Path, build_dir: Path, timeout: float, env=None) -> Optional[Path]:
+    """
+    确定 CMake 构建出的被测编译器可执行文件
+
+    优先使用 file API；构建目录是在登记查询之前配置的则重新配置一次，仍没有回复时才遍历构建目录
+    """
+    exes = cmake_executables(build_dir)
+    if exes is None:
+        subprocess.run(
+            [cmake, "-S", str(source_dir), "-B", str(build_dir)],
+            capture_output=True, text=True, encoding="utf-8", errors="replace",
+            timeout=timeout, env=env
+        )
+        exes = cmake_executables(build_dir)
+    if exes is None:
+        exes = scan_executables(build_dir)
+    return choose_executable(exes)
+
+
+class CMakeBuildState:
+    """
+    CMake 构建的源码指纹和产物记录
+
+    指纹覆盖项目中的源码、头文件、CMakeLists.txt 以及传入的工具标识
+    """
+
+    def __init__(self, state_path: Path, source_root: Path, *inputs: str):
+        self.path = Path(state_path)
+        self._state = load_state(self.path)
+        self.files = scan_sources(source_root, collect_cmake_sources(source_root), self._state.get("files", {}))
+        self.fingerprint = hash_parts(*inputs, *(f"{rel}:{entry[2]}" for rel, entry in sorted(self.files.items())))
+
+    def cached_artifact(self, target: Path) -> Optional[Path]:
+        """指纹未变、产物和复制出的文件都没被改动时返回产物路径，否则返回 None"""
+        state = self._state
+        if state.get("fingerprint") != self.fingerprint or not state.get("artifact"):
+            return None
+        artifact = Path(state["artifact"])
+        if file_signature(artifact) != state.get("artifact_sig"):
+            return None
+        if file_signature(target) != (state.get("copy") or {}).get("target"):
+            return None
+        return artifact
+
+    def record(self, artifact: Path, target: Path) -> bool:
+        """把产物同步到 target 并保存记录，返回是否实际复制"""
+        copied, copy_record = sync_artifact(artifact, target, self._state.get("copy"))
+        self._state = {
+            "fingerprint": self.fingerprint,
+            "files": self.files,
+            "artifact": str(artifact),
+            "artifact_sig": file_signature(artifact),
+            "copy": copy_record,
+        }
+        save_state(self.path, self._state)
+        return copied
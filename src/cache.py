@@ -0,0 +1,130 @@
+"""
+磁盘缓存模块 - 内容寻址的结果缓存
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+def hash_parts(*parts) -> str:
+    """对多个部分计算组合哈希 (各部分带长度前缀，避免拼接歧义)"""
+    h = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(str(len(part)).encode("ascii") + b":")
+        h.update(part)
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    内容寻址磁盘缓存
+
+    - 每个条目是 root/<前2位>/<key>.json
+    - 写入先落到临时文件再 os.replace，多线程/多进程并发写安全
+    - 命中时刷新 mtime，超出大小预算时按 mtime 淘汰最旧条目
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        """读取条目，不存在或损坏时返回None"""
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, value: dict):
+        """写入条目 (原子替换)"""
+        if self.max_bytes <= 0:
+            return
+        path = self._path(key)
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if len(payload) > self.max_bytes:
+            return
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_name, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            return
+
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_size()
+            else:
+                self._total += len(payload)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def stats(self) -> Tuple[int, int]:
+        """返回 (命中数, 未命中数)"""
+        with self._lock:
+            return self.hits, self.misses
+
+    def _entries(self):
+        if not self.root.exists():
+            return []
+        entries = []
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """按 mtime 从旧到新删除，直到降到预算的 80% (调用方持锁)"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.8
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._total = total
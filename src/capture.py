@@ -0,0 +1,313 @@
+"""
+有界的输出收集 - Mars / g++ 的 stdout 边读边计算摘要，超出内存上限后写入磁盘，超出总上限后截断
+"""
+import hashlib
+import os
+import tempfile
+import time
+import weakref
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+
+SPILL_PREFIX = "spill-"
+
+
+class LineSplitter:
+    """
+    把分块到达的输出切成标准化后的行 (规则同 normalize_output: \\r\\n、\\r 视为换行，去掉行尾空白，忽略末尾空行)
+
+    空行要等到后面出现非空内容才能确定不在末尾，在此之前只计数。
+    """
+
+    def __init__(self):
+        self.tail = ""           # 尚未读到换行的部分
+        self.blanks = 0          # 尚未确定是否在末尾的空行数
+        self._after_cr = False   # 上一块以 \r 结尾，下一块开头的 \n 属于同一个换行
+
+    def feed(self, chunk: str) -> Tuple[int, List[str]]:
+        """
+        Returns:
+            (lines 之前要先补上的空行数, 本块中已确定的行)
+        """
+        if self._after_cr and chunk.startswith("\n"):
+            chunk = chunk[1:]
+        self._after_cr = chunk.endswith("\r")
+        parts = (self.tail + chunk).replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self.tail = parts.pop()
+        lines = [part.rstrip() for part in parts]
+        end = len(lines)
+        while end and not lines[end - 1]:
+            end -= 1
+        if not end:
+            self.blanks += len(lines)
+            return 0, []
+        carried = self.blanks
+        self.blanks = len(lines) - end
+        del lines[end:]
+        return carried, lines
+
+    def settle(self) -> int:
+        """尚未换行的部分已有非空白内容时，之前暂缓的空行确定不在末尾: 返回其数量并清零"""
+        if self.blanks and self.tail.strip():
+            carried, self.blanks = self.blanks, 0
+            return carried
+        return 0
+
+    def finish(self) -> Tuple[int, List[str]]:
+        """输出结束: 返回最后一行 (末尾的空行丢弃)"""
+        carried = self.settle()
+        last = self.tail.rstrip()
+        self.tail = ""
+        self.blanks = 0
+        return (carried, [last]) if last else (0, [])
+
+
+class OutputCapture:
+    """
+    有界的输出收集器
+
+    - 不超过 MEMORY_CHARS 时整段保存在内存中；超出后全部内容写入 spill_dir 下的临时文件，
+      内存中只保留开头和结尾各 EXCERPT_CHARS 个字符 (没有 spill_dir 时丢弃中间部分)
+    - 总量超过 limit 个字符后不再收集，write 返回 False，调用方应结束程序
+    - 边收集边计算标准化输出的 SHA-256，与 text_digest(normalize_output(全部输出)) 相同
+
+    临时文件在 keep() 之前随对象回收或 discard() 删除。
+    """
+
+    MEMORY_CHARS = 1 << 20
+    EXCERPT_CHARS = 2000
+    READ_CHARS = 1 << 16
+
+    def __init__(self, limit: int = 0, spill_dir: Optional[Path] = None):
+        self.limit = limit              # 0 表示不限制
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.size = 0                   # 已收集的字符数
+        self.truncated = False          # 超出 limit 被截断
+        self.elided = False             # 中间部分已丢弃 (没有可用的 spill 文件)
+        self.path: Optional[Path] = None
+        self._parts: List[str] = []
+        self._head = ""
+        self._tail = ""
+        self._file = None
+        self._finalizer = None
+        # 摘要: 行尾空白和换行先暂存，遇到非空白字符时再按规则写入
+        self._hash = hashlib.sha256()
+        self._held = ""
+        self._after_cr = False
+        self._digest: Optional[str] = None
+
+    @classmethod
+    def from_text(cls, text: str) -> "OutputCapture":
+        capture = cls()
+        capture.write(text)
+        capture.close()
+        return capture
+
+    # ---------- 收集 ----------
+
+    def write(self, text: str) -> bool:
+        """追加输出，超出 limit 时截断并返回 False"""
+        if self.truncated:
+            return False
+        if self.limit and self.size + len(text) > self.limit:
+            text = text[:self.limit - self.size]
+            self.truncated = True
+        if text:
+            self.size += len(text)
+            self._store(text)
+            self._update_digest(text)
+        return not self.truncated
+
+    def close(self):
+        """输出结束 (可重复调用)"""
+        if self._digest is None:
+            self._digest = self._hash.hexdigest()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _store(self, text: str):
+        if self._file is not None:
+            try:
+                self._file.write(text)
+            except OSError:
+                self._drop_file()
+            self._tail = (self._tail + text)[-self.EXCERPT_CHARS:]
+            return
+        if self.elided:
+            self._tail = (self._tail + text)[-self.EXCERPT_CHARS:]
+            return
+        self._parts.append(text)
+        if self.size > self.MEMORY_CHARS:
+            self._spill()
+
+    def _spill(self):
+        """内存中的部分超出上限: 转存到临时文件，只留开头和结尾"""
+        text = "".join(self._parts)
+        self._parts = []
+        self._head = text[:self.EXCERPT_CHARS]
+        self._tail = text[-self.EXCERPT_CHARS:]
+        if self.spill_dir is not None:
+            try:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                fd, name = tempfile.mkstemp(prefix=SPILL_PREFIX, suffix=".txt", dir=str(self.spill_dir))
+                self.path = Path(name)
+                self._finalizer = weakref.finalize(self, _remove_file, name)
+                self._file = os.fdopen(fd, "w", encoding="utf-8", errors="replace", newline="")
+                self._file.write(text)
+                return
+            except OSError:
+                self._drop_file()
+        self.elided = True
+
+    def _drop_file(self):
+        """临时文件写入失败: 改为只保留开头和结尾"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        self.discard()
+        self.elided = True
+
+    def _update_digest(self, text: str):
+        if self._after_cr and text.startswith("\n"):
+            text = text[1:]
+        self._after_cr = text.endswith("\r")
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        end = len(text.rstrip())
+        if not end:
+            self._held += text
+            return
+        # held 以非空白字符之后开始、body 以非空白字符结束: 只有中间各行的行尾空白需要去掉
+        body = self._held + text[:end]
+        self._held = text[end:]
+        if "\n" in body:
+            body = "\n".join([line.rstrip() for line in body.split("\n")[:-1]] + [body[body.rfind("\n") + 1:]])
+        self._hash.update(body.encode("utf-8", errors="replace"))
+
+    # ---------- 查询 ----------
+
+    @property
+    def digest(self) -> str:
+        """标准化输出的 SHA-256 (需先 close)"""
+        if self._digest is None:
+            self.close()
+        return self._digest
+
+    @property
+    def complete(self) -> bool:
+        """能否读到收集到的全部内容 (内存中或 spill 文件中)"""
+        return not self.elided
+
+    def text(self) -> Optional[str]:
+        """全部内容都在内存中时返回全文，否则返回 None"""
+        if self.path is not None or self.elided:
+            return None
+        return "".join(self._parts)
+
+    def excerpt(self) -> str:
+        """有界的展示文本: 内容较少时为全文，否则为开头和结尾 (中间用标记说明)"""
+        text = self.text()
+        if text is None:
+            omitted = self.size - len(self._head) - len(self._tail)
+            where = f"，完整输出见 {self.path}" if self.path is not None else ""
+            text = f"{self._head}\n... (省略 {omitted} 个字符{where}) ...\n{self._tail}"
+        if self.truncated:
+            text += f"\n... (输出超过 {self.limit} 个字符，已截断)"
+        return text
+
+    def iter_lines(self) -> Iterator[str]:
+        """逐行读出标准化后的全部内容 (内容在 spill 文件中时边读边产出)"""
+        text = self.text()
+        if text is not None:
+            splitter = LineSplitter()
+            yield from _expand(*splitter.feed(text))
+            yield from _expand(*splitter.finish())
+            return
+        if self.path is None:
+            return
+        self.close()
+        splitter = LineSplitter()
+        with open(self.path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            while True:
+                chunk = f.read(self.READ_CHARS)
+                if not chunk:
+                    break
+                yield from _expand(*splitter.feed(chunk))
+        yield from _expand(*splitter.finish())
+
+    # ---------- spill 文件 ----------
+
+    def keep(self) -> Optional[str]:
+        """
+        保留 spill 文件 (失败用例供 GUI 按需读取)，按内容摘要重命名
+
+        Returns:
+            文件路径，内容都在内存中时返回 None
+        """
+        if self.path is None:
+            return None
+        self.close()
+        if self._finalizer is None:
+            return str(self.path)
+        target = self.path.with_name(f"{self.digest[:16]}.txt")
+        try:
+            os.replace(self.path, target)
+        except OSError:
+            return None
+        self._finalizer.detach()
+        self._finalizer = None
+        self.path = target
+        return str(target)
+
+    def discard(self):
+        """删除尚未 keep 的 spill 文件"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self.path = None
+
+
+def _expand(carried: int, lines: List[str]) -> Iterator[str]:
+    for _ in range(carried):
+        yield ""
+    yield from lines
+
+
+def _remove_file(name: str):
+    try:
+        os.unlink(name)
+    except OSError:
+        pass
+
+
+def prune_outputs(directory: Path, keep: int = 100, max_age: float = 86400):
+    """只保留最近的 keep 个失败用例输出文件，并清理遗留超过 max_age 秒的临时文件"""
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.is_file()]
+    except OSError:
+        return
+    now = time.time()
+    kept = []
+    for entry in entries:
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue
+        if entry.name.startswith(SPILL_PREFIX):
+            if now - mtime > max_age:
+                _remove_file(entry.path)
+        else:
+            kept.append((mtime, entry.path))
+    kept.sort(reverse=True)
+    for _, path in kept[keep:]:
+        _remove_file(path)
@@ -1,10 +1,18 @@
 """
 命令行接口模块
+
+    python main.py                 启动 GUI
+    python main.py run [选项]      无界面运行测试 (每个结果输出一行 JSON，结束时写 JUnit XML)
 """
+import argparse
+import json
 import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from fnmatch import fnmatch
 from pathlib import Path
-
-from .gui import run_gui
+from typing import Dict, List, Optional, Sequence, Tuple
 
 
 LOGO = r"""
@@ -25,9 +33,241 @@ LOGO = r"""
     ╚════════════════════════════════════════════════╝
 """
 
+# 退出码
+EXIT_OK = 0
+EXIT_FAILED = 1   # 有用例未通过
+EXIT_ERROR = 2    # 参数错误、没有匹配的用例或编译项目失败
+EXIT_INCOMPLETE = 3   # 运行过的用例都通过，但被 --time-budget 等提前停止，有用例未运行
+EXIT_INTERRUPTED = 130
+
+# 框架根目录 (testfiles/、config.yaml、.tmp/ 所在目录)
+TEST_DIR = Path(__file__).parent.parent.resolve()
+
+
+def _log(msg: str):
+    """进度信息写到 stderr，stdout 只输出 JSON"""
+    print(msg, file=sys.stderr, flush=True)
+
+
+def select_cases(testfiles_dir: Path, lib_globs: Sequence[str], case_globs: Sequence[str]):
+    """
+    按测试库和用例的通配符筛选用例
+
+    Args:
+        lib_globs: 匹配测试库相对 testfiles 的路径 (如 "2025*"、"*/A")，为空则全部
+        case_globs: 匹配用例文件名、去掉扩展名的文件名或 "测试库/文件名"，为空则全部
+
+    Returns:
+        [(测试库名, 用例), ...]
+    """
+    from .discovery import CorpusIndex
+
+    corpus = CorpusIndex.for_root(testfiles_dir, TEST_DIR / ".tmp")
+    corpus.refresh()
+    selected = []
+    for lib_name, _ in corpus.libs():
+        if lib_globs and not any(fnmatch(lib_name, g) for g in lib_globs):
+            continue
+        for case in corpus.cases(lib_name):
+            names = (case.name, case.testfile.stem, f"{lib_name}/{case.name}")
+            if case_globs and not any(fnmatch(n, g) for g in case_globs for n in names):
+                continue
+            selected.append((lib_name, case))
+    return selected
+
+
+def write_junit(path: Path, cases: List[Tuple[str, object]], results: Dict[int, object],
+                elapsed: float, not_run_reason: str):
+    """写 JUnit XML，每个测试库一个 testsuite；未运行的用例记为 skipped"""
+    from .models import TestStatus
+
+    root = ET.Element("testsuites", name="sysytest", time=f"{elapsed:.3f}")
+    suites: Dict[str, ET.Element] = {}
+    counts: Dict[str, Dict[str, int]] = {}
+    for lib_name, case in cases:
+        suite = suites.get(lib_name)
+        if suite is None:
+            suite = suites[lib_name] = ET.SubElement(root, "testsuite", name=lib_name)
+            counts[lib_name] = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+        count = counts[lib_name]
+        count["tests"] += 1
+        element = ET.SubElement(suite, "testcase", classname=lib_name, name=case.name)
+        result = results.get(id(case))
+        if result is None:
+            count["skipped"] += 1
+            ET.SubElement(element, "skipped", message=not_run_reason)
+        elif result.status == TestStatus.SKIPPED:
+            count["skipped"] += 1
+            ET.SubElement(element, "skipped", message=result.message)
+        elif result.status == TestStatus.FAILED:
+            count["failures"] += 1
+            failure = ET.SubElement(element, "failure", type=result.status.name, message=result.status.value)
+            failure.text = result.message
+        elif not result.passed:
+            count["errors"] += 1
+            error = ET.SubElement(element, "error", type=result.status.name, message=result.status.value)
+            error.text = result.message
+    for lib_name, suite in suites.items():
+        for key, value in counts[lib_name].items():
+            suite.set(key, str(value))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ET.ElementTree(root).write(str(path), encoding="utf-8", xml_declaration=True)
+
+
+def run_headless(args: argparse.Namespace) -> int:
+    """无界面运行测试，返回退出码"""
+    # 框架内部的 print 提示转到 stderr，stdout 只留给 JSON 行
+    out, sys.stdout = sys.stdout, sys.stderr
+    try:
+        return _run_headless(args, out)
+    finally:
+        sys.stdout = out
+
+
+def _run_headless(args: argparse.Namespace, out) -> int:
+    from .config import get_config
+    from .models import TestResult, TestStatus
+    from .tester import CompilerTester, CancelToken
+
+    config = get_config()
+    testfiles_dir = Path(args.testfiles).resolve() if args.testfiles else TEST_DIR / "testfiles"
+    project_dir = Path(args.project).resolve() if args.project else (TEST_DIR / config.compiler_project_dir).resolve()
+    workers = args.workers or config.parallel.max_workers
+
+    cases = select_cases(testfiles_dir, args.lib, args.case)
+    if not cases:
+        _log(f"没有匹配的测试用例: {testfiles_dir}")
+        return EXIT_ERROR
+
+    tester = CompilerTester(project_dir, TEST_DIR)
+    if args.last_failed:
+        failed = {id(case) for case in tester.failed_last_time([case for _, case in cases])}
+        if failed:
+            cases = [(lib_name, case) for lib_name, case in cases if id(case) in failed]
+            _log("只运行上次未通过的用例")
+        else:
+            _log("没有上次未通过的用例，运行全部匹配的用例")
+    _log(f"用例 {len(cases)} 个，并行 {workers}，项目 {project_dir}")
+
+    success, msg = tester.compile_project()
+    _log(msg)
+    if not success:
+        return EXIT_ERROR
+
+    token = CancelToken()
+    stop_reason = ""
+    budget_timer: Optional[threading.Timer] = None
+    if args.time_budget:
+        def on_budget():
+            nonlocal stop_reason
+            stop_reason = stop_reason or f"超出时间预算 {args.time_budget}s"
+            token.cancel()
+        budget_timer = threading.Timer(args.time_budget, on_budget)
+        budget_timer.daemon = True
+        budget_timer.start()
+
+    lib_of = {id(case): lib_name for lib_name, case in cases}
+    results: Dict[int, object] = {}
+    failed = 0
+    start = time.monotonic()
+
+    try:
+        for case, result in tester.iter_parallel([case for _, case in cases], workers, token=token,
+                                                 failures_first=args.failed_first):
+            # JUnit 只需要状态和信息，不保留输出
+            results[id(case)] = TestResult(result.status, result.message)
+            if not result.passed and result.status != TestStatus.SKIPPED:
+                failed += 1
+                if args.fail_fast and not token.cancelled:
+                    stop_reason = stop_reason or f"{lib_of[id(case)]}/{case.name} 未通过 (--fail-fast)"
+                    token.cancel()
+            record = {
+                "event": "result",
+                "lib": lib_of[id(case)],
+                "case": case.name,
+                "status": result.status.name,
+                "passed": result.passed,
+                "message": result.message,
+                "elapsed": round(time.monotonic() - start, 3),
+                "progress": f"{len(results)}/{len(cases)}",
+            }
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if budget_timer is not None:
+            budget_timer.cancel()
+    elapsed = time.monotonic() - start
+
+    passed = sum(1 for r in results.values() if r.passed)
+    not_run = len(cases) - len(results)
+    summary = {
+        "event": "summary",
+        "total": len(cases),
+        "passed": passed,
+        "failed": failed,
+        "skipped": len(results) - passed - failed,
+        "not_run": not_run,
+        "stopped": stop_reason,
+        "elapsed": round(elapsed, 3),
+    }
+    out.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    out.flush()
+
+    if args.junit:
+        junit_path = Path(args.junit)
+        write_junit(junit_path, cases, results, elapsed, stop_reason or "未运行")
+        _log(f"JUnit 报告: {junit_path}")
+    if tester.last_summary:
+        for line in tester.last_summary.format_lines():
+            _log(line)
+    if stop_reason:
+        _log(f"提前停止: {stop_reason}，{not_run} 个用例未运行")
+    _log(f"通过 {passed}/{len(cases)}，失败 {failed}，用时 {elapsed:.1f}s")
+    if failed:
+        return EXIT_FAILED
+    # 只跑了一部分的运行不能算通过
+    return EXIT_INCOMPLETE if stop_reason or not_run else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="SysY 编译器测试框架")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("gui", help="启动图形界面 (默认)")
+
+    run = sub.add_parser("run", help="无界面运行测试，结果以 JSON 行输出到 stdout")
+    run.add_argument("--project", help="编译器项目目录 (默认 config.yaml 中的 compiler_project_dir)")
+    run.add_argument("--testfiles", help="测试用例根目录 (默认 testfiles/)")
+    run.add_argument("--lib", action="append", default=[], metavar="GLOB",
+                     help="只运行匹配的测试库 (相对 testfiles 的路径，可重复)")
+    run.add_argument("--case", action="append", default=[], metavar="GLOB",
+                     help="只运行匹配的用例 (文件名、不含扩展名的文件名或 测试库/文件名，可重复)")
+    run.add_argument("-j", "--workers", type=int, default=0,
+                     help="同时进行的用例数上限 (默认 parallel.max_workers)")
+    run.add_argument("--lf", "--last-failed", dest="last_failed", action="store_true",
+                     help="只运行上次未通过的用例 (没有记录时运行全部)")
+    run.add_argument("--ff", "--failed-first", dest="failed_first", action="store_true",
+                     help="先运行上次未通过的用例，再运行其余用例")
+    run.add_argument("--fail-fast", action="store_true", help="出现第一个未通过的用例后停止")
+    run.add_argument("--time-budget", type=float, default=0, metavar="SECONDS",
+                     help="运行时间上限，超出后停止，剩余用例记为未运行")
+    run.add_argument("--junit", default=str(TEST_DIR / ".tmp" / "junit.xml"), metavar="PATH",
+                     help="JUnit XML 报告路径 (默认 .tmp/junit.xml，传空字符串不生成)")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """主入口 - 无子命令时启动GUI"""
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        try:
+            code = run_headless(args)
+        except KeyboardInterrupt:
+            code = EXIT_INTERRUPTED
+        sys.exit(code)
+
+    from .gui import run_gui
 
-def main():
-    """主入口 - 启动GUI"""
     print(LOGO)
     run_gui()
 
@@ -0,0 +1,193 @@
+"""
+流式输出比较 - 边读 Mars 输出边与期望输出逐行比较，出现不同就可以提前结束模拟器
+
+比较规则与 normalize_output 一致: \\r\\n、\\r 视为换行，每行去掉行尾空白，忽略末尾的空行。
+"""
+import threading
+from collections import deque
+from itertools import islice
+from typing import List, Optional
+
+from .capture import LineSplitter, OutputCapture
+from .models import TestResult, TestStatus
+
+
+class StreamComparator:
+    """
+    逐块喂入实际输出 (feed)，与期望输出 (set_expected) 逐行比较
+
+    期望输出可以晚于实际输出到达 (g++ 与被测程序同时运行)，在此之前读到的行先暂存，
+    暂存超过 MAX_PENDING_CHARS 时放弃边读边比较 (由调用方在运行结束后比较摘要)。
+    期望输出从 OutputCapture 中逐行读出，只保留出错位置之前的几行作为上下文。
+    feed 与 set_expected 可以在不同线程中调用。
+    """
+
+    CONTEXT_LINES = 3
+    # 报告中每行最多显示的字符数
+    MAX_LINE_CHARS = 200
+    MAX_PENDING_CHARS = OutputCapture.MEMORY_CHARS
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expected: Optional[OutputCapture] = None
+        self._expected_lines = None
+        self._closed = False
+        self.restart()
+
+    def restart(self):
+        """丢弃已读入的实际输出 (同一用例换一种方式重新运行时调用)"""
+        with self._lock:
+            self._splitter = LineSplitter()
+            self._pending: List[tuple] = []   # 期望输出到达前读到的 (空行数, 行)
+            self._pending_chars = 0
+            self._gave_up = False
+            self._checked = 0
+            self._context = deque(maxlen=self.CONTEXT_LINES)
+            self._failure: Optional[str] = None
+            self._rewind()
+
+    @property
+    def diverged(self) -> bool:
+        """实际输出已确定与期望不同"""
+        return self._failure is not None
+
+    def set_expected(self, expected: OutputCapture):
+        """给出期望输出，并检查此前暂存的行"""
+        with self._lock:
+            if self._expected is not None or self._closed:
+                return
+            self._expected = expected
+            if not expected.complete:
+                self._give_up()
+                return
+            self._rewind()
+            pending, self._pending = self._pending, []
+            self._pending_chars = 0
+            for carried, lines in pending:
+                if not self._check(carried, lines):
+                    return
+            self._check_tail()
+
+    def feed(self, chunk: str) -> bool:
+        """
+        读入一块实际输出
+
+        Returns:
+            是否仍可能与期望输出一致 (返回 False 时应结束被测程序)
+        """
+        with self._lock:
+            if self._failure is not None:
+                return False
+            if self._gave_up:
+                return True
+            carried, lines = self._splitter.feed(chunk)
+            if self._expected_lines is None:
+                if carried or lines:
+                    self._pending.append((carried, lines))
+                    self._pending_chars += carried + sum(len(line) for line in lines)
+                if self._pending_chars + len(self._splitter.tail) > self.MAX_PENDING_CHARS:
+                    self._give_up()
+                return True
+            if self._check(carried, lines):
+                self._check_tail()
+            return self._failure is None
+
+    def close(self):
+        """比较结束，关闭期望输出的读取 (之后不再接受期望输出)"""
+        with self._lock:
+            self._closed = True
+            if self._expected_lines is not None:
+                self._expected_lines.close()
+                self._expected_lines = None
+
+    def failure(self) -> TestResult:
+        """
+        提前结束运行时的测试结果
+
+        实际输出不完整，不放进结果，message 中带出错位置和之前几行作为上下文
+        """
+        return TestResult(
+            TestStatus.FAILED, self._failure or "输出不匹配",
+            expected_digest=self._expected.digest if self._expected is not None else None
+        )
+
+    def _rewind(self):
+        if self._expected_lines is not None:
+            self._expected_lines.close()
+            self._expected_lines = None
+        self._peeked: List[str] = []
+        if self._expected is not None and self._expected.complete:
+            self._expected_lines = self._expected.iter_lines()
+
+    def _give_up(self):
+        self._gave_up = True
+        self._pending = []
+        self._pending_chars = 0
+        self._splitter = LineSplitter()
+
+    def _take(self, count: int) -> List[str]:
+        taken, self._peeked = self._peeked[:count], self._peeked[count:]
+        if len(taken) < count:
+            taken.extend(islice(self._expected_lines, count - len(taken)))
+        return taken
+
+    def _peek(self) -> Optional[str]:
+        if not self._peeked:
+            self._peeked = self._take(1)
+        return self._peeked[0] if self._peeked else None
+
+    def _check(self, carried: int, lines: List[str]) -> bool:
+        while carried:
+            count = min(carried, 4096)
+            if not self._check_lines([""] * count):
+                return False
+            carried -= count
+        return self._check_lines(lines) if lines else True
+
+    def _check_lines(self, lines: List[str]) -> bool:
+        expected = self._take(len(lines))
+        if expected == lines:
+            self._context.extend(lines[-self.CONTEXT_LINES:])
+            self._checked += len(lines)
+            return True
+        index = 0
+        while index < len(expected) and lines[index] == expected[index]:
+            index += 1
+        self._context.extend(lines[max(0, index - self.CONTEXT_LINES):index])
+        self._checked += index
+        if index < len(expected):
+            self._fail(f"输出不匹配: 第 {self._checked + 1} 行不同 (已提前结束运行)", expected[index], lines[index])
+        else:
+            self._fail(f"输出不匹配: 期望输出只有 {self._checked} 行，实际输出更多 (已提前结束运行)",
+                       None, lines[index])
+        return False
+
+    def _check_tail(self):
+        """尚未换行的部分已经不可能与期望的下一行一致时同样判定为不同 (防止超长的单行)"""
+        carried = self._splitter.settle()
+        if carried and not self._check(carried, []):
+            return
+        tail = self._splitter.tail
+        if not tail.strip():
+            return
+        expected = self._peek()
+        if expected is None:
+            self._fail(f"输出不匹配: 期望输出只有 {self._checked} 行，实际输出更多 (已提前结束运行)", None, tail)
+        elif not (expected.startswith(tail) or (tail.startswith(expected) and not tail[len(expected):].strip())):
+            self._fail(f"输出不匹配: 第 {self._checked + 1} 行不同 (已提前结束运行)", expected, tail)
+
+    def _fail(self, title: str, expected: Optional[str], actual: str):
+        first = self._checked - len(self._context) + 1
+        lines = [title]
+        for offset, line in enumerate(self._context):
+            lines.append(f"  {first + offset}: {self._clip(line)}")
+        if expected is not None:
+            lines.append(f"期望: {self._clip(expected) or '<空>'}")
+        lines.append(f"实际: {self._clip(actual.rstrip()) or '<空>'}")
+        self._failure = "\n".join(lines)
+
+    @classmethod
+    def _clip(cls, line: str) -> str:
+        if len(line) > cls.MAX_LINE_CHARS:
+            return line[:cls.MAX_LINE_CHARS] + "..."
+        return line
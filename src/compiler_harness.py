@@ -0,0 +1,56 @@
+"""
+批量编译 harness - 在常驻 JVM 中反复调用被测 Java 编译器，省去每个用例的 JVM 启动
+"""
+import shutil
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .jvm_service import JvmServicePool
+
+
+HARNESS_SOURCE = Path(__file__).parent / "CompilerHarness.java"
+
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+STATUS_TIMEOUT = "TIMEOUT"
+STATUS_LEAK = "LEAK"
+
+
+class CompilerHarnessPool(JvmServicePool):
+    """按线程分配的编译 harness，每个 harness 在自己的目录中运行编译器"""
+
+    def __init__(self, java_cmd: str, compiler_jar: Path, work_dir: Path, javac_cmd: str = "javac",
+                 main_class: str = "Compiler"):
+        super().__init__(
+            HARNESS_SOURCE, Path(work_dir) / "harness", [], [str(compiler_jar), main_class],
+            java_cmd=java_cmd, javac_cmd=javac_cmd
+        )
+
+    def compile(self, worker_dir: Path, timeout: float) -> Tuple[Optional[str], str]:
+        """
+        用 worker_dir/testfile.txt 运行一次编译器，产物 mips.txt 移回 worker_dir
+
+        Returns:
+            (状态, 编译器输出) - 状态为 None 表示 harness 进程意外退出
+            (例如被测编译器调用了 System.exit)
+        """
+        service = self.get()
+        run_dir = service.cwd
+        run_dir.mkdir(parents=True, exist_ok=True)
+        for item in run_dir.iterdir():
+            if item.is_dir():
+                shutil.rmtree(item, ignore_errors=True)
+            else:
+                item.unlink()
+        shutil.copyfile(worker_dir / "testfile.txt", run_dir / "testfile.txt")
+
+        status, body = service.request(timeout)
+        output = body.decode("utf-8", errors="replace")
+        if status is None or status in (STATUS_TIMEOUT, STATUS_LEAK):
+            service.close()
+            return status, output
+
+        produced = run_dir / "mips.txt"
+        if produced.exists():
+            shutil.move(str(produced), str(worker_dir / "mips.txt"))
+        return status, output
@@ -1,11 +1,9 @@
 """
 配置模块 - 从YAML文件加载配置
 """
-import yaml
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import List, Optional
-import tkinter.font as tkfont
 
 
 @dataclass
@@ -24,6 +22,67 @@ class TimeoutConfig:
 class ParallelConfig:
     """并行配置"""
     max_workers: int = 4
+    adaptive: bool = True       # 根据超时/负载/内存在 min_workers 与 max_workers 之间自动调整
+    min_workers: int = 2
+    compile_workers: int = 0    # 同时运行的编译器进程数上限，0 表示与 max_workers 相同
+    mars_workers: int = 0       # 同时运行的 Mars 进程数上限
+    gcc_workers: int = 0        # 同时运行的 g++ 进程数上限
+
+
+@dataclass
+class CacheConfig:
+    """缓存配置"""
+    enabled: bool = True
+    reference_max_mb: int = 256   # g++参考输出缓存大小上限
+    mips_max_mb: int = 512        # 被测编译器MIPS产物缓存大小上限
+
+
+@dataclass
+class BuildConfig:
+    """被测编译器构建配置 (不使用 CMake 的 C/C++ 项目)"""
+    opt_level: str = "O2"   # g++ 优化级别，如 O0 / O2 / Os
+    jobs: int = 0           # 同时编译的源文件数，0 表示 CPU 核心数
+
+    def opt_flag(self) -> str:
+        level = str(self.opt_level or "O0").strip().lstrip("-")
+        return f"-{level}"
+
+
+@dataclass
+class ExecutionConfig:
+    """执行方式配置"""
+    mars_backend: str = "subprocess"   # subprocess: 每个用例启动一次Mars | server: 每个线程一个常驻JVM | python: 进程内模拟器
+    compiler_harness: bool = False     # Java编译器在常驻JVM中批量运行
+    sim_max_steps: int = 0             # python 模拟器的指令上限，0 表示只按 timeout.mars 限制运行时间
+    scratch_dir: str = ""              # 用例工作目录的位置 (如 /dev/shm)，空则使用 .tmp
+    scratch_min_free_mb: int = 256     # scratch_dir 剩余空间低于此值时回退到 .tmp
+    output_limit_mb: int = 64          # Mars / g++ 输出的上限，超出后结束程序，0 表示不限制 (超过 1MB 的输出写入 .tmp/outputs)
+
+
+@dataclass
+class JvmOptionsConfig:
+    """启动 Compiler.jar / Mars.jar 时附加的 JVM 参数 (偏向启动速度，常驻服务不使用)"""
+    enabled: bool = True
+    class_data_sharing: bool = True   # 为每个 jar 生成 AppCDS 归档 (需要 JDK 13+)，jar 变化时重新生成
+    tiered_stop_at_level: int = 0     # -XX:TieredStopAtLevel，1 表示只用 C1 (启动快，长时间运行的程序慢)，0 表示不设置
+    serial_gc: bool = True            # -XX:+UseSerialGC
+    max_heap_mb: int = 0              # -Xmx，0 表示 JVM 默认
+    initial_heap_mb: int = 0          # -Xms，0 表示 JVM 默认
+    extra: List[str] = field(default_factory=list)
+    
+    def args(self) -> List[str]:
+        if not self.enabled:
+            return []
+        args = []
+        if self.tiered_stop_at_level > 0:
+            args.append(f"-XX:TieredStopAtLevel={self.tiered_stop_at_level}")
+        if self.serial_gc:
+            args.append("-XX:+UseSerialGC")
+        if self.initial_heap_mb > 0:
+            args.append(f"-Xms{self.initial_heap_mb}m")
+        if self.max_heap_mb > 0:
+            args.append(f"-Xmx{self.max_heap_mb}m")
+        return args + [str(a) for a in self.extra]
 
 
 @dataclass
@@ -32,6 +91,7 @@ class ToolsConfig:
     jdk_home: str = ""       # JDK安装目录，空则用PATH
     gcc_path: str = ""       # gcc/g++可执行文件路径
     cmake_path: str = ""
+    jvm_options: JvmOptionsConfig = field(default_factory=JvmOptionsConfig)
     
     def _normalize(self, value) -> str:
         if value is None:
@@ -85,6 +145,8 @@ class GuiConfig:
             return self._resolved_font
         
         try:
+            # 只有 GUI 用到字体，无界面运行时不加载 tkinter
+            import tkinter.font as tkfont
             available = set(tkfont.families())
             for font in self.font_family:
                 if font in available:
@@ -107,6 +169,9 @@ class Config:
     timeout: TimeoutConfig = field(default_factory=TimeoutConfig)
     parallel: ParallelConfig = field(default_factory=ParallelConfig)
     tools: ToolsConfig = field(default_factory=ToolsConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    build: BuildConfig = field(default_factory=BuildConfig)
+    execution: ExecutionConfig = field(default_factory=ExecutionConfig)
     gui: GuiConfig = field(default_factory=GuiConfig)
     
     _instance: Optional['Config'] = field(default=None, repr=False, init=False)
@@ -122,8 +187,11 @@ class Config:
             return cls._create_default()
         
         try:
+            # yaml 导入较慢，只在真正读取配置时加载；有 libyaml 时用 C 实现解析
+            import yaml
+            loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
             with open(config_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
+                data = yaml.load(f, Loader=loader)
             return cls._from_dict(data)
         except Exception as e:
             print(f"加载配置文件失败: {e}，使用默认配置")
@@ -157,14 +225,56 @@ class Config:
         
         parallel_data = data.get('parallel', {})
         parallel = ParallelConfig(
-            max_workers=parallel_data.get('max_workers', 4)
+            max_workers=parallel_data.get('max_workers', 4),
+            adaptive=bool(parallel_data.get('adaptive', True)),
+            min_workers=int(parallel_data.get('min_workers', 2)),
+            compile_workers=int(parallel_data.get('compile_workers', 0) or 0),
+            mars_workers=int(parallel_data.get('mars_workers', 0) or 0),
+            gcc_workers=int(parallel_data.get('gcc_workers', 0) or 0)
         )
         
         tools_data = data.get('tools', {})
+        jvm_data = tools_data.get('jvm_options', {}) or {}
+        extra = jvm_data.get('extra', []) or []
+        if isinstance(extra, str):
+            extra = extra.split()
+        jvm_options = JvmOptionsConfig(
+            enabled=bool(jvm_data.get('enabled', True)),
+            class_data_sharing=bool(jvm_data.get('class_data_sharing', True)),
+            tiered_stop_at_level=int(jvm_data.get('tiered_stop_at_level', 0) or 0),
+            serial_gc=bool(jvm_data.get('serial_gc', True)),
+            max_heap_mb=int(jvm_data.get('max_heap_mb', 0) or 0),
+            initial_heap_mb=int(jvm_data.get('initial_heap_mb', 0) or 0),
+            extra=list(extra)
+        )
         tools = ToolsConfig(
             jdk_home=tools_data.get('jdk_home', ''),
             gcc_path=tools_data.get('gcc_path', ''),
-            cmake_path=tools_data.get('cmake_path', '')
+            cmake_path=tools_data.get('cmake_path', ''),
+            jvm_options=jvm_options
+        )
+        
+        cache_data = data.get('cache', {}) or {}
+        cache = CacheConfig(
+            enabled=bool(cache_data.get('enabled', True)),
+            reference_max_mb=cache_data.get('reference_max_mb', 256),
+            mips_max_mb=cache_data.get('mips_max_mb', 512)
+        )
+        
+        build_data = data.get('build', {}) or {}
+        build = BuildConfig(
+            opt_level=str(build_data.get('opt_level', 'O2')),
+            jobs=int(build_data.get('jobs', 0) or 0)
+        )
+        
+        execution_data = data.get('execution', {}) or {}
+        execution = ExecutionConfig(
+            mars_backend=str(execution_data.get('mars_backend', 'subprocess')).lower(),
+            compiler_harness=bool(execution_data.get('compiler_harness', False)),
+            sim_max_steps=int(execution_data.get('sim_max_steps', 0)),
+            scratch_dir=str(execution_data.get('scratch_dir', '') or ''),
+            scratch_min_free_mb=int(execution_data.get('scratch_min_free_mb', 256)),
+            output_limit_mb=int(execution_data.get('output_limit_mb', 64))
         )
         
         return cls(
@@ -174,6 +284,9 @@ class Config:
             timeout=timeout,
             parallel=parallel,
             tools=tools,
+            cache=cache,
+            build=build,
+            execution=execution,
             gui=gui
         )
     
@@ -187,6 +300,9 @@ class Config:
             timeout=TimeoutConfig(),
             parallel=ParallelConfig(),
             tools=ToolsConfig(),
+            cache=CacheConfig(),
+            build=BuildConfig(),
+            execution=ExecutionConfig(),
             gui=GuiConfig()
         )
     
@@ -1,40 +1,88 @@
 """
 测试用例发现模块
 """
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
+from .cache import hash_parts
 from .models import TestCase
 
 
+def _case_number(name: str, prefix: str) -> Optional[int]:
+    """"testfile12.txt" -> 12，不符合 <prefix>N.txt 时返回 None"""
+    if not (name.startswith(prefix) and name.endswith(".txt")):
+        return None
+    num_str = name[len(prefix):-4]
+    if not num_str:
+        return None
+    try:
+        return int(num_str)
+    except ValueError:
+        return None
+
+
+def _is_testfile(name: str) -> bool:
+    """等价于 glob("testfile*.txt")"""
+    return name.startswith("testfile") and name.endswith(".txt")
+
+
+def _scan(directory: Path):
+    """
+    用一次 os.scandir 列出目录
+
+    Returns:
+        (是否直接包含 testfile*.txt, {编号: testfile 项}, {编号: input 项}, 子目录名列表)
+    """
+    has_testfiles = False
+    testfiles: Dict[int, os.DirEntry] = {}
+    inputs: Dict[int, os.DirEntry] = {}
+    subdirs: List[str] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            name = entry.name
+            if _is_testfile(name):
+                has_testfiles = True
+                num = _case_number(name, "testfile")
+                if num is not None:
+                    testfiles[num] = entry
+                continue
+            num = _case_number(name, "input")
+            if num is not None:
+                inputs[num] = entry
+            elif entry.is_dir():
+                subdirs.append(name)
+    subdirs.sort()
+    return has_testfiles, testfiles, inputs, subdirs
+
+
 class TestDiscovery:
     """测试用例发现器"""
-    
+
     @staticmethod
     def discover_in_dir(test_dir: Path) -> List[TestCase]:
         """
         发现目录下的所有测试用例
         统一格式: testfile1.txt, input1.txt (或 testfile2.txt, input2.txt ...)
         """
-        file_cases = []
-        
-        for testfile in test_dir.glob("testfile*.txt"):
-            num_str = testfile.stem.replace("testfile", "")
-            if num_str:
-                try:
-                    num = int(num_str)
-                    input_file = test_dir / f"input{num}.txt"
-                    file_cases.append((num, TestCase(
-                        name=testfile.name,
-                        testfile=testfile,
-                        input_file=input_file if input_file.exists() else None
-                    )))
-                except ValueError:
-                    pass
-        
-        file_cases.sort(key=lambda x: x[0])
-        return [tc for _, tc in file_cases]
-    
+        try:
+            _, testfiles, inputs, _ = _scan(test_dir)
+        except OSError:
+            return []
+        return [
+            TestCase(
+                name=testfiles[num].name,
+                testfile=test_dir / testfiles[num].name,
+                input_file=test_dir / inputs[num].name if num in inputs else None
+            )
+            for num in sorted(testfiles)
+        ]
+
     @staticmethod
     def discover_test_libs(testfiles_dir: Path) -> List[Path]:
         """
@@ -42,27 +90,32 @@ class TestDiscovery:
         支持任意深度的嵌套目录结构
         """
         test_libs = []
-        
+
         if not testfiles_dir.exists():
             return test_libs
-        
+
         def find_test_dirs(directory: Path):
             """递归查找包含测试文件的叶子目录"""
-            has_direct_testfiles = list(directory.glob("testfile*.txt"))
-            
+            try:
+                has_direct_testfiles, _, _, subdirs = _scan(directory)
+            except OSError:
+                return
+
             if has_direct_testfiles:
                 test_libs.append(directory)
             else:
-                for subdir in sorted(directory.iterdir()):
-                    if subdir.is_dir():
-                        find_test_dirs(subdir)
-        
-        for item in sorted(testfiles_dir.iterdir()):
-            if item.is_dir():
-                find_test_dirs(item)
-        
+                for name in subdirs:
+                    find_test_dirs(directory / name)
+
+        try:
+            _, _, _, top_dirs = _scan(testfiles_dir)
+        except OSError:
+            return test_libs
+        for name in top_dirs:
+            find_test_dirs(testfiles_dir / name)
+
         return test_libs
-    
+
     @staticmethod
     def get_next_testfile_number(test_dir: Path) -> int:
         """获取下一个测试文件编号"""
@@ -76,3 +129,216 @@ class TestDiscovery:
                 except ValueError:
                     pass
         return max_num + 1
+
+
+class CorpusIndex:
+    """
+    持久化的用例索引 - 记录每个目录的 mtime、子目录和用例
+    (编号、testfile/input 的文件名、大小、mtime、内容哈希)
+
+    refresh 时只重新列出 mtime 变化了的目录，其余目录沿用清单中的记录，
+    每个目录只需一次 stat；文件内容的哈希在大小和 mtime 未变时沿用。
+    目录的 mtime 只反映增删改名，原地修改的用例文件要等所在目录有变化或
+    调用 refresh(deep=True) 才会更新大小/哈希 (用例列表本身不受影响)。
+
+    清单: {"version", "root", "dirs": {相对路径: {"mtime", "lib", "subdirs", "cases"}}}
+    cases 中每项为 [编号, [testfile 名, 大小, mtime, sha256], [input 名, 大小, mtime, sha256] | null]
+    """
+
+    VERSION = 1
+    # mtime 距扫描时刻太近的目录下次仍要重新列出，避免同一时间戳内的后续修改被漏掉
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, root: Path, manifest_path: Path):
+        self.root = Path(root)
+        self.manifest_path = Path(manifest_path)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._dirs: Optional[Dict[str, dict]] = None
+        self._libs: List[str] = []
+        self.last_stats: Tuple[int, int] = (0, 0)  # (重新列出的目录数, 目录总数)
+
+    @classmethod
+    def for_root(cls, testfiles_dir: Path, cache_dir: Path) -> "CorpusIndex":
+        """每个用例根目录一份清单，放在 cache_dir 下"""
+        root = Path(testfiles_dir).resolve()
+        return cls(root, Path(cache_dir) / f"corpus_{hash_parts(str(root))[:12]}.json")
+
+    @property
+    def loaded(self) -> bool:
+        return self._dirs is not None
+
+    # ---------- 查询 (只读内存，不访问文件系统) ----------
+
+    def libs(self) -> List[Tuple[str, int]]:
+        """[(测试库相对路径, 用例数), ...]，路径用 "/" 分隔"""
+        with self._lock:
+            dirs = self._dirs or {}
+            return [(rel, len(dirs[rel]["cases"])) for rel in self._libs]
+
+    def cases(self, lib: str) -> List[TestCase]:
+        """测试库的用例 (每次返回新的 TestCase，调用方可以修改)"""
+        lib = Path(lib).as_posix()
+        with self._lock:
+            entry = (self._dirs or {}).get(lib)
+            records = list(entry["cases"]) if entry and entry["lib"] else []
+        lib_dir = self.root / lib
+        return [
+            TestCase(
+                name=testfile[0],
+                testfile=lib_dir / testfile[0],
+                input_file=lib_dir / input_file[0] if input_file else None
+            )
+            for _, testfile, input_file in records
+        ]
+
+    # ---------- 加载与刷新 ----------
+
+    def load(self) -> bool:
+        """从清单加载 (不扫描目录)，清单不存在或不匹配时返回 False"""
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get("version") != self.VERSION or data.get("root") != str(self.root):
+            return False
+        dirs = data.get("dirs")
+        if not isinstance(dirs, dict):
+            return False
+        with self._lock:
+            if self._dirs is None:
+                self._dirs = dirs
+                self._libs = self._collect_libs(dirs)
+        return True
+
+    def refresh(self, deep: bool = False) -> bool:
+        """
+        扫描用例根目录，更新索引并写回清单
+
+        Args:
+            deep: 为 True 时重新列出所有目录 (检查原地修改过的文件)
+
+        Returns:
+            用例列表是否有变化
+        """
+        with self._refresh_lock:
+            if self._dirs is None:
+                self.load()
+            with self._lock:
+                previous = dict(self._dirs or {})
+            now_ns = time.time_ns()
+            dirs: Dict[str, dict] = {}
+            rescanned = 0
+
+            # 按目录逐层展开: 未变化的目录直接沿用记录
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                path = self.root / rel if rel else self.root
+                try:
+                    mtime = path.stat().st_mtime_ns
+                except OSError:
+                    continue
+                old = previous.get(rel)
+                if not deep and old is not None and old.get("mtime") == mtime:
+                    entry = old
+                else:
+                    entry = self._scan_dir(path, rel, old)
+                    if entry is None:
+                        continue
+                    rescanned += 1
+                    # 刚修改过的目录不记 mtime，下次一定重新列出
+                    entry["mtime"] = mtime if now_ns - mtime > self.RACY_WINDOW_NS else None
+                dirs[rel] = entry
+                if rel and entry["lib"]:
+                    continue  # 测试库是叶子，不再向下查找
+                for name in reversed(entry["subdirs"]):
+                    stack.append(f"{rel}/{name}" if rel else name)
+
+            libs = self._collect_libs(dirs)
+            with self._lock:
+                changed = libs != self._libs or any(
+                    previous.get(lib, {}).get("cases") != dirs[lib]["cases"] for lib in libs
+                )
+                self._dirs = dirs
+                self._libs = libs
+            self.last_stats = (rescanned, len(dirs))
+            if rescanned or dirs.keys() != previous.keys():
+                self._save(dirs)
+            return changed
+
+    @staticmethod
+    def _collect_libs(dirs: Dict[str, dict]) -> List[str]:
+        """按目录树顺序 (同一层按名称) 列出测试库"""
+        libs: List[str] = []
+        root = dirs.get("")
+        if root is None:
+            return libs
+        stack = list(reversed(root["subdirs"]))
+        while stack:
+            rel = stack.pop()
+            entry = dirs.get(rel)
+            if entry is None:
+                continue
+            if entry["lib"]:
+                libs.append(rel)
+            else:
+                stack.extend(f"{rel}/{name}" for name in reversed(entry["subdirs"]))
+        return libs
+
+    @staticmethod
+    def _file_record(entry: os.DirEntry, old: Optional[list]) -> Optional[list]:
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        if old and old[0] == entry.name and old[1] == st.st_size and old[2] == st.st_mtime_ns:
+            return old
+        try:
+            with open(entry.path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        return [entry.name, st.st_size, st.st_mtime_ns, digest]
+
+    def _scan_dir(self, path: Path, rel: str, old: Optional[dict]) -> Optional[dict]:
+        try:
+            has_testfiles, testfiles, inputs, subdirs = _scan(path)
+        except OSError:
+            return None
+        previous = {}
+        if old:
+            for _, testfile, input_file in old.get("cases", []):
+                previous[testfile[0]] = testfile
+                if input_file:
+                    previous[input_file[0]] = input_file
+        cases = []
+        for num in sorted(testfiles):
+            testfile = self._file_record(testfiles[num], previous.get(testfiles[num].name))
+            if testfile is None:
+                continue
+            input_file = None
+            if num in inputs:
+                input_file = self._file_record(inputs[num], previous.get(inputs[num].name))
+            cases.append([num, testfile, input_file])
+        return {"mtime": None, "lib": bool(rel) and has_testfiles, "subdirs": subdirs, "cases": cases}
+
+    def _save(self, dirs: Dict[str, dict]):
+        """写回清单 (先写临时文件再替换)，失败不影响使用"""
+        payload = json.dumps({"version": self.VERSION, "root": str(self.root), "dirs": dirs},
+                             ensure_ascii=False, separators=(",", ":"))
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(self.manifest_path.parent), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_name, self.manifest_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            pass
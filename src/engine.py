@@ -0,0 +1,391 @@
+"""
+异步测试执行引擎 - 用 asyncio 子进程并发跑用例 (由 CompilerTester.test_parallel 按需导入)
+"""
+import asyncio
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Set, Tuple
+
+from .history import DurationHistory
+from .limiter import AdaptiveLimiter
+from .models import TestCase, TestResult, TestStatus
+from .capture import OutputCapture
+from .compare import StreamComparator
+from .timing import PhaseClock
+from .stages import AwaitReference, Call, StageFinished, drive_async
+from .tester import (
+    CompilerTester, CancelToken, TestCancelled, STDERR_LIMIT,
+    _new_group_kwargs, _kill_process_group, _feed_expected
+)
+from .utils import file_digest
+
+
+# 当前用例提交到线程池的任务 (在 _run_case 中设置，参考输出子任务继承同一个列表)
+_case_jobs: "ContextVar[Optional[List[Future]]]" = ContextVar("engine_case_jobs", default=None)
+
+
+def _decode_output(data: bytes) -> str:
+    """按 subprocess 文本模式的方式解码子进程输出"""
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+async def _exec_async(cmd: List[str], input_data: bytes = b"", timeout: Optional[float] = None,
+                      cwd: Optional[Path] = None) -> Tuple[int, bytes, bytes]:
+    """
+    异步运行子进程并收集 stdout/stderr
+    
+    超时抛出 asyncio.TimeoutError；超时或任务被取消时先结束子进程所在的整个进程组
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE, cwd=str(cwd) if cwd else None, **_new_group_kwargs()
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(input_data), timeout)
+    except BaseException:
+        if proc.returncode is None:
+            _kill_process_group(proc.pid)
+            await proc.wait()
+        raise
+    return proc.returncode, stdout, stderr
+
+
+async def _exec_streaming(cmd: List[str], input_data: bytes, timeout: Optional[float], cwd: Optional[Path],
+                          on_stdout: Callable[[str], bool]) -> Tuple[Optional[int], bytes]:
+    """
+    异步运行子进程，stdout 不在这里收集，而是边运行边交给 on_stdout (stderr 只保留开头)
+
+    返回 (返回码, stderr)；on_stdout 返回 False 时立即结束整个进程组，此时返回码为 None。
+    超时与取消的处理同 _exec_async
+    """
+    import codecs
+    
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE, cwd=str(cwd) if cwd else None, **_new_group_kwargs()
+    )
+    
+    async def write_stdin():
+        try:
+            if input_data:
+                proc.stdin.write(input_data)
+                await proc.stdin.drain()
+            proc.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    stderr_parts: List[bytes] = []
+    
+    async def drain_stderr():
+        # 同 _stream_process: 最多保留 STDERR_LIMIT 字节
+        kept = 0
+        while True:
+            data = await proc.stderr.read(65536)
+            if not data:
+                return
+            if kept < STDERR_LIMIT:
+                stderr_parts.append(data[:STDERR_LIMIT - kept])
+                kept += len(stderr_parts[-1])
+    
+    async def communicate() -> Tuple[Optional[int], bytes]:
+        helpers = [asyncio.ensure_future(write_stdin()), asyncio.ensure_future(drain_stderr())]
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        stopped = False
+        try:
+            while not stopped:
+                data = await proc.stdout.read(65536)
+                text = decoder.decode(data, final=not data)
+                if text and not on_stdout(text):
+                    stopped = True
+                    _kill_process_group(proc.pid)
+                if not data:
+                    break
+            await asyncio.gather(*helpers, return_exceptions=True)
+            await proc.wait()
+        finally:
+            for helper in helpers:
+                helper.cancel()
+        return None if stopped else proc.returncode, b"".join(stderr_parts)
+    
+    try:
+        return await asyncio.wait_for(communicate(), timeout)
+    except BaseException:
+        if proc.returncode is None:
+            _kill_process_group(proc.pid)
+            await proc.wait()
+        raise
+
+
+class AsyncTestEngine:
+    """
+    基于 asyncio 的测试执行引擎
+    
+    执行 CompilerTester 中与同步接口共用的阶段生成器 (缓存、回退和结果判定都在那里)，
+    其中的子进程用 asyncio.create_subprocess_exec 启动，编译、Mars、g++ 每个阶段
+    各用一个信号量限制同时运行的进程数；常驻 JVM、Python 模拟器等同步后端
+    在引擎自带的线程池中执行。
+    
+    同时进行的用例数由 AdaptiveLimiter 根据超时率、系统负载和可用内存在
+    [parallel.min_workers, max_workers] 之间动态调整。
+    
+    用法:
+        async for case, result in AsyncTestEngine(tester, 8).run(cases):
+            ...
+    """
+    
+    def __init__(self, tester: CompilerTester, max_workers: int = 4, adaptive: Optional[bool] = None,
+                 history: Optional[DurationHistory] = None):
+        parallel = tester.config.parallel
+        self.tester = tester
+        self.history = history
+        self.max_workers = max(1, max_workers)
+        self.adaptive = parallel.adaptive if adaptive is None else adaptive
+        self.min_workers = parallel.min_workers
+        self.stage_limits = {
+            "compile": parallel.compile_workers or self.max_workers,
+            "mars": parallel.mars_workers or self.max_workers,
+            "gcc": parallel.gcc_workers or self.max_workers,
+        }
+        self.limiter: Optional[AdaptiveLimiter] = None
+        self._stages: dict = {}
+        self._dir_slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._token: Optional[CancelToken] = None
+    
+    async def run(self, cases: Iterable[TestCase],
+                  token: Optional[CancelToken] = None) -> AsyncIterator[Tuple[TestCase, TestResult]]:
+        """
+        并发执行用例，按完成顺序产出 (用例, 结果)；同一引擎同一时间只运行一批
+        
+        cases 可以是生成器，用例按需取用: 同时存在的任务不超过 max_workers 个，
+        调用方暂停迭代时不再启动新用例，已产出的结果引擎不再引用。
+        token 被取消时未完成的用例全部取消 (子进程连同进程组一起结束)，迭代随即结束
+        """
+        # 信号量在事件循环内创建 (3.8/3.9 的信号量绑定创建时的循环)
+        self.limiter = AdaptiveLimiter(self.min_workers, self.max_workers, self.adaptive)
+        self._stages = {name: asyncio.Semaphore(n) for name, n in self.stage_limits.items()}
+        # 工作目录池有容量上限时，等待空闲目录在事件循环中进行，不占着线程阻塞
+        capacity = self.tester.workspaces.capacity
+        self._dir_slots = asyncio.Semaphore(capacity) if capacity else None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="test-engine")
+        self._token = token
+        
+        remaining = iter(cases)
+        running: Set[asyncio.Future] = set()
+        loop = asyncio.get_running_loop()
+        
+        def launch():
+            # 任务数达到上限 (并发上限由 limiter 在其中调整) 后等已有任务完成再补充
+            while len(running) < self.max_workers and not (token is not None and token.cancelled):
+                case = next(remaining, None)
+                if case is None:
+                    return
+                running.add(asyncio.ensure_future(self._run_slot(case)))
+        
+        def cancel_tasks():
+            for task in list(running):
+                task.cancel()
+        
+        def on_cancel():
+            # 在 GUI 线程中调用: 常驻 JVM 直接关闭，协程交给事件循环取消
+            self.tester.close()
+            try:
+                loop.call_soon_threadsafe(cancel_tasks)
+            except RuntimeError:
+                pass  # 事件循环已结束
+        
+        if token is not None:
+            token.add_callback(on_cancel)
+        try:
+            launch()
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                running.difference_update(done)
+                stopped = False
+                for task in done:
+                    try:
+                        item = task.result()
+                    except (asyncio.CancelledError, TestCancelled):
+                        if token is not None and token.cancelled:
+                            stopped = True
+                            continue
+                        raise
+                    yield item
+                if stopped:
+                    break
+                launch()
+        finally:
+            if token is not None:
+                token.remove_callback(on_cancel)
+            cancel_tasks()
+            await asyncio.gather(*running, return_exceptions=True)
+            # 取消时不等待线程中收尾的任务 (Python 模拟器会在下一次检查点退出)
+            self._executor.shutdown(wait=not (token is not None and token.cancelled))
+    
+    async def _run_slot(self, case: TestCase) -> Tuple[TestCase, TestResult]:
+        await self.limiter.acquire()
+        try:
+            start = time.monotonic()
+            result = await self._run_case(case)
+            elapsed = time.monotonic() - start
+            result.phases["total"] = elapsed
+            if self.history is not None and result.status != TestStatus.SKIPPED:
+                self.history.record(case, elapsed)
+            return case, result
+        finally:
+            self.limiter.release()
+    
+    async def _in_thread(self, func: Callable, *args):
+        """
+        在引擎线程池中执行同步函数 (常驻 JVM 按线程分配，线程数即 JVM 数上限)
+        
+        协程被取消后线程中的函数仍会运行到结束，任务记入 _case_jobs，用例的工作目录等它结束后才归还
+        """
+        job = self._executor.submit(func, *args)
+        jobs = _case_jobs.get()
+        if jobs is not None:
+            jobs.append(job)
+        return await asyncio.wrap_future(job)
+    
+    async def _run_case(self, case: TestCase) -> TestResult:
+        tester = self.tester
+        if not case.testfile.exists():
+            return TestResult(TestStatus.SKIPPED, f"找不到测试文件: {case.testfile}")
+        if not tester._is_compiler_ready():
+            return TestResult(TestStatus.SKIPPED, "请先编译项目")
+        
+        _case_jobs.set([])
+        clock = PhaseClock()
+        async with self._lease() as worker_dir:
+            result = await self._run_phases(case, worker_dir, clock)
+            if result.status != TestStatus.COMPILE_ERROR:
+                result.mips_digest = file_digest(worker_dir / "mips.txt")
+        result.phases = clock.durations()
+        result.timeline = dict(clock.spans)
+        return result
+    
+    async def _run_phases(self, case: TestCase, worker_dir: Path, clock: PhaseClock) -> TestResult:
+        # g++ 参考输出与编译+运行并行，编译或运行失败时取消
+        reference = asyncio.ensure_future(self._reference_in_own_dir(case, clock))
+        # Mars 的输出边读边与期望比较，期望输出就绪前先暂存
+        comparator = StreamComparator()
+        reference.add_done_callback(lambda task: _feed_expected(task, comparator))
+        
+        async def perform(request):
+            if isinstance(request, AwaitReference):
+                return await reference
+            return await self._perform(request)
+        
+        try:
+            stage = self.tester._phases(case.testfile, case.input_file, worker_dir, clock, comparator)
+            return await drive_async(stage, perform)
+        finally:
+            comparator.close()
+            if not reference.done():
+                reference.cancel()
+                # 等子进程结束、目录归还后再返回
+                await asyncio.gather(reference, return_exceptions=True)
+    
+    async def _reference_in_own_dir(self, case: TestCase,
+                                   clock: PhaseClock) -> Tuple[Optional[OutputCapture], str]:
+        with clock.phase("reference"):
+            async with self._lease() as ref_dir:
+                stage = self.tester._reference_stage(case.testfile, case.input_file, ref_dir, clock)
+                return await drive_async(stage, self._perform)
+    
+    @asynccontextmanager
+    async def _lease(self) -> AsyncIterator[Path]:
+        """
+        租用工作目录: 名额在事件循环中等待，清空目录在线程中进行
+        
+        用例还有在线程中运行的任务 (取消时不会等待它们) 时，等这些任务结束后才归还，
+        避免下一个用例租到仍在被写入的目录
+        """
+        pool = self.tester.workspaces
+        slots = self._dir_slots
+        start = time.perf_counter()
+        if slots is not None:
+            await slots.acquire()
+        future = asyncio.get_running_loop().run_in_executor(None, pool.acquire, time.perf_counter() - start)
+        try:
+            path = await asyncio.shield(future)
+        except BaseException:
+            # 等待中被取消: 线程里仍会租到目录，租到后立即归还
+            future.add_done_callback(
+                lambda f: None if f.cancelled() or f.exception() else pool.release(f.result())
+            )
+            if slots is not None:
+                slots.release()
+            raise
+        try:
+            yield path
+        finally:
+            self._release_after_jobs(path, slots)
+    
+    def _release_after_jobs(self, path: Path, slots: Optional[asyncio.Semaphore]):
+        pool = self.tester.workspaces
+        jobs = [job for job in (_case_jobs.get() or []) if not job.done()]
+        if not jobs:
+            pool.release(path)
+            if slots is not None:
+                slots.release()
+            return
+        
+        loop = asyncio.get_running_loop()
+        lock = threading.Lock()
+        remaining = [len(jobs)]
+        
+        def on_done(_):
+            # 在工作线程中调用
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            pool.release(path)
+            if slots is not None:
+                try:
+                    loop.call_soon_threadsafe(slots.release)
+                except RuntimeError:
+                    pass  # 事件循环已结束
+        
+        for job in jobs:
+            job.add_done_callback(on_done)
+    
+    async def _perform(self, request):
+        """
+        完成阶段生成器的一个请求 (见 stages 模块): 子进程用 asyncio 启动，同步函数在线程池中执行
+        
+        请求属于某个阶段时先取得该阶段的名额；阶段结束时把是否超时交给 limiter
+        """
+        if isinstance(request, StageFinished):
+            self.limiter.observe(request.timed_out)
+            return None
+        semaphore = self._stages.get(request.stage)
+        if semaphore is None:
+            return await self._launch(request)
+        async with semaphore:
+            return await self._launch(request)
+    
+    async def _launch(self, request):
+        if isinstance(request, Call):
+            # 常驻 JVM 等在线程中调用 tester._token()，由这里给出当前批次的取消令牌
+            return await self._in_thread(self.tester._call_with_token, self._token, request.func, *request.args)
+        
+        input_data = request.input_data.encode("utf-8")
+        try:
+            if request.on_stdout is None:
+                returncode, stdout, stderr = await _exec_async(request.cmd, input_data, request.timeout, request.cwd)
+                return subprocess.CompletedProcess(
+                    request.cmd, returncode, _decode_output(stdout), _decode_output(stderr)
+                )
+            returncode, stderr = await _exec_streaming(
+                request.cmd, input_data, request.timeout, request.cwd, request.on_stdout
+            )
+            return subprocess.CompletedProcess(request.cmd, returncode, None, _decode_output(stderr))
+        except asyncio.TimeoutError:
+            raise subprocess.TimeoutExpired(request.cmd, request.timeout) from None
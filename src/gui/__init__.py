@@ -4,7 +4,6 @@ GUI模块入口 - 现代化界面
 from .app import TestApp, run_gui
 from .theme import COLORS, apply_modern_theme
 from .widgets import AnimatedProgressBar, IconButton, StatusBadge, Card
-from .agent_tab import AgentTab
 
 __all__ = [
     'TestApp', 'run_gui',
@@ -12,3 +11,11 @@ __all__ = [
     'AnimatedProgressBar', 'IconButton', 'StatusBadge', 'Card',
     'AgentTab'
 ]
+
+
+def __getattr__(name):
+    # AI 标签页依赖 agent 模块，首次访问时才导入
+    if name == 'AgentTab':
+        from .agent_tab import AgentTab
+        return AgentTab
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,13 +4,15 @@
 import tkinter as tk
 from tkinter import ttk
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Dict, Optional
 
 from ..config import get_config
 from .theme import apply_modern_theme, COLORS
 from .test_tab import TestTab
-from .editor_tab import EditorTab
-from .agent_tab import AgentTab
+
+if TYPE_CHECKING:
+    from .editor_tab import EditorTab
+    from .agent_tab import AgentTab
 
 
 class TestApp:
@@ -38,8 +40,10 @@ class TestApp:
         
         # 标签页引用
         self.test_tab: Optional[TestTab] = None
-        self.editor_tab: Optional[EditorTab] = None
-        self.agent_tab: Optional[AgentTab] = None
+        self.editor_tab: Optional['EditorTab'] = None
+        self.agent_tab: Optional['AgentTab'] = None
+        # 尚未构建的标签页 {frame 名: 构建函数}，首次切换到该页时构建
+        self._pending_tabs: Dict[str, Callable[[], None]] = {}
         
         # 构建界面
         self._build_ui()
@@ -81,21 +85,38 @@ class TestApp:
         self.test_tab = TestTab(test_frame, self)
         self.test_tab.build()
         
-        # 标签页2: 用例编写
+        # 标签页2/3 在首次切换过去时才构建 (AI 标签页还会导入 agent 模块)
         editor_frame = ttk.Frame(self.notebook)
         self.notebook.add(editor_frame, text="  ✏️ 用例编写  ")
-        self.editor_tab = EditorTab(editor_frame, self)
-        self.editor_tab.build()
+        self._pending_tabs[str(editor_frame)] = lambda: self._build_editor_tab(editor_frame)
         
-        # 标签页3: AI 生成
         agent_frame = ttk.Frame(self.notebook)
         self.notebook.add(agent_frame, text="  🤖 AI 生成  ")
-        self.agent_tab = AgentTab(agent_frame, self)
-        self.agent_tab.build()
+        self._pending_tabs[str(agent_frame)] = lambda: self._build_agent_tab(agent_frame)
+        
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
         
         # 状态栏
         self._build_statusbar(main_container)
     
+    def _on_tab_changed(self, event=None):
+        build = self._pending_tabs.pop(self.notebook.select(), None)
+        if build is not None:
+            build()
+    
+    def _build_editor_tab(self, frame):
+        """标签页2: 用例编写"""
+        from .editor_tab import EditorTab
+        self.editor_tab = EditorTab(frame, self)
+        self.editor_tab.build()
+        self.editor_tab.refresh_libs(set_default=True)
+    
+    def _build_agent_tab(self, frame):
+        """标签页3: AI 生成"""
+        from .agent_tab import AgentTab
+        self.agent_tab = AgentTab(frame, self)
+        self.agent_tab.build()
+    
     def _build_header(self, parent):
         """构建标题栏"""
         header = ttk.Frame(parent)
@@ -156,7 +177,6 @@ class TestApp:
     def _setup(self):
         """初始化设置"""
         self.test_tab.setup_default_project()
-        self.editor_tab.refresh_libs(set_default=True)
     
     def _process_queue(self):
         """处理消息队列"""
@@ -4,7 +4,7 @@ GUI基础组件和工具类
 import tkinter as tk
 from tkinter import ttk
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
 
 from ..config import get_config, Config
 from ..utils import normalize_output
@@ -54,8 +54,13 @@ class OutputMixin:
         self.output_text.config(state=tk.DISABLED)
     
     def _log_failure(self, name: str, status: str, message: str, 
-                     actual: str = None, expected: str = None, max_diff_lines: int = 8):
-        """美观地输出失败信息"""
+                     actual: str = None, expected: str = None, max_diff_lines: int = 8,
+                     load_full: Optional[Callable[[], Tuple[Optional[str], Optional[str]]]] = None):
+        """
+        美观地输出失败信息
+        
+        load_full: 输出较大、actual/expected 只是片段时，点击后读取完整输出再比较
+        """
         self.output_text.config(state=tk.NORMAL)
         
         # 分隔线和标题
@@ -66,48 +71,77 @@ class OutputMixin:
         if message:
             self._log(f"  原因: {message}", 'fail')
         
-        if actual is not None and expected is not None:
-            actual_norm = normalize_output(actual)
-            expected_norm = normalize_output(expected)
-            actual_lines = actual_norm.split('\n')
-            expected_lines = expected_norm.split('\n')
-            
-            # 输出行数统计
-            self._log(f"  行数: 实际 {len(actual_lines)} | 期望 {len(expected_lines)}", 'info')
+        if load_full is not None:
+            self._log("  输出较大，这里只保留了开头和结尾", 'info')
             
-            # 找出差异行
-            diff_lines = []
-            max_len = max(len(actual_lines), len(expected_lines))
-            for i in range(max_len):
-                a = actual_lines[i] if i < len(actual_lines) else ""
-                e = expected_lines[i] if i < len(expected_lines) else ""
-                if a != e:
-                    diff_lines.append((i + 1, a, e))
+            def show_full():
+                full_actual, full_expected = load_full()
+                self._log(f"── {name} 完整输出比较", 'header')
+                self._log_diff(full_actual, full_expected, max_diff_lines)
+                self._log("", None)
             
-            if diff_lines:
-                self._log(f"  差异: {len(diff_lines)} 处", 'warning')
-                
-                for idx, (line_no, actual_line, expected_line) in enumerate(diff_lines[:max_diff_lines]):
-                    self._log(f"  ┌ 第 {line_no} 行", 'dim')
-                    
-                    # 截断过长的行
-                    actual_display = actual_line[:60] + ("..." if len(actual_line) > 60 else "")
-                    expected_display = expected_line[:60] + ("..." if len(expected_line) > 60 else "")
-                    
-                    actual_show = "<空>" if actual_line == "" else actual_display
-                    expected_show = "<空>" if expected_line == "" else expected_display
-                    
-                    self._log(f"  │ 实际: {actual_show}", 'fail')
-                    self._log(f"  └ 期望: {expected_show}", 'pass')
-                
-                if len(diff_lines) > max_diff_lines:
-                    self._log(f"  ... 还有 {len(diff_lines) - max_diff_lines} 处差异", 'dim')
+            self._log_link("  [读取完整输出并比较]", show_full)
+        elif actual is not None and expected is not None:
+            self._log_diff(actual, expected, max_diff_lines)
         
         self._log("", None)
         self.output_text.config(state=tk.DISABLED)
     
+    def _log_diff(self, actual: Optional[str], expected: Optional[str], max_diff_lines: int):
+        """输出行数统计和前几处差异"""
+        if actual is None or expected is None:
+            return
+        actual_norm = normalize_output(actual)
+        expected_norm = normalize_output(expected)
+        actual_lines = actual_norm.split('\n')
+        expected_lines = expected_norm.split('\n')
+        
+        # 输出行数统计
+        self._log(f"  行数: 实际 {len(actual_lines)} | 期望 {len(expected_lines)}", 'info')
+        
+        # 找出差异行
+        diff_lines = []
+        max_len = max(len(actual_lines), len(expected_lines))
+        for i in range(max_len):
+            a = actual_lines[i] if i < len(actual_lines) else ""
+            e = expected_lines[i] if i < len(expected_lines) else ""
+            if a != e:
+                diff_lines.append((i + 1, a, e))
+        
+        if diff_lines:
+            self._log(f"  差异: {len(diff_lines)} 处", 'warning')
+            
+            for idx, (line_no, actual_line, expected_line) in enumerate(diff_lines[:max_diff_lines]):
+                self._log(f"  ┌ 第 {line_no} 行", 'dim')
+                
+                # 截断过长的行
+                actual_display = actual_line[:60] + ("..." if len(actual_line) > 60 else "")
+                expected_display = expected_line[:60] + ("..." if len(expected_line) > 60 else "")
+                
+                actual_show = "<空>" if actual_line == "" else actual_display
+                expected_show = "<空>" if expected_line == "" else expected_display
+                
+                self._log(f"  │ 实际: {actual_show}", 'fail')
+                self._log(f"  └ 期望: {expected_show}", 'pass')
+            
+            if len(diff_lines) > max_diff_lines:
+                self._log(f"  ... 还有 {len(diff_lines) - max_diff_lines} 处差异", 'dim')
+    
+    def _log_link(self, text: str, on_click: Callable[[], None]):
+        """输出一行可点击的文字"""
+        self._link_count = getattr(self, '_link_count', 0) + 1
+        tag = f"link{self._link_count}"
+        self.output_text.tag_configure(tag, foreground=COLORS['accent'], underline=True)
+        self.output_text.tag_bind(tag, "<Button-1>", lambda _event: on_click())
+        self.output_text.tag_bind(tag, "<Enter>", lambda _event: self.output_text.config(cursor="hand2"))
+        self.output_text.tag_bind(tag, "<Leave>", lambda _event: self.output_text.config(cursor=""))
+        self._log(text, tag)
+    
     def _clear_output(self):
         """清空输出"""
         self.output_text.config(state=tk.NORMAL)
         self.output_text.delete(1.0, tk.END)
+        for tag in self.output_text.tag_names():
+            if tag.startswith("link"):
+                self.output_text.tag_delete(tag)
         self.output_text.config(state=tk.DISABLED)
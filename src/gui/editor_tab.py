@@ -216,10 +216,8 @@ class EditorTab(BaseTab):
     
     def refresh_libs(self, set_default: bool = False):
         """刷新测试库列表"""
-        testfiles_dir = self.test_dir / "testfiles"
-        libs = TestDiscovery.discover_test_libs(testfiles_dir)
-        
-        lib_names = [str(lib.relative_to(testfiles_dir)) for lib in libs]
+        # 测试库列表来自测试页的用例索引 (后台扫描完成后会再次调用本方法)
+        lib_names = [rel_path for rel_path, _ in self.app.test_tab.corpus.libs()]
         
         # 生成基于当前时间的默认目录名
         default_name = datetime.now().strftime("%Y%m%d_%H%M")
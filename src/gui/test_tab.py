@@ -13,8 +13,8 @@ import subprocess
 from .base import BaseTab, OutputMixin
 from .theme import COLORS, create_styled_listbox, create_styled_text
 from .widgets import AnimatedProgressBar, IconButton
-from ..discovery import TestDiscovery
-from ..tester import CompilerTester
+from ..discovery import CorpusIndex
+from ..tester import CompilerTester, CancelToken
 
 if TYPE_CHECKING:
     from .app import TestApp
@@ -27,9 +27,15 @@ class TestTab(BaseTab, OutputMixin):
         super().__init__(parent, app)
         self.tester: Optional[CompilerTester] = None
         self.is_running = False
+        self.cancel_token: Optional[CancelToken] = None
         self.message_queue = queue.Queue()
+        self.current_lib: Optional[str] = None
         self.current_lib_path: Optional[Path] = None
         self.case_menu: Optional[tk.Menu] = None
+        # 用例索引在后台线程中扫描，界面只读内存中的结果
+        self.corpus = CorpusIndex.for_root(self.test_dir / "testfiles", self.test_dir / ".tmp")
+        self._corpus_scanning = False
+        self._corpus_pending = False
     
     def build(self):
         """构建测试运行标签页"""
@@ -168,7 +174,14 @@ class TestTab(BaseTab, OutputMixin):
         IconButton(left_btns, icon='play', text='运行当前库',
                    command=self._run_current_lib).pack(side=tk.LEFT, padx=(0, 4))
         IconButton(left_btns, icon='play', text='运行全部',
-                   command=self._run_all, style='Accent.TButton').pack(side=tk.LEFT)
+                   command=self._run_all, style='Accent.TButton').pack(side=tk.LEFT, padx=(0, 4))
+        IconButton(left_btns, icon='refresh', text='重跑失败',
+                   command=self._run_failed).pack(side=tk.LEFT, padx=(0, 4))
+        
+        # 勾选后每种运行方式都先跑上次未通过的用例
+        self.failures_first_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(left_btns, text="失败优先",
+                        variable=self.failures_first_var).pack(side=tk.LEFT, padx=(4, 0))
         
         # 右侧：停止按钮和状态
         right_btns = ttk.Frame(control_frame)
@@ -305,22 +318,58 @@ class TestTab(BaseTab, OutputMixin):
         threading.Thread(target=compile_task, daemon=True).start()
     
     def refresh_lists(self):
-        """刷新测试库列表"""
-        self.lib_listbox.delete(0, tk.END)
-        self.case_listbox.delete(0, tk.END)
+        """在后台重新扫描测试库 (扫描中再次调用时，结束后补扫一次)"""
+        if self._corpus_scanning:
+            self._corpus_pending = True
+            return
+        self._corpus_scanning = True
         
-        testfiles_dir = self.test_dir / "testfiles"
-        libs = TestDiscovery.discover_test_libs(testfiles_dir)
+        def scan_task():
+            try:
+                # 先用上次保存的清单立即显示，再显示扫描结果
+                if not self.corpus.loaded and self.corpus.load():
+                    self.message_queue.put(('corpus', False))
+                self.corpus.refresh()
+            except Exception as e:
+                self.message_queue.put(('corpus_error', str(e)))
+            finally:
+                self.message_queue.put(('corpus', True))
         
-        total_cases = 0
-        for lib in libs:
-            rel_path = lib.relative_to(testfiles_dir)
-            cases = TestDiscovery.discover_in_dir(lib)
-            total_cases += len(cases)
-            self.lib_listbox.insert(tk.END, f"{rel_path} ({len(cases)})")
+        threading.Thread(target=scan_task, daemon=True).start()
+    
+    def _show_corpus(self, final: bool):
+        """用索引中的结果更新测试库列表，保留当前选择"""
+        if final:
+            self._corpus_scanning = False
+            if self._corpus_pending:
+                self._corpus_pending = False
+                self.refresh_lists()
+        libs = self.corpus.libs()
         
+        self.lib_listbox.delete(0, tk.END)
+        selected = None
+        for index, (rel_path, count) in enumerate(libs):
+            self.lib_listbox.insert(tk.END, f"{rel_path} ({count})")
+            if rel_path == self.current_lib:
+                selected = index
         self.lib_count_label.configure(text=f"{len(libs)} 个库")
-        self._log(f"📚 发现 {len(libs)} 个测试库，共 {total_cases} 个用例", 'info')
+        
+        if selected is not None:
+            self.lib_listbox.selection_set(selected)
+            self.lib_listbox.see(selected)
+            self._show_cases(self.current_lib)
+        else:
+            self.current_lib = None
+            self.current_lib_path = None
+            self.case_listbox.delete(0, tk.END)
+        
+        if final:
+            total_cases = sum(count for _, count in libs)
+            rescanned, total_dirs = self.corpus.last_stats
+            self._log(f"📚 发现 {len(libs)} 个测试库，共 {total_cases} 个用例 "
+                      f"(重新扫描 {rescanned}/{total_dirs} 个目录)", 'info')
+            if self.app.editor_tab:
+                self.app.editor_tab.refresh_libs()
     
     def _on_lib_select(self, event):
         """选择测试库时更新用例列表"""
@@ -328,11 +377,16 @@ class TestTab(BaseTab, OutputMixin):
         if not selection:
             return
         
+        lib_name = self.lib_listbox.get(selection[0]).rsplit(' (', 1)[0]
+        self._show_cases(lib_name)
+    
+    def _show_cases(self, lib_name: str):
+        """显示测试库的用例 (只读内存中的索引)"""
         self.case_listbox.delete(0, tk.END)
-        lib_name = self.lib_listbox.get(selection[0]).split(' (')[0]
+        self.current_lib = lib_name
         self.current_lib_path = self.test_dir / "testfiles" / lib_name
         
-        cases = TestDiscovery.discover_in_dir(self.current_lib_path)
+        cases = self.corpus.cases(lib_name)
         for case in cases:
             self.case_listbox.insert(tk.END, case.name)
         
@@ -355,7 +409,7 @@ class TestTab(BaseTab, OutputMixin):
         if not selection:
             return None
         
-        all_cases = TestDiscovery.discover_in_dir(lib_path)
+        all_cases = self.corpus.cases(self.current_lib)
         idx = selection[0]
         if idx < 0 or idx >= len(all_cases):
             return None
@@ -428,8 +482,8 @@ class TestTab(BaseTab, OutputMixin):
             messagebox.showwarning("提示", "请选择要运行的测试用例")
             return
         
-        all_cases = TestDiscovery.discover_in_dir(lib_path)
-        selected_cases = [all_cases[i] for i in case_selection]
+        all_cases = self.corpus.cases(self.current_lib)
+        selected_cases = [all_cases[i] for i in case_selection if i < len(all_cases)]
         self._run_tests(selected_cases, f"运行 {len(selected_cases)} 个选中测试")
     
     def _run_current_lib(self):
@@ -439,23 +493,39 @@ class TestTab(BaseTab, OutputMixin):
             messagebox.showwarning("提示", "请先选择测试库")
             return
         
-        cases = TestDiscovery.discover_in_dir(lib_path)
+        cases = self.corpus.cases(self.current_lib)
         self._run_tests(cases, f"运行测试库: {lib_path.name}")
     
-    def _run_all(self):
-        """运行所有测试"""
-        testfiles_dir = self.test_dir / "testfiles"
-        libs = TestDiscovery.discover_test_libs(testfiles_dir)
-        
+    def _all_cases(self) -> list:
+        """所有测试库的用例 (名称带测试库名)"""
         all_cases = []
-        for lib in libs:
-            cases = TestDiscovery.discover_in_dir(lib)
+        for lib, _ in self.corpus.libs():
+            cases = self.corpus.cases(lib)
             for case in cases:
-                case.name = f"{lib.name}/{case.name}"
+                case.name = f"{lib.rsplit('/', 1)[-1]}/{case.name}"
             all_cases.extend(cases)
-        
+        return all_cases
+    
+    def _run_all(self):
+        """运行所有测试"""
+        all_cases = self._all_cases()
         self._run_tests(all_cases, f"运行所有测试 ({len(all_cases)} 个)")
     
+    def _run_failed(self):
+        """只运行上次未通过的用例 (来自 .tmp/results.db)"""
+        import sqlite3
+        from ..results_db import default_store
+        
+        try:
+            failed = default_store(self.test_dir).failed_cases(self._all_cases())
+        except sqlite3.Error as e:
+            messagebox.showerror("错误", f"读取运行记录失败: {e}")
+            return
+        if not failed:
+            messagebox.showinfo("提示", "没有上次未通过的用例")
+            return
+        self._run_tests(failed, f"重跑上次未通过的用例 ({len(failed)} 个)")
+    
     def _run_tests(self, cases: list, title: str):
         """运行测试"""
         if self.is_running:
@@ -467,14 +537,20 @@ class TestTab(BaseTab, OutputMixin):
             return
         
         self.is_running = True
+        self.cancel_token = CancelToken()
         self.stop_btn.configure(state=tk.NORMAL)
         self._clear_output()
         self.progress.set(0)
         self.result_label.configure(text="")
         
         max_workers = self.config.parallel.max_workers
+        failures_first = self.failures_first_var.get()
         self._log(f"🚀 {title}", 'header')
-        self._log(f"   并行线程: {max_workers}", 'dim')
+        parallel = self.config.parallel
+        if parallel.adaptive:
+            self._log(f"   并行用例: {min(parallel.min_workers, max_workers)}~{max_workers} (自适应)", 'dim')
+        else:
+            self._log(f"   并行用例: {max_workers}", 'dim')
         
         def test_task():
             self.tester = CompilerTester(self.app.project_dir, self.test_dir)
@@ -494,26 +570,29 @@ class TestTab(BaseTab, OutputMixin):
             
             passed, failed = 0, 0
             
-            def on_result(case, result, progress):
-                nonlocal passed, failed
-                if not self.is_running:
-                    return
-                
-                if result.passed:
-                    passed += 1
-                    self.message_queue.put(('result', case.name, result, True))
-                else:
-                    failed += 1
-                    self.message_queue.put(('result', case.name, result, False))
-                
-                self.message_queue.put(('progress', progress, f"{passed + failed}/{len(cases)}"))
-            
             try:
-                self.tester.test_parallel(cases, max_workers, callback=on_result)
+                # 逐个取结果，通过的用例不保留输出
+                for case, result in self.tester.iter_parallel(cases, max_workers, token=self.cancel_token,
+                                                              failures_first=failures_first):
+                    if not self.is_running:
+                        continue
+                    
+                    if result.passed:
+                        passed += 1
+                        self.message_queue.put(('result', case.name, None, True))
+                    else:
+                        failed += 1
+                        self.message_queue.put(('result', case.name, result, False))
+                    
+                    done = passed + failed
+                    self.message_queue.put(('progress', done / len(cases) * 100, f"{done}/{len(cases)}"))
             except Exception as e:
                 self.message_queue.put(('error', str(e)))
                 return
             
+            if self.tester.last_summary:
+                self.message_queue.put(('summary', self.tester.last_summary.format_lines()))
+            
             if self.is_running:
                 self.message_queue.put(('done', passed, failed))
             else:
@@ -522,8 +601,10 @@ class TestTab(BaseTab, OutputMixin):
         threading.Thread(target=test_task, daemon=True).start()
     
     def _stop_test(self):
-        """停止测试"""
+        """停止测试 (结束正在运行的子进程，保留已完成的结果)"""
         self.is_running = False
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
     
     # ========== 消息处理 ==========
     
@@ -538,6 +619,14 @@ class TestTab(BaseTab, OutputMixin):
                     self.status_var.set(status)
                     self._log(f"⏳ {status}", 'info')
                 
+                elif msg[0] == 'corpus':
+                    _, final = msg
+                    self._show_corpus(final)
+                
+                elif msg[0] == 'corpus_error':
+                    _, error_msg = msg
+                    self._log(f"✗ 扫描测试库失败: {error_msg}", 'error')
+                
                 elif msg[0] == 'compile_done':
                     _, success, text = msg
                     icon = '✓' if success else '✗'
@@ -564,9 +653,15 @@ class TestTab(BaseTab, OutputMixin):
                             status=result.status.value,
                             message=result.message or "",
                             actual=result.actual_output,
-                            expected=result.expected_output
+                            expected=result.expected_output,
+                            load_full=result.full_outputs if result.actual_path or result.expected_path else None
                         )
                 
+                elif msg[0] == 'summary':
+                    _, lines = msg
+                    for line in lines:
+                        self._log(f"   {line}", 'dim')
+                
                 elif msg[0] == 'error':
                     _, error_msg = msg
                     self._log(f"✗ 错误: {error_msg}", 'error')
@@ -0,0 +1,144 @@
+"""
+用例耗时历史 - 记录每个用例上次的执行时间，用于按耗时从长到短调度
+"""
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .cache import hash_parts
+from .models import TestCase
+
+
+def case_fingerprint(case: TestCase) -> str:
+    """用例内容 (源码 + 输入) 的哈希"""
+    try:
+        source = case.testfile.read_bytes()
+    except OSError:
+        source = b""
+    try:
+        input_data = case.input_file.read_bytes() if case.input_file else b""
+    except OSError:
+        input_data = b""
+    return hash_parts(source, input_data)
+
+
+class DurationHistory:
+    """
+    按测试文件路径保存的耗时记录 {路径: [内容哈希, 秒数]}
+
+    内容未变时用指数滑动平均更新，变化后直接替换。
+    没有记录的用例按已知用例的 "秒/字节" 中位数乘以文件大小估计。
+    """
+
+    ALPHA = 0.5
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, list]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, list]:
+        if self._data is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            # 手工修改或写坏的记录直接丢弃
+            self._data = {
+                key: [entry[0], float(entry[1])]
+                for key, entry in (data.items() if isinstance(data, dict) else ())
+                if self._valid_entry(entry)
+            }
+        return self._data
+
+    @staticmethod
+    def _valid_entry(entry) -> bool:
+        """[内容哈希, 非负秒数]"""
+        return (
+            isinstance(entry, list) and len(entry) == 2 and isinstance(entry[0], str)
+            and isinstance(entry[1], (int, float)) and not isinstance(entry[1], bool)
+            and 0 <= entry[1] < float("inf")
+        )
+
+    @staticmethod
+    def _key(case: TestCase) -> str:
+        return str(case.testfile.resolve())
+
+    def record(self, case: TestCase, seconds: float, fingerprint: Optional[str] = None):
+        """记录一次执行耗时"""
+        fingerprint = fingerprint or case_fingerprint(case)
+        key = self._key(case)
+        with self._lock:
+            data = self._load()
+            old = data.get(key)
+            if old and old[0] == fingerprint:
+                seconds = self.ALPHA * seconds + (1 - self.ALPHA) * old[1]
+            data[key] = [fingerprint, round(seconds, 4)]
+            self._dirty = True
+
+    def order(self, cases: List[TestCase]) -> Tuple[List[TestCase], int]:
+        """
+        按预计耗时从长到短排序
+
+        Returns:
+            (排序后的用例, 有历史记录的用例数)
+        """
+        from statistics import median
+        
+        with self._lock:
+            data = dict(self._load())
+        rates = []
+        for key, (_, seconds) in data.items():
+            try:
+                size = os.path.getsize(key)
+            except OSError:
+                continue
+            if size > 0:
+                rates.append(seconds / size)
+        rate = median(rates) if rates else 0.0
+
+        known = 0
+        estimates = []
+        for index, case in enumerate(cases):
+            entry = data.get(self._key(case))
+            if entry is not None:
+                # 内容变化后旧耗时仍是不错的估计
+                estimate = entry[1]
+                known += 1
+            else:
+                try:
+                    size = case.testfile.stat().st_size
+                except OSError:
+                    size = 0
+                # 没有任何历史时按文件大小排序
+                estimate = size * rate if rate else size * 1e-9
+            estimates.append((-estimate, index, case))
+        estimates.sort(key=lambda item: (item[0], item[1]))
+        return [case for _, _, case in estimates], known
+
+    def save(self):
+        """写回磁盘 (先写临时文件再替换)"""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return
+            payload = json.dumps(self._data, ensure_ascii=False)
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_name, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            pass
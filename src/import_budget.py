@@ -0,0 +1,99 @@
+"""
+导入耗时检查 - 在全新的解释器中测量 import src.tester 的耗时，并确认不会加载 GUI/网络相关模块
+
+    python -m src.import_budget [预算毫秒数] [次数]
+
+总耗时超出预算 (默认 75 ms)、项目自身模块 (src.*) 的耗时超出 OWN_BUDGET_MS，
+或加载了不该加载的模块时退出码为 1。总耗时中有一大半是 pathlib/dataclasses/subprocess 等
+标准库，项目模块的耗时与机器快慢关系较小，更容易发现新增的导入期开销。
+设置了 PYTHONDONTWRITEBYTECODE 时先运行 python -m compileall src，否则测到的包含编译源码的时间。
+"""
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+# 核心模块 (src.tester) 不应加载的模块: GUI、AI 客户端，以及只在批量运行时才需要的重量级模块
+FORBIDDEN_MODULES = ("tkinter", "httpx", "yaml", "asyncio")
+
+DEFAULT_BUDGET_MS = 75
+# 项目自身模块 (src.*) 的自身耗时之和的上限
+OWN_BUDGET_MS = 20
+
+# 子进程中屏蔽 tkinter/httpx，模拟没有安装它们的服务器
+_CHILD_CODE = """
+import sys
+sys.modules['tkinter'] = None
+sys.modules['httpx'] = None
+import src.tester
+print(' '.join(m for m in {forbidden!r} if m in sys.modules and sys.modules[m] is not None))
+"""
+
+
+def _measure_once(root: Path) -> Tuple[float, Dict[str, int], List[str]]:
+    """
+    Returns:
+        (src.tester 累计导入毫秒数, {模块: 自身耗时微秒}, 加载了的禁止模块)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD_CODE.format(forbidden=FORBIDDEN_MODULES)],
+        capture_output=True, text=True, cwd=str(root)
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败")
+
+    total_us = 0
+    self_times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # 表头
+        name = parts[2].strip()
+        self_times[name] = self_us
+        if name == "src.tester":
+            total_us = max(total_us, cumulative_us)
+        elif name == "src" and total_us == 0:
+            total_us = cumulative_us
+    loaded = result.stdout.split()
+    return total_us / 1000, self_times, loaded
+
+
+def check(budget_ms: float, runs: int = 5) -> bool:
+    """取多次测量中最快的一次与预算比较"""
+    root = Path(__file__).parent.parent
+    best = None
+    for _ in range(runs):
+        total_ms, self_times, loaded = _measure_once(root)
+        if best is None or total_ms < best[0]:
+            best = (total_ms, self_times, loaded)
+    total_ms, self_times, loaded = best
+
+    own_ms = sum(us for name, us in self_times.items() if name == "src" or name.startswith("src.")) / 1000
+    ok = True
+    print(f"import src.tester: {total_ms:.1f} ms (预算 {budget_ms:.0f} ms，{runs} 次中最快)")
+    print(f"  其中项目模块: {own_ms:.1f} ms (预算 {OWN_BUDGET_MS} ms)")
+    if total_ms > budget_ms or own_ms > OWN_BUDGET_MS:
+        ok = False
+        print("最慢的模块 (自身耗时):")
+        for name, us in sorted(self_times.items(), key=lambda item: -item[1])[:10]:
+            print(f"  {us / 1000:6.1f} ms  {name}")
+    if loaded:
+        ok = False
+        print(f"不应在导入时加载的模块: {', '.join(loaded)}")
+    return ok
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    try:
+        passed = check(budget, count)
+    except RuntimeError as e:
+        print(f"导入 src.tester 失败 (已屏蔽 tkinter/httpx): {e}")
+        passed = False
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,237 @@
+"""
+JVM 启动优化 - 为 Compiler.jar / Mars.jar 生成 AppCDS 归档，并附加偏向启动速度的 JVM 参数
+"""
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .build import single_flight, sha256_file, tool_identity
+from .cache import hash_parts
+
+
+# 训练运行用的最小输入: 走一遍词法/语法/代码生成和 Mars 的汇编/执行路径，加载的类基本覆盖正常用例
+COMPILER_TRAINING_FILES = {
+    "testfile.txt": "int main() {\n    int a = getint();\n    printf(\"%d\\n\", a + 1);\n    return 0;\n}\n",
+}
+COMPILER_TRAINING_INPUT = b"1\n"
+MARS_TRAINING_FILES = {
+    "mips.txt": (
+        ".data\nmsg: .asciiz \"\\n\"\n.text\n"
+        "li $v0, 5\nsyscall\nmove $a0, $v0\nli $v0, 1\nsyscall\n"
+        "la $a0, msg\nli $v0, 4\nsyscall\nli $v0, 10\nsyscall\n"
+    ),
+}
+MARS_TRAINING_ARGS = ["nc", "mips.txt"]
+MARS_TRAINING_INPUT = b"1\n"
+# 吞吐量测试: 执行上千万条指令的循环，JIT 的影响 (如只用 C1) 在这里才体现出来
+MARS_THROUGHPUT_FILES = {
+    "mips.txt": (
+        ".text\nli $t0, 0\nli $t1, 5000000\n"
+        "loop:\naddiu $t0, $t0, 1\nxor $t2, $t0, $t1\nbne $t0, $t1, loop\n"
+        "move $a0, $t0\nli $v0, 1\nsyscall\nli $v0, 10\nsyscall\n"
+    ),
+}
+
+# 使用归档时 JVM 的 CDS 警告默认打印到 stdout，会混进被测程序的输出
+_QUIET_LOG = ["-Xlog:disable", "-Xlog:all=warning:stderr"]
+
+
+class JvmProfile:
+    """
+    启动 jar 的命令: 配置中的 JVM 参数 + (已生成时) 该 jar 的 AppCDS 归档
+
+    归档按 jar 内容哈希、java 可执行文件和 JVM 参数命名，任一变化都会换用新归档；
+    归档由 ensure_archive 通过一次训练运行 (-XX:ArchiveClassesAtExit) 生成。
+    JDK 不支持动态归档时记下来，之后不再尝试。
+    """
+
+    TRAINING_TIMEOUT = 60
+
+    def __init__(self, java_cmd: str, options, archive_dir: Path):
+        self.java_cmd = java_cmd
+        self.options = options
+        self.archive_dir = Path(archive_dir)
+        self._lock = threading.Lock()
+        self._digests: Dict[str, Tuple[tuple, str]] = {}
+        self._java_id: Optional[str] = None
+        self._unsupported = False
+
+    @property
+    def cds_enabled(self) -> bool:
+        return bool(self.options.enabled and self.options.class_data_sharing and not self._unsupported)
+
+    def command(self, jar: Path, args: Sequence[str] = ()) -> List[str]:
+        """运行 jar 的命令"""
+        cmd = [self.java_cmd] + self.options.args()
+        archive = self.archive_for(jar)
+        if archive is not None:
+            # 类路径须与生成归档时一致
+            cmd += _QUIET_LOG + [f"-XX:SharedArchiveFile={archive}"]
+            jar = Path(jar).resolve()
+        return cmd + ["-jar", str(jar)] + list(args)
+
+    def archive_for(self, jar: Path) -> Optional[Path]:
+        """jar 当前内容对应的归档，尚未生成时返回 None"""
+        if not self.cds_enabled:
+            return None
+        path = self._archive_path(jar)
+        return path if path is not None and path.exists() else None
+
+    def _jar_digest(self, jar: Path) -> str:
+        """jar 的内容哈希与 (size, mtime)，按 (size, mtime) 复用 (JVM 也会校验 jar 的修改时间)"""
+        try:
+            st = Path(jar).stat()
+        except OSError:
+            return ""
+        signature = (st.st_size, st.st_mtime_ns)
+        key = str(jar)
+        with self._lock:
+            cached = self._digests.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+        try:
+            digest = f"{sha256_file(Path(jar))}:{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            return ""
+        with self._lock:
+            self._digests[key] = (signature, digest)
+        return digest
+
+    def _archive_path(self, jar: Path) -> Optional[Path]:
+        digest = self._jar_digest(jar)
+        if not digest:
+            return None
+        if self._java_id is None:
+            self._java_id = tool_identity(self.java_cmd)
+        key = hash_parts(digest, self._java_id, *self.options.args())[:16]
+        return self.archive_dir / f"{Path(jar).stem}-{key}.jsa"
+
+    def ensure_archive(self, jar: Path, files: Dict[str, str], args: Sequence[str] = (),
+                       input_data: bytes = b"") -> Tuple[bool, str]:
+        """
+        确保 jar 的 AppCDS 归档存在 (已存在或未启用时立即返回)
+
+        Args:
+            files: 训练运行前写入临时工作目录的文件 {文件名: 内容}
+            args: 传给 jar 的参数
+            input_data: 训练运行的标准输入
+
+        Returns:
+            (是否可用, 信息) - 新生成或失败时信息非空
+        """
+        if not self.cds_enabled:
+            return False, ""
+        path = self._archive_path(jar)
+        if path is None:
+            return False, f"找不到 {Path(jar).name}"
+        if path.exists():
+            return True, ""
+        return single_flight(f"cds:{path}", lambda: self._create_archive(Path(jar), path, files, args, input_data))
+
+    def _create_archive(self, jar: Path, path: Path, files: Dict[str, str],
+                        args: Sequence[str], input_data: bytes) -> Tuple[bool, str]:
+        if path.exists():
+            return True, ""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        # 同一 jar 的旧归档已经失效
+        for old in self.archive_dir.glob(f"{jar.stem}-*.jsa"):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="sysytest_cds_") as cwd:
+            for name, content in files.items():
+                Path(cwd, name).write_text(content, encoding="utf-8")
+            cmd = [self.java_cmd] + self.options.args() + [
+                f"-XX:ArchiveClassesAtExit={tmp_path}", "-jar", str(jar.resolve())
+            ] + list(args)
+            try:
+                result = subprocess.run(
+                    cmd, input=input_data, capture_output=True, cwd=cwd, timeout=self.TRAINING_TIMEOUT
+                )
+                stderr = result.stderr.decode("utf-8", errors="replace")
+            except subprocess.TimeoutExpired:
+                stderr = "训练运行超时"
+            except FileNotFoundError as e:
+                self._unsupported = True
+                return False, f"找不到命令: {e.filename}，跳过 CDS 归档"
+
+        if not tmp_path.exists():
+            if "ArchiveClassesAtExit" in stderr or "Unrecognized VM option" in stderr:
+                self._unsupported = True
+                return False, "当前 JDK 不支持 AppCDS 动态归档 (需要 JDK 13+)，已跳过"
+            return False, f"生成 {jar.name} 的 CDS 归档失败: {stderr.strip()[-300:]}"
+        os.replace(tmp_path, path)
+        return True, f"已生成 {jar.name} 的 CDS 归档 ({time.perf_counter() - start:.1f}s)"
+
+
+def _time_runs(cmd: List[str], cwd: str, input_data: bytes, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run(cmd, input=input_data, capture_output=True, cwd=cwd, timeout=JvmProfile.TRAINING_TIMEOUT)
+    return (time.perf_counter() - start) / runs
+
+
+def _benchmark(compiler_jar: Optional[Path], runs: int):
+    """对比默认参数、调优参数、调优参数 + CDS 三种方式的 JVM 启动开销，以及 Mars 长时间运行的吞吐量"""
+    from .config import get_config
+
+    config = get_config()
+    java = config.tools.get_java()
+    options = config.tools.jvm_options
+    mars_jar = (Path(__file__).parent / "Mars.jar").resolve()
+    profile = JvmProfile(java, options, Path(__file__).parent.parent / ".tmp" / "cds")
+
+    targets = [("Mars.jar", mars_jar, MARS_TRAINING_FILES, MARS_TRAINING_ARGS, MARS_TRAINING_INPUT)]
+    if compiler_jar is not None:
+        targets.append(("Compiler.jar", compiler_jar.resolve(), COMPILER_TRAINING_FILES, [], COMPILER_TRAINING_INPUT))
+
+    print(f"JVM 参数: {' '.join(options.args()) or '(无)'}")
+    for name, jar, files, args, input_data in targets:
+        ok, msg = profile.ensure_archive(jar, files, args, input_data)
+        if msg:
+            print(msg)
+        with tempfile.TemporaryDirectory(prefix="sysytest_bench_") as cwd:
+            for file_name, content in files.items():
+                Path(cwd, file_name).write_text(content, encoding="utf-8")
+            rows = [
+                ("默认参数", [java, "-jar", str(jar)] + list(args)),
+                ("调优参数", [java] + options.args() + ["-jar", str(jar)] + list(args)),
+            ]
+            if ok:
+                rows.append(("调优参数 + CDS", profile.command(jar, args)))
+            print(f"{name}:")
+            for label, cmd in rows:
+                try:
+                    print(f"  {label}: {_time_runs(cmd, cwd, input_data, runs) * 1000:.1f} ms/次")
+                except FileNotFoundError as e:
+                    print(f"找不到命令: {e.filename}")
+                    return
+
+    # 启动快的参数不一定适合运行很久的程序，调优参数比默认参数慢很多时不要用作默认
+    print("Mars.jar 吞吐量 (约 1500 万条指令):")
+    with tempfile.TemporaryDirectory(prefix="sysytest_bench_") as cwd:
+        for file_name, content in MARS_THROUGHPUT_FILES.items():
+            Path(cwd, file_name).write_text(content, encoding="utf-8")
+        for label, jvm_args in (("默认参数", []), ("调优参数", options.args())):
+            cmd = [java] + jvm_args + ["-jar", str(mars_jar)] + MARS_TRAINING_ARGS
+            print(f"  {label}: {_time_runs(cmd, cwd, b'', 1):.2f} s")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] in ("-h", "--help"):
+        print("用法: python -m src.jvm_profile [Compiler.jar] [次数]")
+        sys.exit(0)
+    _benchmark(
+        Path(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "-" else None,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    )
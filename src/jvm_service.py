@@ -0,0 +1,182 @@
+"""
+常驻 JVM 服务 - 启动一次 JVM，通过 stdin/stdout 帧协议反复提交任务
+
+协议 (与 src/MarsServer.java、src/CompilerHarness.java 一致):
+    启动: 服务端输出 "READY 0\\n"
+    请求: "RUN <timeout_ms> <len1> <len2> ...\\n" + 各段负载
+    响应: "<状态> <len>\\n" + 响应体
+"""
+import os
+import atexit
+import subprocess
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+class ServiceStartError(RuntimeError):
+    """JVM 没有在期限内输出 READY (启动失败或卡住)"""
+
+
+class JvmService:
+    """单个常驻 JVM 进程 (非线程安全，由 JvmServicePool 按线程分配)"""
+
+    # JVM 自身无响应时，超过请求超时多久强制结束
+    WATCHDOG_GRACE = 5.0
+
+    def __init__(self, cmd: List[str], cwd: Path):
+        self.cmd = cmd
+        self.cwd = cwd
+        self.proc: Optional[subprocess.Popen] = None
+
+    def _start(self, timeout: float):
+        """启动 JVM 并等待 READY，与请求一样由看门狗限时 (卡住时结束进程)"""
+        self.cwd.mkdir(parents=True, exist_ok=True)
+        self.proc = subprocess.Popen(
+            self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, cwd=str(self.cwd)
+        )
+        watchdog = threading.Timer(timeout + self.WATCHDOG_GRACE, self.close)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            status, body = self._read_reply()
+        except (OSError, ValueError, EOFError, AttributeError):
+            status, body = None, b""
+        finally:
+            watchdog.cancel()
+        if status != "READY":
+            self.close()
+            raise ServiceStartError(f"服务启动失败: {self.cmd[-1]} {body.decode('utf-8', errors='replace')}".rstrip())
+
+    def _read_reply(self) -> Tuple[str, bytes]:
+        header = self.proc.stdout.readline()
+        if not header:
+            raise EOFError("服务进程已退出")
+        status, length = header.decode("ascii", errors="replace").split()
+        body = self.proc.stdout.read(int(length))
+        return status, body
+
+    def request(self, timeout: float, *payloads: bytes) -> Tuple[Optional[str], bytes]:
+        """
+        提交一个任务
+
+        Returns:
+            (状态, 响应体) - 进程退出或卡死时状态为 None，下次调用时自动重启
+
+        Raises:
+            ServiceStartError: JVM 启动失败或超过期限没有就绪
+        """
+        if self.proc is None or self.proc.poll() is not None:
+            self._start(timeout)
+
+        lengths = " ".join(str(len(p)) for p in payloads)
+        header = f"RUN {int(timeout * 1000)} {lengths}".rstrip() + "\n"
+
+        watchdog = threading.Timer(timeout + self.WATCHDOG_GRACE, self.close)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            self.proc.stdin.write(header.encode("ascii") + b"".join(payloads))
+            self.proc.stdin.flush()
+            return self._read_reply()
+        except (OSError, ValueError, EOFError, AttributeError):
+            self.close()
+            return None, b""
+        finally:
+            watchdog.cancel()
+
+    def close(self):
+        """结束 JVM"""
+        proc = self.proc
+        self.proc = None
+        if proc is None:
+            return
+        try:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait(timeout=5)
+        except Exception:
+            pass
+        for stream in (proc.stdin, proc.stdout):
+            try:
+                if stream:
+                    stream.close()
+            except Exception:
+                pass
+
+
+class JvmServicePool:
+    """按线程分配的常驻 JVM 服务池，首次使用时用 javac 编译服务端源码"""
+
+    def __init__(self, source: Path, classes_dir: Path, classpath: List[Path], args: List[str],
+                 java_cmd: str = "java", javac_cmd: str = "javac"):
+        self.source = Path(source)
+        self.classes_dir = Path(classes_dir)
+        self.classpath = [Path(p) for p in classpath]
+        self.args = args
+        self.java_cmd = java_cmd
+        self.javac_cmd = javac_cmd
+        self._local = threading.local()
+        self._services: List[JvmService] = []
+        self._lock = threading.Lock()
+        self._built: Optional[Tuple[bool, str]] = None
+        atexit.register(self.close_all)
+
+    @property
+    def main_class(self) -> str:
+        return self.source.stem
+
+    def ensure_built(self, timeout: float = 120) -> Tuple[bool, str]:
+        """编译服务端 (源码或依赖比 class 新时才重新编译)"""
+        with self._lock:
+            if self._built is not None:
+                return self._built
+
+            class_file = self.classes_dir / f"{self.main_class}.class"
+            try:
+                newest = max([self.source.stat().st_mtime] + [p.stat().st_mtime for p in self.classpath])
+                if class_file.exists() and class_file.stat().st_mtime >= newest:
+                    self._built = (True, "")
+                    return self._built
+
+                self.classes_dir.mkdir(parents=True, exist_ok=True)
+                cmd = [self.javac_cmd, "-encoding", "UTF-8", "-nowarn", "-d", str(self.classes_dir)]
+                if self.classpath:
+                    cmd += ["-cp", os.pathsep.join(str(p) for p in self.classpath)]
+                result = subprocess.run(
+                    cmd + [str(self.source)],
+                    capture_output=True, text=True, errors="replace", timeout=timeout
+                )
+                if result.returncode != 0:
+                    self._built = (False, f"{self.source.name}编译失败:\n{result.stderr}")
+                else:
+                    self._built = (True, "")
+            except subprocess.TimeoutExpired:
+                self._built = (False, f"{self.source.name}编译超时")
+            except OSError as e:
+                self._built = (False, f"{self.source.name}编译失败: {e}")
+            return self._built
+
+    def _command(self) -> List[str]:
+        classpath = os.pathsep.join([str(p) for p in self.classpath] + [str(self.classes_dir)])
+        return [self.java_cmd, "-cp", classpath, self.main_class] + self.args
+
+    def get(self) -> JvmService:
+        """获取当前线程的服务 (首次调用时创建)"""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            with self._lock:
+                cwd = self.classes_dir / f"run_{len(self._services)}"
+                service = JvmService(self._command(), cwd)
+                self._services.append(service)
+            self._local.service = service
+        return service
+
+    def close_all(self):
+        """关闭所有 JVM"""
+        with self._lock:
+            services, self._services = self._services, []
+            self._local = threading.local()
+        for service in services:
+            service.close()
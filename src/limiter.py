@@ -0,0 +1,156 @@
+"""
+自适应并发控制 - 根据超时率、系统负载和可用内存调整同时进行的用例数
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+
+@dataclass
+class LimiterDecision:
+    """一次并发上限调整"""
+    elapsed: float   # 距开始的秒数
+    old: int
+    new: int
+    reason: str
+
+    def format(self) -> str:
+        return f"{self.elapsed:6.1f}s  {self.old} → {self.new}  {self.reason}"
+
+
+def _available_memory() -> Optional[int]:
+    """可用内存字节数 (仅 Linux，其他平台返回 None)"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _load_per_cpu() -> Optional[float]:
+    """1 分钟平均负载 / CPU 数 (Windows 上返回 None)"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 并发控制器 (在单个事件循环内使用)
+
+    从 ceiling 开始 (用例不多的批次也能用满并发)，出现过载信号后乘性减小、之后每轮加一，
+    上限在 [floor, ceiling] 之间。一轮 = 完成与当前上限相同数量的用例。
+    idle_seconds 累计有用例在跑时空闲名额 × 时间 (长尾越短越小)。
+
+    过载信号: 本轮超时率过高、可用内存不足；系统负载过高时只是暂停增长。
+    不看阶段延迟: 一轮中恰好都是耗时长的用例 (递归较深的程序、--ff 集中排在前面的失败用例)
+    并不说明机器过载。adaptive=False 时固定为 ceiling。
+    """
+
+    DECREASE_FACTOR = 0.7
+    TIMEOUT_RATE = 0.2         # 本轮超时占比达到此值视为过载
+    LOAD_PER_CPU = 2.0         # 超过后暂停增长
+    MIN_FREE_MEMORY = 512 * 1024 * 1024
+
+    def __init__(self, floor: int, ceiling: int, adaptive: bool = True):
+        self.ceiling = max(1, ceiling)
+        self.floor = max(1, min(floor, self.ceiling))
+        self.adaptive = adaptive
+        self.limit = self.ceiling
+        self.peak = self.limit
+        self.decisions: List[LimiterDecision] = []
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._completed = 0
+        self._samples = 0
+        self._timeouts = 0
+        self._start = time.monotonic()
+        self._last_change = self._start
+        self.idle_seconds = 0.0
+
+    async def acquire(self):
+        """占用一个名额，达到上限时排队等待"""
+        if self._in_flight < self.limit and not self._waiters:
+            self._account()
+            self._in_flight += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 名额已经移交给本任务
+                self._account()
+                self._in_flight -= 1
+                self._wake()
+            elif fut in self._waiters:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self):
+        """归还名额，每完成一轮评估一次是否调整上限"""
+        self._account()
+        self._in_flight -= 1
+        self._completed += 1
+        if self.adaptive and self._completed >= self.limit:
+            self._completed = 0
+            self._adjust()
+        self._wake()
+
+    def observe(self, timed_out: bool = False):
+        """记录一次实际执行的阶段 (命中缓存的不记录)"""
+        self._samples += 1
+        if timed_out:
+            self._timeouts += 1
+
+    def _account(self):
+        """在名额占用或上限变化前累计空闲名额时间"""
+        now = time.monotonic()
+        if self._in_flight > 0:
+            self.idle_seconds += max(0, self.limit - self._in_flight) * (now - self._last_change)
+        self._last_change = now
+
+    def _wake(self):
+        # 直接把名额移交给排队的任务，避免被后来者抢占
+        while self._waiters and self._in_flight < self.limit:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self._account()
+                self._in_flight += 1
+                fut.set_result(None)
+
+    def _adjust(self):
+        reason = self._overload_reason()
+        if reason:
+            self._set_limit(max(self.floor, int(self.limit * self.DECREASE_FACTOR)), reason)
+        elif self._waiters and self.limit < self.ceiling:
+            load = _load_per_cpu()
+            if load is None or load < self.LOAD_PER_CPU:
+                self._set_limit(min(self.ceiling, self.limit + 1), "加性增长")
+        self._samples = 0
+        self._timeouts = 0
+
+    def _overload_reason(self) -> str:
+        if self._timeouts and self._timeouts / self._samples >= self.TIMEOUT_RATE:
+            return f"超时率 {self._timeouts}/{self._samples}"
+
+        free = _available_memory()
+        if free is not None and free < self.MIN_FREE_MEMORY:
+            return f"可用内存 {free // (1024 * 1024)}MB"
+        return ""
+
+    def _set_limit(self, new: int, reason: str):
+        if new == self.limit:
+            return
+        self._account()
+        self.decisions.append(LimiterDecision(time.monotonic() - self._start, self.limit, new, reason))
+        self.limit = new
+        self.peak = max(self.peak, new)
@@ -0,0 +1,90 @@
+"""
+常驻 Mars 模拟服务 - 每个工作线程一个 JVM，避免每个用例重复启动 Mars
+"""
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .jvm_service import JvmServicePool
+
+
+SHIM_SOURCE = Path(__file__).parent / "MarsServer.java"
+
+# run() 返回的状态
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+STATUS_TIMEOUT = "TIMEOUT"
+
+
+class MarsServerPool(JvmServicePool):
+    """按线程分配的常驻 Mars 服务池"""
+
+    def __init__(self, java_cmd: str, mars_jar: Path, work_dir: Path, javac_cmd: str = "javac"):
+        super().__init__(
+            SHIM_SOURCE, Path(work_dir) / "mars_server", [Path(mars_jar)], [],
+            java_cmd=java_cmd, javac_cmd=javac_cmd
+        )
+
+    def run(self, mips_path: Path, input_data: bytes, timeout: float) -> Tuple[Optional[str], str]:
+        """
+        在当前线程的常驻 JVM 中运行一个 MIPS 程序
+
+        Returns:
+            (stdout, 状态) - 超时或服务崩溃时 stdout 为 None
+        """
+        status, body = self.get().request(timeout, str(mips_path).encode("utf-8"), input_data)
+        if status is None or status == STATUS_TIMEOUT:
+            # 服务端在超时后自行退出 (或已被看门狗结束)，下次调用时重启
+            self.get().close()
+            return None, STATUS_TIMEOUT
+        return body.decode("utf-8", errors="replace"), status
+
+
+def _benchmark(mips_path: Path, input_path: Optional[Path], runs: int):
+    """对比子进程与常驻服务两种方式的单次运行开销"""
+    from .config import get_config
+
+    config = get_config()
+    mars_jar = (Path(__file__).parent / "Mars.jar").resolve()
+    input_data = input_path.read_bytes() if input_path else b""
+    timeout = config.timeout.mars
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run(
+            [config.tools.get_java(), "-jar", str(mars_jar), "nc", str(mips_path)],
+            input=input_data, capture_output=True, timeout=timeout
+        )
+    subprocess_avg = (time.perf_counter() - start) / runs
+
+    pool = MarsServerPool(
+        config.tools.get_java(), mars_jar,
+        Path(__file__).parent.parent / ".tmp", config.tools.get_javac()
+    )
+    ok, msg = pool.ensure_built()
+    if not ok:
+        print(msg)
+        return
+    pool.run(mips_path, input_data, timeout)  # 预热: 启动 JVM
+    start = time.perf_counter()
+    for _ in range(runs):
+        pool.run(mips_path, input_data, timeout)
+    server_avg = (time.perf_counter() - start) / runs
+    pool.close_all()
+
+    print(f"子进程: {subprocess_avg * 1000:.1f} ms/次")
+    print(f"常驻服务: {server_avg * 1000:.1f} ms/次")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("用法: python -m src.mars_server <mips.txt> [input.txt] [次数]")
+        sys.exit(1)
+    _benchmark(
+        Path(sys.argv[1]).resolve(),
+        Path(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] != "-" else None,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    )
@@ -0,0 +1,952 @@
+"""
+纯 Python MIPS 模拟器 - 在进程内执行编译器生成的 MARS 兼容子集，免去每个用例启动 JVM
+
+支持范围:
+    - .data/.text/.globl/.word/.half/.byte/.space/.ascii/.asciiz/.align/.eqv
+    - 整数运算、访存、分支跳转指令和常用伪指令 (li/la/move/blt/bge/mul/div/rem/seq ...)
+    - 系统调用 1/4/5/10/11/17
+
+不支持的指令、运行时异常 (地址越界、溢出、除零陷入、输入错误) 抛出 SimulatorFallback，
+由调用方回退到 Mars.jar 获取权威结果；超过指令预算抛出 StepLimitExceeded。
+"""
+import re
+import sys
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class SimulatorFallback(Exception):
+    """模拟器无法给出与 Mars 一致的结果，需要回退到 Mars.jar"""
+
+
+class UnsupportedProgram(SimulatorFallback):
+    """程序使用了不支持的指令、伪指令或汇编语法"""
+
+
+class SimulationError(SimulatorFallback):
+    """运行时异常 (Mars 会输出错误信息)"""
+
+
+class StepLimitExceeded(Exception):
+    """超过指令预算 (相当于 Mars 超时)"""
+
+
+class SimulationCancelled(Exception):
+    """调用方取消了执行"""
+
+
+# ========== 内存布局 (与 MARS 默认配置一致) ==========
+
+TEXT_BASE = 0x00400000
+DATA_SEG_BASE = 0x10000000   # .extern 起始，data 区从这里开始建模
+DATA_BASE = 0x10010000       # .data 默认起始
+GP_INIT = 0x10008000
+SP_INIT = 0x7FFFEFFC
+STACK_TOP = 0x80000000
+STACK_BYTES = 32 * 1024 * 1024
+STACK_INITIAL_BYTES = 64 * 1024   # 栈从顶部按需向下扩展 (每次翻倍)，最多 STACK_BYTES
+HEAP_MARGIN = 1024 * 1024
+
+MASK32 = 0xFFFFFFFF
+SIGN32 = 0x80000000
+
+# 寄存器: 0-31 通用寄存器，32 写 $zero 的占位，33/34 为 HI/LO，35 为伪指令展开用的临时寄存器
+R_SINK = 32
+R_HI = 33
+R_LO = 34
+R_TMP = 35
+NUM_REGS = 36
+
+REGISTER_NAMES = {
+    "zero": 0, "at": 1, "v0": 2, "v1": 3, "a0": 4, "a1": 5, "a2": 6, "a3": 7,
+    "t0": 8, "t1": 9, "t2": 10, "t3": 11, "t4": 12, "t5": 13, "t6": 14, "t7": 15,
+    "s0": 16, "s1": 17, "s2": 18, "s3": 19, "s4": 20, "s5": 21, "s6": 22, "s7": 23,
+    "t8": 24, "t9": 25, "k0": 26, "k1": 27, "gp": 28, "sp": 29, "fp": 30, "s8": 30, "ra": 31,
+}
+
+
+# ========== 预解码操作码 ==========
+# 按执行频率大致排序，分派循环中按同样顺序判断
+
+(
+    LW, SW, ADDIU, ADDU, LI, BEQ, BNE, J, JAL, JR,
+    SUBU, MUL, SLT, SLTI, SLL, SYSCALL, ADDI, ADD, SUB,
+    BLT, BGE, BGT, BLE, BLTU, BGEU, BGTU, BLEU,
+    BLEZ, BGTZ, BLTZ, BGEZ,
+    AND, ANDI, OR, ORI, XOR, XORI, NOR,
+    SLTU, SLTIU, SRL, SRA, SLLV, SRLV, SRAV,
+    MULT, MULTU, DIV, DIVU, MFHI, MFLO, MTHI, MTLO,
+    DIVQ, REMQ, DIVQU, REMQU,
+    SEQ, SNE, SGT, SGE, SLE, SGTU, SGEU, SLEU,
+    LB, LBU, LH, LHU, SB, SH,
+    JALR, ABS, NOP, HALT,
+) = range(75)
+
+
+def _wrap(v: int) -> int:
+    return ((v + SIGN32) & MASK32) - SIGN32
+
+
+class Ref:
+    """待解析的标签引用 (label + offset)"""
+    __slots__ = ("label", "offset")
+
+    def __init__(self, label: str, offset: int = 0):
+        self.label = label
+        self.offset = offset
+
+
+class Program:
+    """汇编结果"""
+
+    def __init__(self, code: List[tuple], data: bytearray, data_end: int):
+        self.code = code
+        self.data = data
+        self.data_end = data_end
+
+
+# ========== 汇编器 ==========
+
+_LABEL_RE = re.compile(r"^\s*([A-Za-z_.$][\w.$]*)\s*:(?!=)")
+_MEM_RE = re.compile(r"^(.*?)\((\$\w+)\)$")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "0": "\0", "\\": "\\", '"': '"', "'": "'", "b": "\b", "f": "\f"}
+
+
+def _strip_comment(line: str) -> str:
+    quote = None
+    i = 0
+    while i < len(line):
+        ch = line[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "#":
+            return line[:i]
+        i += 1
+    return line
+
+
+def _parse_int(tok: str) -> Optional[int]:
+    tok = tok.strip()
+    if not tok:
+        return None
+    if len(tok) >= 3 and tok[0] == "'" and tok[-1] == "'":
+        body = tok[1:-1]
+        if len(body) == 2 and body[0] == "\\" and body[1] in _ESCAPES:
+            return ord(_ESCAPES[body[1]])
+        if len(body) == 1:
+            return ord(body)
+        return None
+    neg = tok.startswith("-")
+    if neg or tok.startswith("+"):
+        tok = tok[1:]
+    try:
+        if tok[:2].lower() == "0x":
+            value = int(tok[2:], 16)
+        else:
+            value = int(tok, 10)
+    except ValueError:
+        return None
+    return -value if neg else value
+
+
+def _parse_strings(text: str) -> List[str]:
+    """解析 .ascii/.asciiz 的字符串列表"""
+    result = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == '"':
+            buf = []
+            i += 1
+            while i < len(text) and text[i] != '"':
+                if text[i] == "\\" and i + 1 < len(text):
+                    esc = text[i + 1]
+                    if esc not in _ESCAPES:
+                        raise UnsupportedProgram(f"不支持的转义: \\{esc}")
+                    buf.append(_ESCAPES[esc])
+                    i += 2
+                else:
+                    buf.append(text[i])
+                    i += 1
+            if i >= len(text):
+                raise UnsupportedProgram("字符串未闭合")
+            result.append("".join(buf))
+        elif not (ch.isspace() or ch == ","):
+            raise UnsupportedProgram(f"无法解析字符串: {text}")
+        i += 1
+    return result
+
+
+def _split_operands(rest: str) -> List[str]:
+    rest = rest.strip()
+    if not rest:
+        return []
+    rest = re.sub(r"\s*([()+])\s*", r"\1", rest)
+    parts = [p.strip() for p in rest.split(",")]
+    if len(parts) == 1 and " " in parts[0]:
+        parts = parts[0].split()
+    return [p for p in parts if p]
+
+
+def _reg(tok: str) -> int:
+    if not tok.startswith("$"):
+        raise UnsupportedProgram(f"应为寄存器: {tok}")
+    name = tok[1:]
+    if name.isdigit() and int(name) < 32:
+        return int(name)
+    if name in REGISTER_NAMES:
+        return REGISTER_NAMES[name]
+    raise UnsupportedProgram(f"不支持的寄存器: {tok}")
+
+
+def _dst(tok: str) -> int:
+    r = _reg(tok)
+    return R_SINK if r == 0 else r
+
+
+def _value(tok: str):
+    """立即数或 label[+-offset]"""
+    v = _parse_int(tok)
+    if v is not None:
+        return v
+    m = re.match(r"^([A-Za-z_.$][\w.$]*)(?:([+-])(.+))?$", tok)
+    if not m:
+        raise UnsupportedProgram(f"无法解析操作数: {tok}")
+    offset = 0
+    if m.group(2):
+        off = _parse_int(m.group(3))
+        if off is None:
+            raise UnsupportedProgram(f"无法解析操作数: {tok}")
+        offset = off if m.group(2) == "+" else -off
+    return Ref(m.group(1), offset)
+
+
+def _mem(tok: str) -> Tuple[int, object]:
+    """访存操作数 -> (基址寄存器, 偏移)"""
+    m = _MEM_RE.match(tok)
+    if m:
+        base = _reg(m.group(2))
+        off = m.group(1)
+        return base, (_value(off) if off else 0)
+    return 0, _value(tok)
+
+
+_ALU_REG = {
+    "addu": ADDU, "add": ADD, "subu": SUBU, "sub": SUB, "and": AND, "or": OR, "xor": XOR,
+    "nor": NOR, "slt": SLT, "sltu": SLTU, "sllv": SLLV, "srlv": SRLV, "srav": SRAV, "mul": MUL,
+    "seq": SEQ, "sne": SNE, "sgt": SGT, "sge": SGE, "sle": SLE, "sgtu": SGTU, "sgeu": SGEU, "sleu": SLEU,
+}
+# 第三个操作数为立即数时可直接使用的 I 型操作
+_ALU_IMM = {
+    "addu": ADDIU, "addiu": ADDIU, "add": ADDI, "addi": ADDI, "and": ANDI, "andi": ANDI,
+    "or": ORI, "ori": ORI, "xor": XORI, "xori": XORI, "slt": SLTI, "slti": SLTI,
+    "sltu": SLTIU, "sltiu": SLTIU,
+}
+_SHIFT = {"sll": SLL, "srl": SRL, "sra": SRA}
+_SHIFT_VAR = {"sll": SLLV, "srl": SRLV, "sra": SRAV}
+_BRANCH2 = {
+    "beq": BEQ, "bne": BNE, "blt": BLT, "bge": BGE, "bgt": BGT, "ble": BLE,
+    "bltu": BLTU, "bgeu": BGEU, "bgtu": BGTU, "bleu": BLEU,
+}
+_BRANCH1 = {"blez": BLEZ, "bgtz": BGTZ, "bltz": BLTZ, "bgez": BGEZ}
+_LOADS = {"lw": LW, "lb": LB, "lbu": LBU, "lh": LH, "lhu": LHU}
+_STORES = {"sw": SW, "sb": SB, "sh": SH}
+_DIV3 = {"div": DIVQ, "rem": REMQ, "divu": DIVQU, "remu": REMQU}
+_HILO2 = {"mult": MULT, "multu": MULTU, "div": DIV, "divu": DIVU}
+
+
+def _expand(mn: str, ops: List[str]) -> List[tuple]:
+    """把一条 (伪) 指令展开为预解码操作列表，操作数中可能含未解析的 Ref"""
+    n = len(ops)
+
+    if mn in _LOADS and n == 2:
+        base, off = _mem(ops[1])
+        return [(_LOADS[mn], _dst(ops[0]), base, off)]
+    if mn in _STORES and n == 2:
+        base, off = _mem(ops[1])
+        return [(_STORES[mn], _reg(ops[0]), base, off)]
+
+    if mn in ("li", "la") and n == 2:
+        if mn == "la" and _MEM_RE.match(ops[1]):
+            base, off = _mem(ops[1])
+            return [(ADDIU, _dst(ops[0]), base, off)]
+        return [(LI, _dst(ops[0]), _value(ops[1]), 0)]
+    if mn == "lui" and n == 2:
+        v = _parse_int(ops[1])
+        if v is None:
+            raise UnsupportedProgram(f"lui 操作数: {ops[1]}")
+        return [(LI, _dst(ops[0]), _wrap((v & 0xFFFF) << 16), 0)]
+    if mn == "move" and n == 2:
+        return [(ADDU, _dst(ops[0]), _reg(ops[1]), 0)]
+    if mn in ("neg", "negu") and n == 2:
+        return [(SUB if mn == "neg" else SUBU, _dst(ops[0]), 0, _reg(ops[1]))]
+    if mn == "not" and n == 2:
+        return [(NOR, _dst(ops[0]), _reg(ops[1]), 0)]
+    if mn == "abs" and n == 2:
+        return [(ABS, _dst(ops[0]), _reg(ops[1]), 0)]
+
+    if mn in _SHIFT and n == 3:
+        if ops[2].startswith("$"):
+            return [(_SHIFT_VAR[mn], _dst(ops[0]), _reg(ops[1]), _reg(ops[2]))]
+        sh = _parse_int(ops[2])
+        if sh is None:
+            raise UnsupportedProgram(f"移位量: {ops[2]}")
+        return [(_SHIFT[mn], _dst(ops[0]), _reg(ops[1]), sh & 31)]
+
+    if mn in _DIV3 and n == 3:
+        if ops[2].startswith("$"):
+            return [(_DIV3[mn], _dst(ops[0]), _reg(ops[1]), _reg(ops[2]))]
+        return [(LI, R_TMP, _value(ops[2]), 0), (_DIV3[mn], _dst(ops[0]), _reg(ops[1]), R_TMP)]
+    if mn in _HILO2 and n == 2:
+        return [(_HILO2[mn], _reg(ops[0]), _reg(ops[1]), 0)]
+    if mn in ("mfhi", "mflo") and n == 1:
+        return [(MFHI if mn == "mfhi" else MFLO, _dst(ops[0]), 0, 0)]
+    if mn in ("mthi", "mtlo") and n == 1:
+        return [(MTHI if mn == "mthi" else MTLO, _reg(ops[0]), 0, 0)]
+
+    if mn in ("subi", "subiu") and n == 3:
+        v = _value(ops[2])
+        if isinstance(v, Ref):
+            raise UnsupportedProgram(f"{mn} 标签操作数")
+        return [(ADDI if mn == "subi" else ADDIU, _dst(ops[0]), _reg(ops[1]), -v)]
+    if mn in ("addi", "addiu", "andi", "ori", "xori", "slti", "sltiu") and n == 3:
+        return [(_ALU_IMM[mn], _dst(ops[0]), _reg(ops[1]), _value(ops[2]))]
+    if mn in _ALU_REG and n == 3:
+        if ops[2].startswith("$"):
+            return [(_ALU_REG[mn], _dst(ops[0]), _reg(ops[1]), _reg(ops[2]))]
+        v = _value(ops[2])
+        if mn in _ALU_IMM:
+            return [(_ALU_IMM[mn], _dst(ops[0]), _reg(ops[1]), v)]
+        if mn == "subu" and not isinstance(v, Ref):
+            return [(ADDIU, _dst(ops[0]), _reg(ops[1]), -v)]
+        return [(LI, R_TMP, v, 0), (_ALU_REG[mn], _dst(ops[0]), _reg(ops[1]), R_TMP)]
+
+    if mn in _BRANCH2 and n == 3:
+        target = _value(ops[2])
+        if ops[1].startswith("$"):
+            return [(_BRANCH2[mn], _reg(ops[0]), _reg(ops[1]), target)]
+        return [(LI, R_TMP, _value(ops[1]), 0), (_BRANCH2[mn], _reg(ops[0]), R_TMP, target)]
+    if mn in ("beqz", "bnez") and n == 2:
+        return [(BEQ if mn == "beqz" else BNE, _reg(ops[0]), 0, _value(ops[1]))]
+    if mn in _BRANCH1 and n == 2:
+        return [(_BRANCH1[mn], _reg(ops[0]), 0, _value(ops[1]))]
+    if mn in ("b", "j") and n == 1:
+        return [(J, 0, 0, _value(ops[0]))]
+    if mn == "jal" and n == 1:
+        return [(JAL, 0, 0, _value(ops[0]))]
+    if mn == "jr" and n == 1:
+        return [(JR, _reg(ops[0]), 0, 0)]
+    if mn == "jalr" and n in (1, 2):
+        if n == 1:
+            return [(JALR, 31, _reg(ops[0]), 0)]
+        return [(JALR, _dst(ops[0]), _reg(ops[1]), 0)]
+
+    if mn == "syscall" and n == 0:
+        return [(SYSCALL, 0, 0, 0)]
+    if mn == "nop" and n == 0:
+        return [(NOP, 0, 0, 0)]
+
+    raise UnsupportedProgram(f"不支持的指令: {mn} {', '.join(ops)}")
+
+
+def assemble(source: str) -> Program:
+    """汇编 MARS 格式的源码"""
+    code: List[tuple] = []
+    data = bytearray()
+    symbols: Dict[str, int] = {}
+    text_labels: Dict[str, int] = {}
+    data_fixups: List[Tuple[int, Ref, int]] = []
+    eqv: Dict[str, str] = {}
+    in_text = True
+    data_cursor = DATA_BASE
+    # data 段的标签等到下一条指示对齐之后再绑定地址 (与 MARS 的自动对齐一致)
+    pending_labels: List[str] = []
+
+    def bind_pending():
+        for name in pending_labels:
+            symbols[name] = data_cursor
+        pending_labels.clear()
+
+    def data_align(n: int):
+        nonlocal data_cursor
+        data_cursor = (data_cursor + n - 1) // n * n
+
+    def data_write(value: int, size: int):
+        nonlocal data_cursor
+        off = data_cursor - DATA_SEG_BASE
+        if len(data) < off + size:
+            data.extend(bytes(off + size - len(data)))
+        data[off:off + size] = (value & ((1 << (size * 8)) - 1)).to_bytes(size, "little")
+        data_cursor += size
+
+    for raw_line in source.replace("\r\n", "\n").split("\n"):
+        line = _strip_comment(raw_line).strip()
+        if eqv and line:
+            for name, value in eqv.items():
+                line = re.sub(rf"(?<![\w.$]){re.escape(name)}(?![\w.$])", value, line)
+
+        while True:
+            m = _LABEL_RE.match(line)
+            if not m:
+                break
+            label = m.group(1)
+            if in_text:
+                text_labels[label] = len(code)
+            else:
+                pending_labels.append(label)
+            line = line[m.end():].strip()
+        if not line:
+            continue
+
+        parts = line.split(None, 1)
+        head = parts[0].lower()
+        rest = parts[1] if len(parts) > 1 else ""
+
+        if head.startswith("."):
+            if head not in (".word", ".half"):
+                bind_pending()
+            if head == ".text":
+                in_text = True
+            elif head in (".data", ".kdata"):
+                in_text = False
+                addr = _parse_int(rest) if rest.strip() else None
+                if addr is not None:
+                    data_cursor = addr
+            elif head in (".globl", ".global", ".extern_label"):
+                pass
+            elif head == ".eqv":
+                name, _, value = rest.strip().partition(" ")
+                if not name or not value.strip():
+                    raise UnsupportedProgram(f".eqv 语法: {line}")
+                eqv[name.rstrip(",")] = value.strip()
+            elif in_text:
+                raise UnsupportedProgram(f".text 中不支持的指示: {head}")
+            elif head == ".align":
+                n = _parse_int(rest)
+                if n is None:
+                    raise UnsupportedProgram(f".align 参数: {rest}")
+                data_align(1 << n)
+            elif head == ".space":
+                n = _parse_int(rest)
+                if n is None or n < 0:
+                    raise UnsupportedProgram(f".space 参数: {rest}")
+                if n:
+                    data_cursor += n - 1
+                    data_write(0, 1)
+            elif head in (".ascii", ".asciiz"):
+                for text in _parse_strings(rest):
+                    raw = text.encode("utf-8")
+                    if head == ".asciiz":
+                        raw += b"\0"
+                    for byte in raw:
+                        data_write(byte, 1)
+            elif head in (".word", ".half", ".byte"):
+                size = {".word": 4, ".half": 2, ".byte": 1}[head]
+                data_align(size)
+                bind_pending()
+                for item in _split_operands(rest.replace(" ", ",")):
+                    count = 1
+                    if ":" in item:
+                        item, _, rep = item.partition(":")
+                        count = _parse_int(rep)
+                        if count is None or count < 0:
+                            raise UnsupportedProgram(f"重复次数: {rep}")
+                    value = _value(item)
+                    for _ in range(count):
+                        if isinstance(value, Ref):
+                            data_fixups.append((data_cursor, value, size))
+                            data_write(0, size)
+                        else:
+                            data_write(value, size)
+            else:
+                raise UnsupportedProgram(f"不支持的指示: {head}")
+            if data_cursor < DATA_SEG_BASE:
+                raise UnsupportedProgram(f"数据地址越界: {hex(data_cursor)}")
+            continue
+
+        if not in_text:
+            raise UnsupportedProgram(f".data 段中的指令: {line}")
+        code.extend(_expand(head, _split_operands(rest)))
+
+    bind_pending()
+
+    def address_of(ref: Ref) -> int:
+        if ref.label in symbols:
+            return symbols[ref.label] + ref.offset
+        if ref.label in text_labels:
+            return TEXT_BASE + 4 * text_labels[ref.label] + ref.offset
+        raise UnsupportedProgram(f"未定义的标签: {ref.label}")
+
+    branch_ops = set(_BRANCH2.values()) | set(_BRANCH1.values()) | {J, JAL}
+    resolved = []
+    for op, a, b, c in code:
+        if isinstance(b, Ref):
+            b = _wrap(address_of(b))
+        if isinstance(c, Ref):
+            if op in branch_ops:
+                if c.label not in text_labels or c.offset:
+                    raise UnsupportedProgram(f"跳转目标: {c.label}")
+                c = text_labels[c.label]
+            else:
+                c = _wrap(address_of(c))
+        elif op in branch_ops:
+            raise UnsupportedProgram("不支持数值形式的跳转目标")
+        if op in (ANDI, ORI, XORI, LI, ADDI, ADDIU, SLTI, SLTIU) and isinstance(c, int):
+            c = _wrap(c)
+        if op == LI:
+            b = _wrap(b)
+        resolved.append((op, a, b, c))
+    # 哨兵: 执行越过最后一条指令时正常结束 (MARS 的 dropped off bottom)
+    resolved.append((HALT, 0, 0, 0))
+
+    for addr, ref, size in data_fixups:
+        off = addr - DATA_SEG_BASE
+        data[off:off + size] = (address_of(ref) & ((1 << (size * 8)) - 1)).to_bytes(size, "little")
+
+    return Program(resolved, data, data_cursor)
+
+
+# ========== 执行 ==========
+
+# 每执行这么多条指令检查一次是否被取消
+CANCEL_CHECK_STEPS = 1 << 20
+
+
+def _budget(max_steps: int, cancelled: Optional[Callable[[], bool]]) -> Iterator[range]:
+    """把指令预算切成若干段，段与段之间检查取消 (max_steps <= 0 时不限指令数)"""
+    unlimited = max_steps <= 0
+    while unlimited or max_steps > 0:
+        if cancelled is not None and cancelled():
+            raise SimulationCancelled("执行已取消")
+        n = CANCEL_CHECK_STEPS if unlimited else min(CANCEL_CHECK_STEPS, max_steps)
+        yield range(n)
+        max_steps -= n
+
+
+def run(program: Program, input_data: str = "", max_steps: int = 50_000_000,
+        cancelled: Optional[Callable[[], bool]] = None, output: Optional[List[str]] = None) -> str:
+    """
+    执行程序，返回标准输出 (cancelled() 返回 True 时抛出 SimulationCancelled)
+
+    给出 output 时输出片段追加到其中，cancelled 可以借此在运行中途查看已有的输出
+    """
+    if sys.byteorder != "little":
+        raise UnsupportedProgram("仅支持小端主机")
+
+    code = program.code
+    n_code = len(code) - 1
+
+    data_lo = DATA_SEG_BASE
+    data_bytes = (program.data_end - DATA_SEG_BASE + HEAP_MARGIN + 3) // 4 * 4
+    data_words = array("i", bytes(data_bytes))
+    data_words_b = memoryview(data_words).cast("B")
+    data_words_b[:len(program.data)] = program.data
+    data_hi = data_lo + data_bytes
+    data_h = data_words_b.cast("h")
+
+    # 栈只分配用到的部分: 大多数程序用不到几十 KB，不必每次清零 32MB
+    stack_lo = STACK_TOP - STACK_INITIAL_BYTES
+    stack_words = array("i", bytes(STACK_INITIAL_BYTES))
+    stack_b = memoryview(stack_words).cast("B")
+    stack_h = stack_b.cast("h")
+
+    def grow_stack(addr: int) -> bool:
+        """addr 落在尚未分配的栈空间时把栈向下扩展到能容纳它，返回是否扩展了"""
+        nonlocal stack_lo, stack_words, stack_b, stack_h
+        if not (STACK_TOP - STACK_BYTES <= addr < stack_lo):
+            return False
+        size = new_size = STACK_TOP - stack_lo
+        while STACK_TOP - new_size > addr:
+            new_size *= 2
+        new_size = min(new_size, STACK_BYTES)
+        grown = array("i", bytes(new_size - size))
+        grown.extend(stack_words)
+        stack_words = grown
+        stack_b = memoryview(stack_words).cast("B")
+        stack_h = stack_b.cast("h")
+        stack_lo = STACK_TOP - new_size
+        return True
+
+    regs = [0] * NUM_REGS
+    regs[28] = GP_INIT
+    regs[29] = SP_INIT
+
+    input_lines = input_data.split("\n")
+    input_pos = 0
+    out: List[str] = output if output is not None else []
+
+    def region(addr: int, size: int):
+        if stack_lo <= addr and addr + size <= STACK_TOP:
+            return stack_b, stack_h, addr - stack_lo
+        if data_lo <= addr and addr + size <= data_hi:
+            return data_words_b, data_h, addr - data_lo
+        if grow_stack(addr):
+            return stack_b, stack_h, addr - stack_lo
+        raise SimulationError(f"地址越界: {addr & MASK32:#010x}")
+
+    def read_cstring(addr: int) -> str:
+        mem, _, off = region(addr, 1)
+        end = off
+        limit = len(mem)
+        while end < limit and mem[end] != 0:
+            end += 1
+        return bytes(mem[off:end]).decode("utf-8", errors="replace")
+
+    pc = 0
+    # 内层 range 迭代代替逐条计数和比较，每段之间检查取消；全部耗尽即超出预算
+    for steps in _budget(max_steps, cancelled):
+        for _ in steps:
+            op, a, b, c = code[pc]
+            pc += 1
+
+            if op < SUBU:
+                if op == LW:
+                    addr = regs[b] + c
+                    if addr & 3:
+                        raise SimulationError(f"未对齐的字访问: {addr & MASK32:#010x}")
+                    if stack_lo <= addr < STACK_TOP:
+                        regs[a] = stack_words[(addr - stack_lo) >> 2]
+                    elif data_lo <= addr < data_hi:
+                        regs[a] = data_words[(addr - data_lo) >> 2]
+                    elif grow_stack(addr):
+                        regs[a] = stack_words[(addr - stack_lo) >> 2]
+                    else:
+                        raise SimulationError(f"地址越界: {addr & MASK32:#010x}")
+                elif op == SW:
+                    addr = regs[b] + c
+                    if addr & 3:
+                        raise SimulationError(f"未对齐的字访问: {addr & MASK32:#010x}")
+                    if stack_lo <= addr < STACK_TOP:
+                        stack_words[(addr - stack_lo) >> 2] = regs[a]
+                    elif data_lo <= addr < data_hi:
+                        data_words[(addr - data_lo) >> 2] = regs[a]
+                    elif grow_stack(addr):
+                        stack_words[(addr - stack_lo) >> 2] = regs[a]
+                    else:
+                        raise SimulationError(f"地址越界: {addr & MASK32:#010x}")
+                elif op == ADDIU:
+                    v = regs[b] + c
+                    if v >= SIGN32 or v < -SIGN32:
+                        v = ((v + SIGN32) & MASK32) - SIGN32
+                    regs[a] = v
+                elif op == ADDU:
+                    v = regs[b] + regs[c]
+                    if v >= SIGN32 or v < -SIGN32:
+                        v = ((v + SIGN32) & MASK32) - SIGN32
+                    regs[a] = v
+                elif op == LI:
+                    regs[a] = b
+                elif op == BEQ:
+                    if regs[a] == regs[b]:
+                        pc = c
+                elif op == BNE:
+                    if regs[a] != regs[b]:
+                        pc = c
+                elif op == J:
+                    pc = c
+                elif op == JAL:
+                    regs[31] = TEXT_BASE + (pc << 2)
+                    pc = c
+                elif op == JR:
+                    target = regs[a] - TEXT_BASE
+                    if target & 3 or target < 0 or (target >> 2) > n_code:
+                        raise SimulationError(f"跳转地址非法: {regs[a] & MASK32:#010x}")
+                    pc = target >> 2
+            elif op < AND:
+                if op == SUBU:
+                    v = regs[b] - regs[c]
+                    if v >= SIGN32 or v < -SIGN32:
+                        v = ((v + SIGN32) & MASK32) - SIGN32
+                    regs[a] = v
+                elif op == MUL:
+                    p = regs[b] * regs[c]
+                    lo = ((p + SIGN32) & MASK32) - SIGN32
+                    regs[R_HI] = (((p >> 32) + SIGN32) & MASK32) - SIGN32
+                    regs[R_LO] = lo
+                    regs[a] = lo
+                elif op == SLT:
+                    regs[a] = 1 if regs[b] < regs[c] else 0
+                elif op == SLTI:
+                    regs[a] = 1 if regs[b] < c else 0
+                elif op == SLL:
+                    regs[a] = (((regs[b] << c) + SIGN32) & MASK32) - SIGN32
+                elif op == SYSCALL:
+                    service = regs[2]
+                    if service == 1:
+                        out.append(str(regs[4]))
+                    elif service == 4:
+                        out.append(read_cstring(regs[4]))
+                    elif service == 11:
+                        out.append(chr(regs[4] & 0xFF))
+                    elif service == 5:
+                        if input_pos >= len(input_lines):
+                            raise SimulationError("输入已读完 (syscall 5)")
+                        text = input_lines[input_pos].strip()
+                        input_pos += 1
+                        try:
+                            value = int(text, 10)
+                        except ValueError:
+                            raise SimulationError(f"非法整数输入: {text!r}")
+                        if not -SIGN32 <= value < SIGN32:
+                            raise SimulationError(f"非法整数输入: {text!r}")
+                        regs[2] = value
+                    elif service == 10 or service == 17:
+                        break
+                    else:
+                        raise UnsupportedProgram(f"不支持的系统调用: {service}")
+                elif op == ADDI:
+                    v = regs[b] + c
+                    if v >= SIGN32 or v < -SIGN32:
+                        raise SimulationError("算术溢出 (addi)")
+                    regs[a] = v
+                elif op == ADD:
+                    v = regs[b] + regs[c]
+                    if v >= SIGN32 or v < -SIGN32:
+                        raise SimulationError("算术溢出 (add)")
+                    regs[a] = v
+                elif op == SUB:
+                    v = regs[b] - regs[c]
+                    if v >= SIGN32 or v < -SIGN32:
+                        raise SimulationError("算术溢出 (sub)")
+                    regs[a] = v
+                elif op == BLT:
+                    if regs[a] < regs[b]:
+                        pc = c
+                elif op == BGE:
+                    if regs[a] >= regs[b]:
+                        pc = c
+                elif op == BGT:
+                    if regs[a] > regs[b]:
+                        pc = c
+                elif op == BLE:
+                    if regs[a] <= regs[b]:
+                        pc = c
+                elif op == BLTU:
+                    if regs[a] & MASK32 < regs[b] & MASK32:
+                        pc = c
+                elif op == BGEU:
+                    if regs[a] & MASK32 >= regs[b] & MASK32:
+                        pc = c
+                elif op == BGTU:
+                    if regs[a] & MASK32 > regs[b] & MASK32:
+                        pc = c
+                elif op == BLEU:
+                    if regs[a] & MASK32 <= regs[b] & MASK32:
+                        pc = c
+                elif op == BLEZ:
+                    if regs[a] <= 0:
+                        pc = c
+                elif op == BGTZ:
+                    if regs[a] > 0:
+                        pc = c
+                elif op == BLTZ:
+                    if regs[a] < 0:
+                        pc = c
+                elif op == BGEZ:
+                    if regs[a] >= 0:
+                        pc = c
+            elif op < LB:
+                if op == AND:
+                    regs[a] = regs[b] & regs[c]
+                elif op == ANDI:
+                    regs[a] = regs[b] & c
+                elif op == OR:
+                    regs[a] = regs[b] | regs[c]
+                elif op == ORI:
+                    regs[a] = regs[b] | c
+                elif op == XOR:
+                    regs[a] = regs[b] ^ regs[c]
+                elif op == XORI:
+                    regs[a] = regs[b] ^ c
+                elif op == NOR:
+                    regs[a] = ~(regs[b] | regs[c])
+                elif op == SLTU:
+                    regs[a] = 1 if regs[b] & MASK32 < regs[c] & MASK32 else 0
+                elif op == SLTIU:
+                    regs[a] = 1 if regs[b] & MASK32 < c & MASK32 else 0
+                elif op == SRL:
+                    regs[a] = _wrap((regs[b] & MASK32) >> c)
+                elif op == SRA:
+                    regs[a] = regs[b] >> c
+                elif op == SLLV:
+                    regs[a] = _wrap(regs[b] << (regs[c] & 31))
+                elif op == SRLV:
+                    regs[a] = _wrap((regs[b] & MASK32) >> (regs[c] & 31))
+                elif op == SRAV:
+                    regs[a] = regs[b] >> (regs[c] & 31)
+                elif op == MULT or op == MULTU:
+                    if op == MULT:
+                        p = regs[a] * regs[b]
+                    else:
+                        p = (regs[a] & MASK32) * (regs[b] & MASK32)
+                    regs[R_LO] = _wrap(p)
+                    regs[R_HI] = _wrap(p >> 32)
+                elif op == DIV or op == DIVU:
+                    x, y = regs[a], regs[b]
+                    if y != 0:
+                        if op == DIVU:
+                            x &= MASK32
+                            y &= MASK32
+                            q = x // y
+                        else:
+                            q = abs(x) // abs(y)
+                            if (x < 0) != (y < 0):
+                                q = -q
+                        regs[R_LO] = _wrap(q)
+                        regs[R_HI] = _wrap(x - q * y)
+                elif op == MFHI:
+                    regs[a] = regs[R_HI]
+                elif op == MFLO:
+                    regs[a] = regs[R_LO]
+                elif op == MTHI:
+                    regs[R_HI] = regs[a]
+                elif op == MTLO:
+                    regs[R_LO] = regs[a]
+                elif op == DIVQ or op == REMQ or op == DIVQU or op == REMQU:
+                    x, y = regs[b], regs[c]
+                    if y == 0:
+                        raise SimulationError("除零 (break)")
+                    if op == DIVQU or op == REMQU:
+                        x &= MASK32
+                        y &= MASK32
+                        q = x // y
+                    else:
+                        q = abs(x) // abs(y)
+                        if (x < 0) != (y < 0):
+                            q = -q
+                    regs[R_LO] = _wrap(q)
+                    regs[R_HI] = _wrap(x - q * y)
+                    regs[a] = regs[R_LO] if op == DIVQ or op == DIVQU else regs[R_HI]
+                elif op == SEQ:
+                    regs[a] = 1 if regs[b] == regs[c] else 0
+                elif op == SNE:
+                    regs[a] = 1 if regs[b] != regs[c] else 0
+                elif op == SGT:
+                    regs[a] = 1 if regs[b] > regs[c] else 0
+                elif op == SGE:
+                    regs[a] = 1 if regs[b] >= regs[c] else 0
+                elif op == SLE:
+                    regs[a] = 1 if regs[b] <= regs[c] else 0
+                elif op == SGTU:
+                    regs[a] = 1 if regs[b] & MASK32 > regs[c] & MASK32 else 0
+                elif op == SGEU:
+                    regs[a] = 1 if regs[b] & MASK32 >= regs[c] & MASK32 else 0
+                elif op == SLEU:
+                    regs[a] = 1 if regs[b] & MASK32 <= regs[c] & MASK32 else 0
+            else:
+                if op == LB or op == LBU:
+                    mem, _, off = region(regs[b] + c, 1)
+                    v = mem[off]
+                    regs[a] = v - 256 if op == LB and v >= 128 else v
+                elif op == LH or op == LHU:
+                    addr = regs[b] + c
+                    if addr & 1:
+                        raise SimulationError(f"未对齐的半字访问: {addr & MASK32:#010x}")
+                    _, half, off = region(addr, 2)
+                    v = half[off >> 1]
+                    regs[a] = v & 0xFFFF if op == LHU else v
+                elif op == SB:
+                    mem, _, off = region(regs[b] + c, 1)
+                    mem[off] = regs[a] & 0xFF
+                elif op == SH:
+                    addr = regs[b] + c
+                    if addr & 1:
+                        raise SimulationError(f"未对齐的半字访问: {addr & MASK32:#010x}")
+                    _, half, off = region(addr, 2)
+                    half[off >> 1] = ((regs[a] + 0x8000) & 0xFFFF) - 0x8000
+                elif op == JALR:
+                    target = regs[b] - TEXT_BASE
+                    if target & 3 or target < 0 or (target >> 2) > n_code:
+                        raise SimulationError(f"跳转地址非法: {regs[b] & MASK32:#010x}")
+                    regs[a] = TEXT_BASE + (pc << 2)
+                    pc = target >> 2
+                elif op == ABS:
+                    regs[a] = _wrap(abs(regs[b]))
+                elif op == NOP:
+                    pass
+                elif op == HALT:
+                    break
+        else:
+            continue
+        break
+    else:
+        raise StepLimitExceeded(f"超过指令预算 {max_steps}")
+
+    return "".join(out)
+
+
+def simulate(source: str, input_data: str = "", max_steps: int = 50_000_000,
+             cancelled: Optional[Callable[[], bool]] = None, output: Optional[List[str]] = None) -> str:
+    """汇编并执行，返回标准输出"""
+    return run(assemble(source), input_data, max_steps, cancelled, output)
+
+
+# ========== 一致性检查 ==========
+
+def run_conformance(project_dir: Path, test_dir: Path, max_steps: int = 50_000_000) -> int:
+    """
+    用被测编译器编译 testfiles/ 下所有用例，分别用本模拟器和 Mars.jar 执行并比较输出
+
+    Returns:
+        输出不一致的用例数
+    """
+    from .discovery import TestDiscovery
+    from .tester import CompilerTester
+    from .utils import normalize_output, read_file_safe, text_digest
+
+    tester = CompilerTester(project_dir, test_dir)
+    success, msg = tester.compile_project()
+    print(msg)
+    if not success:
+        return 1
+
+    testfiles_dir = Path(test_dir) / "testfiles"
+    worker_dir = tester.work_dir / "conformance"
+    worker_dir.mkdir(parents=True, exist_ok=True)
+    same = differ = fallback = skipped = 0
+
+    for lib in TestDiscovery.discover_test_libs(testfiles_dir):
+        for case in TestDiscovery.discover_in_dir(lib):
+            name = f"{lib.relative_to(testfiles_dir)}/{case.name}"
+            ok, _ = tester._run_compiler(case.testfile, worker_dir)
+            if not ok:
+                skipped += 1
+                continue
+            input_data = read_file_safe(case.input_file) if case.input_file else ""
+            mars_out, _ = tester._run_mars_jar(case.input_file, worker_dir)
+            try:
+                sim_out = simulate(read_file_safe(worker_dir / "mips.txt"), input_data, max_steps)
+            except (SimulatorFallback, StepLimitExceeded) as e:
+                fallback += 1
+                print(f"[回退] {name}: {e}")
+                continue
+            if mars_out is not None and mars_out.digest == text_digest(normalize_output(sim_out)):
+                same += 1
+            else:
+                differ += 1
+                print(f"[不一致] {name}")
+
+    print(f"一致 {same} | 不一致 {differ} | 回退 {fallback} | 编译失败跳过 {skipped}")
+    return differ
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "conformance":
+        root = Path(__file__).parent.parent
+        project = Path(sys.argv[2]) if len(sys.argv) > 2 else root / "../Compiler"
+        sys.exit(1 if run_conformance(project, root) else 0)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "run":
+        src = Path(sys.argv[2]).read_text(encoding="utf-8", errors="replace")
+        stdin = Path(sys.argv[3]).read_text(encoding="utf-8") if len(sys.argv) > 3 else ""
+        sys.stdout.write(simulate(src, stdin))
+    else:
+        print("用法:\n"
+              "  python -m src.mips_sim run <mips.txt> [input.txt]\n"
+              "  python -m src.mips_sim conformance [编译器项目目录]")
+        sys.exit(1)
@@ -1,10 +1,13 @@
 """
 数据模型模块
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+from .timing import PhaseStats
+from .utils import read_file_safe
 
 
 class TestStatus(Enum):
@@ -22,12 +25,32 @@ class TestResult:
     """测试结果"""
     status: TestStatus
     message: str = ""
+    # 实际/期望输出 (较大时只有开头和结尾的片段，完整内容在 actual_path / expected_path)
     actual_output: Optional[str] = None
     expected_output: Optional[str] = None
+    # 各阶段耗时 (秒): staging / compile / mars / ref_compile / ref_run / reference / compare，
+    # total 为整个用例的耗时；timeline 为各阶段相对用例开始的 (开始, 结束) 秒数
+    phases: Dict[str, float] = field(default_factory=dict)
+    timeline: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    # 编译产物 mips.txt 与 (标准化后的) 实际/期望输出的 SHA-256
+    mips_digest: Optional[str] = None
+    actual_digest: Optional[str] = None
+    expected_digest: Optional[str] = None
+    actual_path: Optional[str] = None
+    expected_path: Optional[str] = None
     
     @property
     def passed(self) -> bool:
         return self.status == TestStatus.PASSED
+    
+    def full_outputs(self) -> Tuple[Optional[str], Optional[str]]:
+        """读取完整的 (实际输出, 期望输出)，输出较大时从文件中读取 (文件已被清理时退回片段)"""
+        outputs = []
+        for text, path in ((self.actual_output, self.actual_path), (self.expected_output, self.expected_path)):
+            if path is not None and Path(path).exists():
+                text = read_file_safe(Path(path))
+            outputs.append(text)
+        return outputs[0], outputs[1]
 
 
 @dataclass
@@ -36,3 +59,59 @@ class TestCase:
     name: str
     testfile: Path
     input_file: Optional[Path]
+
+
+@dataclass
+class RunSummary:
+    """一次批量测试的运行摘要"""
+    
+    MAX_DECISION_LINES = 8   # 日志中最多列出的并发调整记录
+    
+    total: int = 0
+    ref_cache_hits: int = 0
+    ref_cache_misses: int = 0
+    mips_cache_hits: int = 0
+    mips_cache_misses: int = 0
+    workspace_leases: int = 0
+    workspace_wait: float = 0.0    # 等待空闲工作目录的累计秒数
+    workspace_dirs: int = 0
+    concurrency_adaptive: bool = False
+    concurrency_final: int = 0
+    concurrency_peak: int = 0
+    concurrency_decreases: int = 0
+    concurrency_decisions: List[str] = field(default_factory=list)   # 并发上限的调整记录
+    idle_worker_seconds: float = 0.0   # 有用例在跑时空闲名额 × 时间
+    history_known: int = 0             # 有历史耗时记录的用例数
+    failures_first: int = 0            # 排在最前面的上次未通过的用例数
+    phase_stats: Optional[PhaseStats] = None   # 各阶段耗时的汇总
+    
+    def format_lines(self) -> List[str]:
+        """格式化为日志行"""
+        lines = []
+        lookups = self.ref_cache_hits + self.ref_cache_misses
+        if lookups:
+            lines.append(f"参考输出缓存: 命中 {self.ref_cache_hits} | 未命中 {self.ref_cache_misses}")
+        lookups = self.mips_cache_hits + self.mips_cache_misses
+        if lookups:
+            lines.append(f"MIPS产物缓存: 命中 {self.mips_cache_hits} | 未命中 {self.mips_cache_misses}")
+        if self.workspace_leases:
+            lines.append(
+                f"工作目录: 租用 {self.workspace_leases} 次 | 目录 {self.workspace_dirs} 个 | "
+                f"等待 {self.workspace_wait:.2f}s"
+            )
+        if self.concurrency_adaptive:
+            lines.append(
+                f"并发控制: 峰值 {self.concurrency_peak} | 最终 {self.concurrency_final} | "
+                f"调整 {len(self.concurrency_decisions)} 次 (其中减小 {self.concurrency_decreases} 次)"
+            )
+            lines.extend(f"  {d}" for d in self.concurrency_decisions[-self.MAX_DECISION_LINES:])
+        if self.failures_first:
+            lines.append(f"失败优先: 上次未通过的 {self.failures_first} 个用例先运行")
+        if self.total:
+            lines.append(
+                f"调度: 预计耗时长的优先 (有历史 {self.history_known} | 估计 {self.total - self.history_known}) | "
+                f"空闲 {self.idle_worker_seconds:.1f} worker·秒"
+            )
+        if self.phase_stats:
+            lines.extend(self.phase_stats.format_lines())
+        return lines
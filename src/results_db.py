@@ -0,0 +1,399 @@
+"""
+运行记录数据库 - 把每次批量测试的结果写入 .tmp/results.db (SQLite)
+
+    python -m src.results_db                        最近一次运行相对各用例上一次结果的变化
+    python -m src.results_db slowest [阶段] [N]      最近一次运行中最慢的用例 (阶段见 src/timing.py 的 PHASE_LABELS)
+    python -m src.results_db timeline <测试库> [次数] 测试库中每个用例在最近几次运行中的通过情况
+"""
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import TestCase, TestResult
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    project TEXT,
+    artifact TEXT,
+    total INTEGER,
+    passed INTEGER,
+    failed INTEGER,
+    stopped INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    lib TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT,
+    actual_digest TEXT
+);
+CREATE INDEX IF NOT EXISTS cases_by_lib ON cases (lib);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL,
+    case_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    duration_ms REAL,
+    mips_digest TEXT,
+    actual_digest TEXT,
+    expected_digest TEXT,
+    message TEXT,
+    prev_status TEXT,
+    prev_digest TEXT,
+    PRIMARY KEY (run_id, case_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_case ON results (case_id, run_id);
+CREATE INDEX IF NOT EXISTS results_by_duration ON results (run_id, duration_ms);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL,
+    phase TEXT NOT NULL,
+    ms REAL NOT NULL,
+    case_id INTEGER NOT NULL,
+    PRIMARY KEY (run_id, phase, ms, case_id)
+) WITHOUT ROWID;
+"""
+
+# 单条记录中保存的信息长度上限
+MAX_MESSAGE_CHARS = 500
+# 视为 "未通过" 的状态 (SKIPPED 表示没有得出结论)
+FAILING_STATUSES = ("FAILED", "COMPILE_ERROR", "RUNTIME_ERROR", "TIMEOUT")
+# 数据库中保存的摘要长度 (十六进制字符，足以区分同一用例的不同输出)
+DIGEST_CHARS = 16
+
+
+def case_location(testfile: str, testfiles_dir: Optional[str]) -> Tuple[str, str]:
+    """
+    用例在数据库中的标识
+
+    Returns:
+        (路径, 测试库) - 位于 testfiles_dir 下时为相对路径，否则为绝对路径，均用 "/" 分隔
+    """
+    path = os.path.abspath(testfile)
+    if testfiles_dir is not None and path.startswith(testfiles_dir + os.sep):
+        path = path[len(testfiles_dir) + 1:]
+    path = path.replace(os.sep, "/")
+    lib = path.rsplit("/", 1)[0] if "/" in path else ""
+    return path, lib
+
+
+class ResultStore:
+    """
+    运行记录 - 每次运行一行 runs，每个用例每次运行一行 results，各阶段耗时在 phases
+
+    record / end_run 只把记录放进队列，由后台写线程成批写入 (一次事务写入
+    LINGER 秒内到达的全部记录)；close 等待队列写完。查询方法各自打开只读连接，
+    可以在任何线程调用。
+
+    cases 表同时保存每个用例最近一次得出结论 (非 SKIPPED) 的状态和输出摘要，写入新结果时
+    顺带记下上一次的值 (prev_status / prev_digest)，"与上次相比的变化" 只需读一次运行的记录。
+    被 --fail-fast / --time-budget / 取消跳过的用例不覆盖之前的结论，仍会被 --lf 选中。
+    只保留最近 KEEP_RUNS 次运行。
+    """
+
+    BATCH = 1000
+    LINGER = 0.5
+    KEEP_RUNS = 100
+
+    def __init__(self, path: Path, testfiles_dir: Optional[Path] = None):
+        self.path = Path(path)
+        self.testfiles_dir = str(Path(testfiles_dir).resolve()) if testfiles_dir else None
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._case_ids: Dict[str, int] = {}
+        self._warned = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    # ---------- 写入 ----------
+
+    def begin_run(self, project: str, artifact: str, total: Optional[int]) -> int:
+        """登记一次运行并启动写线程，返回运行编号 (失败抛出 sqlite3.Error / OSError)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (started, project, artifact, total) VALUES (?, ?, ?, ?)",
+                    (time.time(), project, artifact, total)
+                )
+            run_id = cursor.lastrowid
+        finally:
+            conn.close()
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="results-db", daemon=True)
+            self._writer.start()
+        self._queue.put(("prune", run_id - self.KEEP_RUNS))
+        return run_id
+
+    def record(self, run_id: int, case: TestCase, result: TestResult):
+        """记录一个用例的结果 (只入队，路径换算等在写线程中进行)"""
+        self._queue.put((
+            "result", run_id, str(case.testfile), result.status.name, dict(result.phases or {}),
+            result.mips_digest, result.actual_digest, result.expected_digest,
+            (result.message or "")[:MAX_MESSAGE_CHARS]
+        ))
+
+    def end_run(self, run_id: int, passed: int, failed: int, total: int, stopped: bool):
+        self._queue.put(("run", (time.time(), total, passed, failed, int(stopped), run_id)))
+
+    def close(self):
+        """写完队列中的记录后结束写线程"""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+
+    def _write_loop(self):
+        try:
+            conn = self._connect()
+        except (sqlite3.Error, OSError) as e:
+            self._warn(e)
+            conn = None
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                # 攒一小段时间再写，减少事务次数
+                deadline = time.monotonic() + self.LINGER
+                while item is not None and len(batch) < self.BATCH:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                if conn is not None:
+                    try:
+                        with conn:
+                            self._write_batch(conn, [entry for entry in batch if entry is not None])
+                    except sqlite3.Error as e:
+                        self._warn(e)
+                if batch[-1] is None:
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _case_id_map(self, conn: sqlite3.Connection, paths: List[str]) -> Dict[str, int]:
+        """路径 -> cases.id，没有的先插入"""
+        missing = [path for path in set(paths) if path not in self._case_ids]
+        if missing:
+            conn.executemany(
+                "INSERT OR IGNORE INTO cases (path, lib, name) VALUES (?, ?, ?)",
+                [(path, path.rsplit("/", 1)[0] if "/" in path else "", path.rsplit("/", 1)[-1])
+                 for path in missing]
+            )
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for case_id, path in conn.execute(
+                    f"SELECT id, path FROM cases WHERE path IN ({placeholders})", chunk
+                ):
+                    self._case_ids[path] = case_id
+        return self._case_ids
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list):
+        entries = [entry for entry in batch if entry[0] == "result"]
+        ids = self._case_id_map(conn, [case_location(entry[2], self.testfiles_dir)[0] for entry in entries])
+
+        results, latest, phases = [], [], []
+        for _, run_id, testfile, status, times, mips, actual, expected, message in entries:
+            case_id = ids[case_location(testfile, self.testfiles_dir)[0]]
+            actual = actual[:DIGEST_CHARS] if actual else None
+            total = times.pop("total", None)
+            results.append((
+                run_id, case_id, status, round(total * 1000, 3) if total is not None else None,
+                mips[:DIGEST_CHARS] if mips else None, actual,
+                expected[:DIGEST_CHARS] if expected else None, message, case_id, case_id
+            ))
+            if status != "SKIPPED":
+                latest.append((status, actual, case_id))
+            phases.extend((run_id, phase, round(seconds * 1000, 3), case_id) for phase, seconds in times.items())
+
+        # 先从 cases 记下上一次的结果，再更新 cases
+        conn.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, "
+            "(SELECT status FROM cases WHERE id = ?), (SELECT actual_digest FROM cases WHERE id = ?))",
+            results
+        )
+        conn.executemany("UPDATE cases SET status = ?, actual_digest = ? WHERE id = ?", latest)
+        conn.executemany("INSERT OR REPLACE INTO phases VALUES (?, ?, ?, ?)", phases)
+        for entry in batch:
+            if entry[0] == "run":
+                conn.execute(
+                    "UPDATE runs SET finished = ?, total = ?, passed = ?, failed = ?, stopped = ? WHERE id = ?",
+                    entry[1]
+                )
+            elif entry[0] == "prune" and entry[1] > 0:
+                for table, column in (("results", "run_id"), ("phases", "run_id"), ("runs", "id")):
+                    conn.execute(f"DELETE FROM {table} WHERE {column} <= ?", (entry[1],))
+
+    def _warn(self, error: Exception):
+        if not self._warned:
+            self._warned = True
+            print(f"[结果数据库] 写入 {self.path} 失败: {error}")
+
+    # ---------- 查询 ----------
+
+    def _read(self):
+        """只读连接 (用完关闭)"""
+        return closing(sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, timeout=30))
+
+    def latest_run(self) -> Optional[int]:
+        """最近一次有结果的运行编号，没有记录时返回 None"""
+        if not self.path.exists():
+            return None
+        with self._read() as conn:
+            row = conn.execute("SELECT MAX(run_id) FROM results").fetchone()
+        return row[0] if row else None
+
+    def failed_cases(self, cases: Iterable[TestCase]) -> List[TestCase]:
+        """cases 中最近一次得出结论的结果为未通过的用例 (保持原顺序)"""
+        if not self.path.exists():
+            return []
+        placeholders = ",".join("?" * len(FAILING_STATUSES))
+        with self._read() as conn:
+            failing = {path for (path,) in conn.execute(
+                f"SELECT path FROM cases WHERE status IN ({placeholders})", FAILING_STATUSES
+            )}
+        return [case for case in cases if case_location(str(case.testfile), self.testfiles_dir)[0] in failing]
+
+    def changes(self, run_id: Optional[int] = None) -> List[dict]:
+        """
+        与各用例上一次结果相比发生变化的用例 (状态变化、输出摘要变化或首次运行)
+
+        只有两次都有输出摘要时才比较摘要 (编译错误等没有输出的结果不算输出变化)
+
+        Returns:
+            [{"path", "lib", "name", "before", "after", "output_changed"}, ...]
+        """
+        run_id = run_id if run_id is not None else self.latest_run()
+        if run_id is None:
+            return []
+        with self._read() as conn:
+            rows = conn.execute(
+                """
+                SELECT c.path, c.lib, c.name, r.prev_status, r.status, COALESCE(r.prev_digest != r.actual_digest, 0)
+                FROM results AS r JOIN cases AS c ON c.id = r.case_id
+                WHERE r.run_id = ?
+                  AND (r.prev_status IS NULL OR r.prev_status != r.status OR r.prev_digest != r.actual_digest)
+                ORDER BY c.path
+                """,
+                (run_id,)
+            ).fetchall()
+        return [
+            {"path": path, "lib": lib, "name": name, "before": before, "after": after,
+             "output_changed": before is not None and bool(output_changed)}
+            for path, lib, name, before, after, output_changed in rows
+        ]
+
+    def slowest(self, run_id: Optional[int] = None, limit: int = 10,
+                phase: Optional[str] = None) -> List[Tuple[str, float]]:
+        """某次运行中最慢的用例 [(路径, 毫秒), ...]；phase 为空时按整个用例的耗时"""
+        run_id = run_id if run_id is not None else self.latest_run()
+        if run_id is None:
+            return []
+        with self._read() as conn:
+            if phase:
+                rows = conn.execute(
+                    "SELECT c.path, p.ms FROM phases AS p JOIN cases AS c ON c.id = p.case_id "
+                    "WHERE p.run_id = ? AND p.phase = ? ORDER BY p.ms DESC LIMIT ?",
+                    (run_id, phase, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT c.path, r.duration_ms FROM results AS r JOIN cases AS c ON c.id = r.case_id "
+                    "WHERE r.run_id = ? AND r.duration_ms IS NOT NULL ORDER BY r.duration_ms DESC LIMIT ?",
+                    (run_id, limit)
+                ).fetchall()
+        return [(path, ms) for path, ms in rows]
+
+    def timeline(self, lib: str, runs: int = 20) -> Dict[str, List[Tuple[int, str]]]:
+        """测试库中每个用例在最近 runs 次运行中的状态 {用例名: [(运行编号, 状态), ...]} (未运行的不列出)"""
+        if not self.path.exists():
+            return {}
+        with self._read() as conn:
+            rows = conn.execute(
+                """
+                SELECT r.run_id, c.name, r.status
+                FROM cases AS c JOIN results AS r ON r.case_id = c.id
+                WHERE c.lib = ? AND r.run_id >= (
+                    SELECT COALESCE(MIN(id), 0) FROM (SELECT id FROM runs ORDER BY id DESC LIMIT ?)
+                )
+                ORDER BY r.run_id
+                """,
+                (lib, runs)
+            ).fetchall()
+        timeline: Dict[str, List[Tuple[int, str]]] = {}
+        for run_id, name, status in rows:
+            timeline.setdefault(name, []).append((run_id, status))
+        return timeline
+
+
+def default_store(test_dir: Path) -> ResultStore:
+    """框架目录下的运行记录 (.tmp/results.db)"""
+    test_dir = Path(test_dir)
+    return ResultStore(test_dir / ".tmp" / "results.db", test_dir / "testfiles")
+
+
+def _case_sort_key(name: str):
+    digits = "".join(ch for ch in name if ch.isdigit())
+    return (int(digits) if digits else 0, name)
+
+
+def _main(argv: List[str]):
+    store = default_store(Path(__file__).parent.parent)
+    command = argv[0] if argv else "changes"
+    if command in ("-h", "--help"):
+        print(__doc__.strip())
+        return
+
+    if command == "changes":
+        run_id = store.latest_run()
+        if run_id is None:
+            print("还没有运行记录")
+            return
+        changes = store.changes(run_id)
+        print(f"运行 #{run_id}: {len(changes)} 个用例与上一次结果不同")
+        for change in changes:
+            before = change["before"] or "(首次运行)"
+            note = " (输出变化)" if change["output_changed"] else ""
+            print(f"  {change['path']}: {before} -> {change['after']}{note}")
+    elif command == "slowest":
+        phase = argv[1] if len(argv) > 1 and not argv[1].isdigit() else None
+        limit = int(argv[-1]) if len(argv) > 1 and argv[-1].isdigit() else 10
+        for path, ms in store.slowest(limit=limit, phase=phase):
+            print(f"  {ms:10.1f} ms  {path}")
+    elif command == "timeline" and len(argv) > 1:
+        runs = int(argv[2]) if len(argv) > 2 else 20
+        timeline = store.timeline(argv[1], runs)
+        if not timeline:
+            print(f"没有 {argv[1]} 的运行记录")
+        for name in sorted(timeline, key=_case_sort_key):
+            marks = "".join("✓" if status == "PASSED" else "·" if status == "SKIPPED" else "✗"
+                            for _, status in timeline[name])
+            print(f"  {name:<20} {marks}")
+    else:
+        print(__doc__.strip())
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,89 @@
+"""
+测试阶段的公共层 - 编译/Mars/参考输出各阶段写成生成器，只有启动进程的方式由执行方决定
+
+阶段生成器 yield 请求 (Exec 启动子进程、Call 调用同步函数等)，执行方完成后把结果 send 回去，
+出错时把异常 throw 进去: 超时统一为 subprocess.TimeoutExpired，取消为 TestCancelled
+(同步执行) 或 asyncio.CancelledError (异步引擎)。缓存、回退、临时文件清理和结果判定
+只有 CompilerTester 中的一份，CompilerTester.test 用 drive 在当前线程中执行，
+AsyncTestEngine 用 drive_async 以 asyncio 子进程和线程池执行。
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Generator, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# 各阶段超时时的错误信息 (引擎据此统计超时率)
+COMPILE_TIMEOUT = "编译超时"
+MARS_TIMEOUT = "Mars执行超时"
+GCC_TIMEOUT = "g++执行超时"
+
+
+@dataclass
+class Exec:
+    """
+    启动子进程 (整个进程组在超时或取消时结束)
+
+    结果为 subprocess.CompletedProcess: 没有 on_stdout 时收集文本 stdout/stderr；
+    给出 on_stdout 时 stdout 边运行边交给它 (返回 False 时结束进程，returncode 为 None)，
+    结果的 stdout 为 None、stderr 只保留开头
+    """
+    cmd: List[str]
+    input_data: str = ""
+    timeout: Optional[float] = None
+    cwd: Optional[Path] = None
+    on_stdout: Optional[Callable[[str], bool]] = None
+    stage: Optional[str] = None      # 占用的阶段名额: compile / mars / gcc
+
+
+@dataclass
+class Call:
+    """调用同步函数 (常驻 JVM、Python 模拟器等)，异步引擎在线程池中以当前用例的取消令牌执行"""
+    func: Callable
+    args: tuple = ()
+    stage: Optional[str] = None
+
+
+@dataclass
+class StageFinished:
+    """一个阶段实际运行结束 (命中缓存时没有)，异步引擎据此调整并发数"""
+    timed_out: bool
+
+
+@dataclass
+class AwaitReference:
+    """等待与编译、运行并行获取的期望输出，结果为 (OutputCapture 或 None, 错误信息)"""
+
+
+Stage = Generator[Any, Any, T]
+
+
+def drive(stage: Stage[T], perform: Callable[[Any], Any]) -> T:
+    """在当前线程中执行阶段生成器，perform 完成每个请求"""
+    value, error = None, None
+    while True:
+        try:
+            request = stage.send(value) if error is None else stage.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = perform(request)
+        except BaseException as e:
+            error = e
+
+
+async def drive_async(stage: Stage[T], perform: Callable[[Any], Awaitable[Any]]) -> T:
+    """同 drive，perform 为协程函数"""
+    value, error = None, None
+    while True:
+        try:
+            request = stage.send(value) if error is None else stage.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = await perform(request)
+        except BaseException as e:
+            error = e
@@ -6,19 +6,226 @@ import shutil
 import json
 import os
 import hashlib
+import atexit
+import signal
+import tempfile
+import time
 from pathlib import Path
-from typing import Optional, Tuple, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Tuple, List, Callable, Iterable, Iterator
 from dataclasses import dataclass
 import threading
 
+from .cache import DiskCache, hash_parts
 from .config import get_config
-from .models import TestCase, TestResult, TestStatus
-from .utils import read_file_safe, compare_outputs
+from .mars_server import MarsServerPool, STATUS_TIMEOUT
+from .jvm_service import ServiceStartError
+from .compiler_harness import (
+    CompilerHarnessPool,
+    STATUS_OK as HARNESS_OK,
+    STATUS_ERROR as HARNESS_ERROR,
+    STATUS_TIMEOUT as HARNESS_TIMEOUT,
+)
+from .models import TestCase, TestResult, TestStatus, RunSummary
+from .compare import StreamComparator
+from .capture import OutputCapture, prune_outputs
+from .utils import read_file_safe, file_digest
+from .workspace import WorkspacePool
+from .history import DurationHistory
+from .timing import PhaseClock, PhaseStats
+from .stages import (
+    AwaitReference, Call, Exec, Stage, StageFinished, COMPILE_TIMEOUT, GCC_TIMEOUT, MARS_TIMEOUT, drive
+)
 
 
 SUPPORTED_LANGUAGES = {"java", "c", "cpp"}
 
+# 边读边处理 stdout 的子进程，stderr 最多保留的字节数
+STDERR_LIMIT = 64 * 1024
+
+
+class TestCancelled(Exception):
+    """所属的测试批次已被取消"""
+
+
+class CancelToken:
+    """
+    取消令牌 - 由 GUI 等其他线程调用 cancel()
+
+    正在运行的子进程通过 add_callback 注册的回调被立即结束，
+    尚未开始的用例不再执行。
+    """
+    
+    def __init__(self):
+        self._cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+    
+    def cancel(self):
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+    
+    def add_callback(self, callback: Callable[[], None]):
+        """注册取消时的回调 (已取消则立即调用)"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+    
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+def _new_group_kwargs() -> dict:
+    """让子进程在独立的进程组中运行，便于连同其子进程一起结束"""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def _kill_process_group(pid: int):
+    """结束以 _new_group_kwargs() 启动的进程及其子进程"""
+    try:
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(pid)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5
+            )
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+
+
+def _run_process(cmd: List[str], input_data: Optional[str] = None, timeout: Optional[float] = None,
+                 cwd: Optional[Path] = None, token: Optional[CancelToken] = None) -> subprocess.CompletedProcess:
+    """
+    subprocess.run 的替代: 以文本模式运行并收集输出
+
+    超时或 token 被取消时结束整个进程组；取消时抛出 TestCancelled
+    """
+    with subprocess.Popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, errors="replace", cwd=str(cwd) if cwd else None, **_new_group_kwargs()
+    ) as proc:
+        def kill():
+            _kill_process_group(proc.pid)
+        
+        if token is not None:
+            token.add_callback(kill)
+        try:
+            stdout, stderr = proc.communicate(input_data, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill()
+            proc.communicate()
+            raise
+        finally:
+            if token is not None:
+                token.remove_callback(kill)
+    if token is not None and token.cancelled:
+        raise TestCancelled()
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def _stream_process(cmd: List[str], input_data: Optional[str], timeout: Optional[float],
+                    cwd: Optional[Path], token: Optional[CancelToken],
+                    on_stdout: Callable[[str], bool]) -> subprocess.CompletedProcess:
+    """
+    同 _run_process，但 stdout 不在这里收集，而是边运行边交给 on_stdout (stderr 只保留开头)
+
+    on_stdout 返回 False 时立即结束整个进程组，此时 returncode 为 None；返回值的 stdout 为 None
+    """
+    import codecs
+
+    with subprocess.Popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        cwd=str(cwd) if cwd else None, **_new_group_kwargs()
+    ) as proc:
+        timed_out = threading.Event()
+        stderr_parts: List[bytes] = []
+
+        def kill():
+            _kill_process_group(proc.pid)
+
+        def expire():
+            timed_out.set()
+            kill()
+
+        def write_stdin():
+            try:
+                if input_data:
+                    proc.stdin.write(input_data.encode("utf-8"))
+                proc.stdin.close()
+            except OSError:
+                pass
+
+        def read_stderr():
+            stderr_parts.append(proc.stderr.read(STDERR_LIMIT))
+            while proc.stderr.read(65536):
+                pass
+
+        helpers = [threading.Thread(target=write_stdin, daemon=True), threading.Thread(target=read_stderr, daemon=True)]
+        for helper in helpers:
+            helper.start()
+        timer = threading.Timer(timeout, expire) if timeout else None
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+        if token is not None:
+            token.add_callback(kill)
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        stopped = False
+        try:
+            while not stopped:
+                data = proc.stdout.read1(65536)
+                text = decoder.decode(data, final=not data)
+                if text and not on_stdout(text):
+                    stopped = True
+                    kill()
+                if not data:
+                    break
+            proc.wait()
+            for helper in helpers:
+                helper.join()
+        except BaseException:
+            kill()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if token is not None:
+                token.remove_callback(kill)
+    if token is not None and token.cancelled:
+        raise TestCancelled()
+    if timed_out.is_set() and not stopped:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    stderr = b"".join(stderr_parts).decode("utf-8", errors="replace")
+    return subprocess.CompletedProcess(cmd, None if stopped else proc.returncode, None, stderr)
+
+
+def _feed_expected(future, comparator: StreamComparator):
+    """参考输出完成时交给 comparator (Future 的完成回调，线程池与事件循环通用)"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    expected, _ = future.result()
+    if expected is not None:
+        comparator.set_expected(expected)
+
 
 @dataclass
 class CompilerConfig:
@@ -27,13 +234,6 @@ class CompilerConfig:
     object_code: str = "mips"
 
 
-@dataclass
-class TestTask:
-    """测试任务"""
-    case: TestCase
-    worker_id: int
-
-
 class CompilerTester:
     """编译器测试器 - 支持多线程和多语言"""
     
@@ -56,8 +256,65 @@ class CompilerTester:
         self.compiler_jar = self.work_dir / "Compiler.jar"  # Java
         self.compiler_exe = self.work_dir / "Compiler.exe"  # C/C++
         
-        # 线程本地存储
+        # 线程本地存储 (当前用例的取消令牌)
         self._local = threading.local()
+        
+        # 用例工作目录池: 每个用例执行期间独占一个 worker_N 目录
+        # (可配置放在 /dev/shm 等内存盘上，编译产物仍留在 work_dir)
+        self._owns_scratch = False
+        self.scratch_root = self._resolve_scratch_root()
+        self.workspaces = WorkspacePool(self.scratch_root)
+        atexit.register(self.cleanup_workers)
+        
+        # g++ 参考输出缓存
+        cache_cfg = self.config.cache
+        self.ref_cache = DiskCache(
+            self.work_dir / "cache" / "reference",
+            cache_cfg.reference_max_mb * 1024 * 1024 if cache_cfg.enabled else 0
+        )
+        self._gcc_identity: Optional[str] = None
+        self._gcc_identity_lock = threading.Lock()
+        
+        # 被测编译器的 MIPS 产物缓存 (键: 编译器产物哈希 + 用例内容)
+        self.mips_cache = DiskCache(
+            self.work_dir / "cache" / "mips",
+            cache_cfg.mips_max_mb * 1024 * 1024 if cache_cfg.enabled else 0
+        )
+        self._artifact_hash: Optional[Tuple[tuple, str]] = None
+        self._artifact_lock = threading.Lock()
+        
+        # 启动 Compiler.jar / Mars.jar 的 JVM 参数和 AppCDS 归档 (首次用到时创建)
+        self._jvm = None
+        
+        # 常驻 Mars 服务 (execution.mars_backend == "server" 时使用)
+        self._mars_pool: Optional[MarsServerPool] = None
+        if self.config.execution.mars_backend == "server":
+            self._mars_pool = MarsServerPool(
+                self.config.tools.get_java(), self.mars_jar, self.work_dir,
+                self.config.tools.get_javac()
+            )
+        
+        # Java 编译器批量 harness (execution.compiler_harness 开启时使用)
+        self._harness_pool: Optional[CompilerHarnessPool] = self._new_harness_pool()
+        
+        # 用例耗时历史，用于按预计耗时从长到短调度
+        self.durations = DurationHistory(self.work_dir / "durations.json")
+        
+        # 超出内存上限的用例输出写到这里，未通过用例的完整输出保留供 GUI 按需读取
+        self.output_dir = self.work_dir / "outputs"
+        
+        # 最近一次 test_parallel 的摘要
+        self.last_summary: Optional[RunSummary] = None
+    
+    @property
+    def jvm(self):
+        """JvmProfile (jvm_profile 只在需要启动 JVM 时导入)"""
+        if self._jvm is None:
+            from .jvm_profile import JvmProfile
+            self._jvm = JvmProfile(
+                self.config.tools.get_java(), self.config.tools.jvm_options, self.work_dir / "cds"
+            )
+        return self._jvm
     
     def _load_compiler_config(self) -> CompilerConfig:
         """从编译器项目读取config.json"""
@@ -78,16 +335,39 @@ class CompilerTester:
         
         return CompilerConfig()
     
+    def _resolve_scratch_root(self) -> Path:
+        """用例工作目录的根: execution.scratch_dir 可用时在其下建私有目录，否则回退到 work_dir"""
+        execution = self.config.execution
+        if not execution.scratch_dir:
+            return self.work_dir
+        
+        base = Path(os.path.expandvars(os.path.expanduser(execution.scratch_dir)))
+        try:
+            free = shutil.disk_usage(base).free
+            noexec = hasattr(os, "statvfs") and os.statvfs(base).f_flag & getattr(os, "ST_NOEXEC", 0)
+        except OSError as e:
+            print(f"临时目录 {base} 不可用 ({e})，工作目录回退到 {self.work_dir}")
+            return self.work_dir
+        if free < execution.scratch_min_free_mb * 1024 * 1024:
+            print(f"临时目录 {base} 剩余空间不足 {execution.scratch_min_free_mb}MB，工作目录回退到 {self.work_dir}")
+            return self.work_dir
+        if noexec:
+            # g++ 生成的参考程序需要在工作目录中执行
+            print(f"临时目录 {base} 以 noexec 挂载，工作目录回退到 {self.work_dir}")
+            return self.work_dir
+        
+        try:
+            root = Path(tempfile.mkdtemp(prefix="sysytest_", dir=str(base)))
+        except OSError as e:
+            print(f"无法在 {base} 创建目录 ({e})，工作目录回退到 {self.work_dir}")
+            return self.work_dir
+        self._owns_scratch = True
+        return root
+    
     def get_compiler_language(self) -> str:
         """获取编译器语言"""
         return self.compiler_config.language
     
-    def _get_worker_dir(self, worker_id: int) -> Path:
-        """获取工作线程的独立目录"""
-        worker_dir = self.work_dir / f"worker_{worker_id}"
-        worker_dir.mkdir(parents=True, exist_ok=True)
-        return worker_dir
-    
     def compile_project(self) -> Tuple[bool, str]:
         """根据语言编译项目"""
         lang = self.compiler_config.language
@@ -102,51 +382,89 @@ class CompilerTester:
         return False, f"未知语言: {lang}"
     
     def compile_java_project(self) -> Tuple[bool, str]:
-        """编译Java编译器项目为jar包"""
+        """编译Java编译器项目为jar包 (源码未变化时跳过，否则只重编受影响的类)"""
+        from .build import JavaBuild, single_flight
+        
         if not self.project_src_dir.exists():
             return False, f"找不到源码目录: {self.project_src_dir}"
         
-        java_files = list(self.project_src_dir.rglob("*.java"))
-        if not java_files:
-            return False, "找不到Java源文件"
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        tools = self.config.tools
+        builder = JavaBuild(
+            src_dir=self.project_src_dir,
+            build_dir=self.work_dir / "build",
+            jar_path=self.compiler_jar,
+            state_path=self.work_dir / "java_build.json",
+            javac=tools.get_javac(),
+            jar_tool=tools.get_jar(),
+            timeout=self.config.timeout.java_compile,
+        )
+        # 编译按钮和运行测试同时触发时只构建一次
+        success, msg = single_flight(f"java:{self.compiler_jar}", builder.build)
+        if not success:
+            return False, msg
         
-        # 创建临时编译目录
-        build_dir = self.work_dir / "build"
-        build_dir.mkdir(parents=True, exist_ok=True)
+        # 按配置重新准备批量编译 harness: 之前因状态泄漏停用的，编译器修改后重新启用 (失败不影响逐个启动的方式)
+        if self._harness_pool is not None:
+            self._harness_pool.close_all()
+        self._harness_pool = self._new_harness_pool()
+        if self._harness_pool is not None:
+            ok, harness_msg = self._harness_pool.ensure_built()
+            if not ok:
+                self._harness_pool = None
+                msg += f"\n批量编译harness不可用，逐个启动编译器: {harness_msg}"
         
-        tools = self.config.tools
+        msg += "".join(f"\n{m}" for m in self.prepare_jvm_archives())
+        return True, msg
+    
+    def _new_harness_pool(self) -> Optional[CompilerHarnessPool]:
+        """execution.compiler_harness 开启且被测编译器是 Java 时创建 harness 池"""
+        if not (self.config.execution.compiler_harness and self.compiler_config.language == "java"):
+            return None
+        return CompilerHarnessPool(
+            self.config.tools.get_java(), self.compiler_jar, self.work_dir,
+            self.config.tools.get_javac()
+        )
+    
+    def prepare_jvm_archives(self) -> List[str]:
+        """
+        为 Compiler.jar (Java 项目) 和 Mars.jar 生成 AppCDS 归档 (已是最新时不做任何事)
         
-        try:
-            # 1. 编译 Java 文件
-            cmd = [tools.get_javac(), "-encoding", "UTF-8", "-d", str(build_dir)] + [str(f) for f in java_files]
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.java_compile
-            )
-            if result.returncode != 0:
-                return False, f"编译失败:\n{result.stderr}"
-            
-            # 2. 创建 MANIFEST.MF
-            manifest_path = build_dir / "MANIFEST.MF"
-            manifest_path.write_text("Main-Class: Compiler\n", encoding='utf-8')
-            
-            # 3. 打包为 jar
-            jar_cmd = [tools.get_jar(), "cfm", str(self.compiler_jar), str(manifest_path), "-C", str(build_dir), "."]
-            jar_result = subprocess.run(jar_cmd, capture_output=True, text=True, errors="replace", timeout=30)
-            if jar_result.returncode != 0:
-                return False, f"打包jar失败:\n{jar_result.stderr}"
-            
-            return True, f"[Java] 成功编译 {len(java_files)} 个文件 -> Compiler.jar"
+        Returns:
+            新生成归档或生成失败的提示
+        """
+        from .jvm_profile import (
+            COMPILER_TRAINING_FILES, COMPILER_TRAINING_INPUT,
+            MARS_TRAINING_FILES, MARS_TRAINING_ARGS, MARS_TRAINING_INPUT
+        )
         
-        except subprocess.TimeoutExpired:
-            return False, "编译超时"
-        except FileNotFoundError as e:
-            return False, f"找不到命令: {e.filename}，请确保已安装JDK并配置PATH或在config.yaml中指定路径"
-        except Exception as e:
-            return False, str(e)
+        messages = []
+        if self.compiler_config.language == "java" and self.compiler_jar.exists():
+            _, msg = self.jvm.ensure_archive(
+                self.compiler_jar, COMPILER_TRAINING_FILES, input_data=COMPILER_TRAINING_INPUT
+            )
+            if msg:
+                messages.append(f"[JVM] {msg}")
+        if self.config.execution.mars_backend != "server" and self.mars_jar.exists():
+            _, msg = self.jvm.ensure_archive(
+                self.mars_jar, MARS_TRAINING_FILES, MARS_TRAINING_ARGS, MARS_TRAINING_INPUT
+            )
+            if msg:
+                messages.append(f"[JVM] {msg}")
+        return messages
     
     def compile_c_cpp_project(self) -> Tuple[bool, str]:
-        """编译C/C++编译器项目为可执行文件"""
+        """编译C/C++编译器项目为可执行文件 (源码未变化时跳过)"""
+        from .build import single_flight
+        
+        # 编译按钮和运行测试同时触发时只构建一次
+        return single_flight(f"cxx:{self.compiler_exe}", self._compile_c_cpp_project)
+    
+    def _compile_c_cpp_project(self) -> Tuple[bool, str]:
+        from .build import (
+            CxxBuild, CMakeBuildState, tool_identity, cmake_file_api_query, find_cmake_executable
+        )
+        
         if not self.project_src_dir.exists():
             return False, f"找不到源码目录: {self.project_src_dir}"
         
@@ -179,6 +497,15 @@ class CompilerTester:
             if not cmake_exists:
                 return False, f"找不到命令: {cmake}，请确保已安装CMake并配置PATH或在config.yaml中指定路径"
             
+            # 源码、CMakeLists 和工具都没变且产物还在时跳过 cmake --build
+            build_state = CMakeBuildState(
+                self.work_dir / f"cmake_build_{project_key}.json", cmake_lists.parent,
+                tool_identity(cmake), str(getattr(tools, "gcc_path", ""))
+            )
+            artifact = build_state.cached_artifact(self.compiler_exe) if cache_path.exists() else None
+            if artifact is not None:
+                return True, f"[{lang.upper()}] 源码未变化，跳过CMake构建 -> {artifact.name}"
+            
             configured_gcc_path = getattr(tools, "gcc_path", "")
             if hasattr(tools, "_normalize"):
                 configured_gcc_path = tools._normalize(configured_gcc_path)
@@ -203,6 +530,7 @@ class CompilerTester:
             if guessed_c_compiler is None and use_cxx_compiler and cxx_for_cmake.lower() in ("g++", "g++.exe"):
                 guessed_c_compiler = "gcc"
             
+            cmake_file_api_query(build_dir)
             generator = None
             if not cache_path.exists() and shutil.which("ninja") is not None:
                 generator = "Ninja"
@@ -307,6 +635,7 @@ class CompilerTester:
                             except Exception:
                                 pass
                             build_dir.mkdir(parents=True, exist_ok=True)
+                            cmake_file_api_query(build_dir)
                             cache_path = build_dir / "CMakeCache.txt"
                             
                             retry_configure_cmd = [
@@ -344,23 +673,19 @@ class CompilerTester:
                 if build_result.returncode != 0:
                     return False, f"CMake构建失败:\n{build_result.stderr}\n{build_result.stdout}"
                 
-                exes = [
-                    p for p in build_dir.rglob("*.exe")
-                    if "CMakeFiles" not in p.parts and p.is_file()
-                ]
-                if not exes:
+                # 通过 CMake file API 得到可执行目标的路径 (Linux 上没有 .exe 后缀)
+                chosen = find_cmake_executable(
+                    cmake, cmake_lists.parent, build_dir, self.config.timeout.cmake_configure, env
+                )
+                if chosen is None:
                     return False, f"CMake构建完成但未找到可执行文件: {build_dir}"
                 
-                preferred = [p for p in exes if p.name.lower() in ("compiler.exe", "compiler")]
-                if preferred:
-                    chosen = preferred[0]
-                elif len(exes) == 1:
-                    chosen = exes[0]
-                else:
-                    chosen = max(exes, key=lambda p: p.stat().st_mtime)
-                
-                shutil.copy2(chosen, self.compiler_exe)
-                return True, f"[{lang.upper()}] CMake构建成功 -> {chosen.name}"
+                # 产物内容没变时不覆盖 Compiler.exe，MIPS 产物缓存保持有效
+                copied = build_state.record(chosen, self.compiler_exe)
+                msg = f"[{lang.upper()}] CMake构建成功 -> {chosen.name}"
+                if not copied:
+                    msg += " (产物未变化)"
+                return True, msg
             
             except subprocess.TimeoutExpired:
                 return False, "编译超时"
@@ -381,32 +706,84 @@ class CompilerTester:
             return False, f"找不到{lang.upper()}源文件"
         
         self.work_dir.mkdir(parents=True, exist_ok=True)
-        gcc = tools.get_gcc()
-        
+        flags = [self.config.build.opt_flag()]
+        if lang == "cpp":
+            flags.append("-std=c++17")
+        project_key = hashlib.md5(str(self.project_dir).encode("utf-8")).hexdigest()[:8]
+        builder = CxxBuild(
+            src_dir=self.project_src_dir,
+            obj_dir=self.work_dir / f"obj_{project_key}",
+            exe_path=self.compiler_exe,
+            state_path=self.work_dir / f"cxx_build_{project_key}.json",
+            compiler=tools.get_gcc(),
+            flags=flags,
+            timeout=self.config.timeout.gcc_compile,
+            jobs=self.config.build.jobs,
+        )
+        return builder.build(sorted(source_files), lang.upper())
+
+    def _get_artifact_hash(self) -> str:
+        """编译器产物 (Compiler.jar/Compiler.exe) 的内容哈希，按 (size, mtime) 复用"""
+        artifact = self.compiler_jar if self.compiler_config.language == "java" else self.compiler_exe
         try:
-            # 编译
-            cmd = [gcc, "-o", str(self.compiler_exe)] + [str(f) for f in source_files]
-            if lang == "cpp":
-                cmd.insert(1, "-std=c++17")
-            
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.gcc_compile
+            st = artifact.stat()
+        except OSError:
+            return ""
+        signature = (str(artifact), st.st_size, st.st_mtime_ns)
+        with self._artifact_lock:
+            if self._artifact_hash is not None and self._artifact_hash[0] == signature:
+                return self._artifact_hash[1]
+            h = hashlib.sha256()
+            try:
+                with open(artifact, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        h.update(chunk)
+            except OSError:
+                return ""
+            digest = h.hexdigest()
+            self._artifact_hash = (signature, digest)
+            return digest
+    
+    def _perform(self, request):
+        """在当前线程中完成阶段生成器的一个请求 (见 stages 模块)"""
+        if isinstance(request, StageFinished):
+            return None
+        if isinstance(request, Call):
+            value = request.func(*request.args)
+        elif request.on_stdout is None:
+            value = _run_process(request.cmd, request.input_data, request.timeout, request.cwd, self._token())
+        else:
+            value = _stream_process(
+                request.cmd, request.input_data, request.timeout, request.cwd, self._token(), request.on_stdout
             )
-            if result.returncode != 0:
-                return False, f"编译失败:\n{result.stderr}"
-            
-            return True, f"[{lang.upper()}] 成功编译 {len(source_files)} 个文件 -> Compiler.exe"
+        self._check_cancelled()
+        return value
+    
+    def _run_compiler(self, source_file: Path, worker_dir: Path,
+                      clock: Optional[PhaseClock] = None) -> Tuple[bool, str]:
+        """运行编译器生成MIPS代码 (产物和用例均未变化时直接取缓存)"""
+        return drive(self._compile_stage(source_file, worker_dir, clock or PhaseClock()), self._perform)
+    
+    def _compile_stage(self, source_file: Path, worker_dir: Path, clock: PhaseClock) -> Stage[Tuple[bool, str]]:
+        """编译阶段: 命中 MIPS 缓存时不启动编译器 (等待编译名额的时间计入 compile)"""
+        with clock.phase("staging"):
+            key, cached = self._prepare_compile(source_file, worker_dir)
+        if cached is not None:
+            return cached
         
-        except subprocess.TimeoutExpired:
-            return False, "编译超时"
-        except FileNotFoundError as e:
-            return False, f"找不到命令: {e.filename}，请确保已安装GCC并配置PATH或在config.yaml中指定路径"
-        except Exception as e:
-            return False, str(e)
-
-    def _run_compiler(self, source_file: Path, worker_dir: Path) -> Tuple[bool, str]:
-        """运行编译器生成MIPS代码"""
+        with clock.phase("compile"):
+            success, msg, cacheable = yield from self._invoke_compiler(worker_dir)
+            yield StageFinished(msg == COMPILE_TIMEOUT)
+            self._store_compile(key, success, msg, cacheable, worker_dir)
+        return success, msg
+    
+    def _prepare_compile(self, source_file: Path, worker_dir: Path) -> Tuple[Optional[str], Optional[Tuple[bool, str]]]:
+        """
+        写入 testfile.txt 并查询 MIPS 产物缓存
+        
+        Returns:
+            (缓存键, 命中时的编译结果) - 缓存不可用时键为 None
+        """
         testfile_path = worker_dir / "testfile.txt"
         mips_path = worker_dir / "mips.txt"
         
@@ -419,94 +796,376 @@ class CompilerTester:
         if mips_path.exists():
             mips_path.unlink()
         
-        # 根据语言选择运行方式
-        lang = self.compiler_config.language
-        tools = self.config.tools
+        key = None
+        if self.mips_cache.max_bytes > 0 and self._is_compiler_ready():
+            artifact_hash = self._get_artifact_hash()
+            if artifact_hash:
+                key = hash_parts(artifact_hash, content)
+                cached = self.mips_cache.get(key)
+                if cached is not None:
+                    if cached.get("ok"):
+                        mips_path.write_bytes(cached.get("mips", "").encode("latin-1"))
+                        return key, (True, "")
+                    return key, (False, cached.get("message", ""))
+        return key, None
+    
+    def _store_compile(self, key: Optional[str], success: bool, msg: str, cacheable: bool, worker_dir: Path):
+        """把一次编译的结果写入 MIPS 产物缓存"""
+        if key is None or not cacheable:
+            return
+        if success:
+            mips = (worker_dir / "mips.txt").read_bytes().decode("latin-1")
+            self.mips_cache.put(key, {"ok": True, "mips": mips})
+        else:
+            self.mips_cache.put(key, {"ok": False, "message": msg})
+    
+    def _invoke_compiler(self, worker_dir: Path) -> Stage[Tuple[bool, str, bool]]:
+        """
+        在工作目录中启动被测编译器
         
-        if lang == "java":
-            if not self.compiler_jar.exists():
-                return False, "Compiler.jar不存在，请先编译项目"
-            cmd = [tools.get_java(), "-jar", str(self.compiler_jar)]
-        else:  # c/cpp
-            if not self.compiler_exe.exists():
-                return False, "Compiler.exe不存在，请先编译项目"
-            cmd = [str(self.compiler_exe)]
+        Returns:
+            (是否成功, 错误信息, 结果是否可缓存)
+        """
+        cmd, error = self._compiler_command()
+        if cmd is None:
+            return False, error, False
+        if self._harness_pool is not None:
+            harness_result = yield Call(self._invoke_compiler_harness, (worker_dir,), stage="compile")
+            if harness_result is not None:
+                return harness_result
         
         try:
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.compile, cwd=str(worker_dir)
-            )
-            if result.returncode != 0:
-                return False, f"编译器错误:\n{result.stderr}\n{result.stdout}"
-            if not mips_path.exists():
-                return False, "编译器未生成mips.txt"
-            return True, ""
+            result = yield Exec(cmd, timeout=self.config.timeout.compile, cwd=worker_dir, stage="compile")
         except subprocess.TimeoutExpired:
-            return False, "编译超时"
+            return False, COMPILE_TIMEOUT, False
+        except TestCancelled:
+            raise
         except Exception as e:
-            return False, str(e)
+            return False, str(e), False
+        return self._compile_outcome(result.returncode, result.stdout, result.stderr, worker_dir)
     
-    def _run_mars(self, input_file: Optional[Path], worker_dir: Path) -> Tuple[Optional[str], str]:
-        """运行Mars模拟器"""
-        mips_path = worker_dir / "mips.txt"
-        tools = self.config.tools
-        cmd = [tools.get_java(), "-jar", str(self.mars_jar), "nc", str(mips_path)]
+    def _compiler_command(self) -> Tuple[Optional[List[str]], str]:
+        """启动被测编译器的命令，产物不存在时返回 (None, 错误信息)"""
+        if self.compiler_config.language == "java":
+            if not self.compiler_jar.exists():
+                return None, "Compiler.jar不存在，请先编译项目"
+            return self.jvm.command(self.compiler_jar), ""
+        # c/cpp
+        if not self.compiler_exe.exists():
+            return None, "Compiler.exe不存在，请先编译项目"
+        return [str(self.compiler_exe)], ""
+    
+    @staticmethod
+    def _compile_outcome(returncode: int, stdout: str, stderr: str, worker_dir: Path) -> Tuple[bool, str, bool]:
+        """根据编译器退出码和产物判定编译结果 (正常退出的结果都可缓存)"""
+        if returncode != 0:
+            return False, f"编译器错误:\n{stderr}\n{stdout}", True
+        if not (worker_dir / "mips.txt").exists():
+            return False, "编译器未生成mips.txt", True
+        return True, "", True
+    
+    def _invoke_compiler_harness(self, worker_dir: Path) -> Optional[Tuple[bool, str, bool]]:
+        """在常驻 harness 中编译，harness 检测到状态泄漏或意外退出时返回None并停用harness"""
+        token = self._token()
+        pool = self._harness_pool
+        if pool is None:
+            return None
+        ok, _ = pool.ensure_built()
+        if not ok:
+            self._harness_pool = None
+            return None
         
-        input_data = ""
-        if input_file and input_file.exists():
-            input_data = read_file_safe(input_file)
+        try:
+            status, output = pool.compile(worker_dir, self.config.timeout.compile)
+        except ServiceStartError as e:
+            status, output = f"启动失败: {e}", str(e)
+        except Exception as e:
+            status, output = None, str(e)
+        
+        if status == HARNESS_OK:
+            if not (worker_dir / "mips.txt").exists():
+                return False, "编译器未生成mips.txt", True
+            return True, "", True
+        if status == HARNESS_ERROR:
+            return False, f"编译器错误:\n{output}", True
+        if status == HARNESS_TIMEOUT:
+            return False, COMPILE_TIMEOUT, False
+        if token is not None and token.cancelled:
+            # 取消时 harness 被主动结束，不代表状态泄漏
+            raise TestCancelled()
+        
+        # LEAK 或 harness 退出: 本次及之后都改为逐个启动进程
+        if self._harness_pool is pool:
+            self._harness_pool = None
+            print(f"批量编译harness检测到状态泄漏或意外退出 ({status})，回退到逐个启动编译器")
+            pool.close_all()
+        return None
+    
+    def _mars_stage(self, input_file: Optional[Path], worker_dir: Path,
+                    comparator: Optional[StreamComparator] = None) -> Stage[Tuple[Optional[OutputCapture], str]]:
+        """
+        运行Mars模拟器，stdout 收集到有界的 OutputCapture 中
+
+        给出 comparator 时边运行边比较，输出与期望不同时提前结束 (comparator.diverged，返回已有的部分输出)
+        """
+        if self.config.execution.mars_backend == "python":
+            result = yield Call(self._run_mars_python, (input_file, worker_dir, comparator), stage="mars")
+            if result is not None:
+                yield StageFinished(result[1] == MARS_TIMEOUT)
+                return result
+            if comparator is not None:
+                comparator.restart()
+        result = yield from self._mars_jar_stage(input_file, worker_dir, comparator)
+        yield StageFinished(result[1] == MARS_TIMEOUT)
+        return result
+    
+    def _new_capture(self) -> OutputCapture:
+        """按 execution.output_limit_mb 限制大小的输出收集器，较大的输出写入 output_dir"""
+        return OutputCapture(self.config.execution.output_limit_mb * 1024 * 1024, self.output_dir)
+    
+    def _output_limit_message(self, who: str) -> str:
+        return f"{who}输出超过 {self.config.execution.output_limit_mb} MB，已结束运行"
+    
+    def _finish_mars(self, capture: OutputCapture,
+                     comparator: Optional[StreamComparator]) -> Tuple[Optional[OutputCapture], str]:
+        """Mars 运行结束 (或被提前结束) 后的收尾"""
+        capture.close()
+        if capture.truncated and not (comparator is not None and comparator.diverged):
+            capture.discard()
+            return None, self._output_limit_message("Mars")
+        return capture, ""
+    
+    def _run_mars_python(self, input_file: Optional[Path], worker_dir: Path,
+                         comparator: Optional[StreamComparator] = None) -> Optional[Tuple[Optional[OutputCapture], str]]:
+        """
+        用进程内的 Python 模拟器运行
+
+        Returns:
+            同 _mars_stage；程序用到模拟器不支持的指令或运行出错时返回 None，由 Mars.jar 重新执行
+        """
+        from .mips_sim import simulate, SimulatorFallback, StepLimitExceeded, SimulationCancelled
+        
+        token = self._token()
+        input_data = self._read_input(input_file)
+        capture = self._new_capture()
+        out: List[str] = []
+        # 与 Mars.jar 子进程一样按 timeout.mars 限制运行时间
+        deadline = time.monotonic() + self.config.timeout.mars
+        timed_out = False
+        
+        def drain() -> bool:
+            """把模拟器新产生的输出交给 capture / comparator，返回是否应结束运行"""
+            if not out:
+                return False
+            text = "".join(out)
+            out.clear()
+            if not capture.write(text):
+                return True
+            return comparator is not None and not comparator.feed(text)
+        
+        def cancelled() -> bool:
+            # 模拟器每执行一段指令调用一次
+            nonlocal timed_out
+            if time.monotonic() > deadline:
+                timed_out = True
+                return True
+            return (token is not None and token.cancelled) or drain()
         
         try:
-            result = subprocess.run(
-                cmd, input=input_data, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.mars, cwd=str(worker_dir)
+            source = read_file_safe(worker_dir / "mips.txt")
+            simulate(source, input_data, self.config.execution.sim_max_steps, cancelled, out)
+            drain()
+            return self._finish_mars(capture, comparator)
+        except StepLimitExceeded:
+            capture.discard()
+            return None, MARS_TIMEOUT
+        except SimulationCancelled:
+            if timed_out:
+                capture.discard()
+                return None, MARS_TIMEOUT
+            if token is not None and token.cancelled:
+                capture.discard()
+                raise TestCancelled()
+            return self._finish_mars(capture, comparator)
+        except SimulatorFallback:
+            capture.discard()
+            return None
+    
+    def _run_mars_jar(self, input_file: Optional[Path], worker_dir: Path,
+                      comparator: Optional[StreamComparator] = None) -> Tuple[Optional[OutputCapture], str]:
+        """用 Mars.jar 运行 (同步执行 _mars_jar_stage)"""
+        return drive(self._mars_jar_stage(input_file, worker_dir, comparator), self._perform)
+    
+    def _mars_jar_stage(self, input_file: Optional[Path], worker_dir: Path,
+                        comparator: Optional[StreamComparator] = None) -> Stage[Tuple[Optional[OutputCapture], str]]:
+        """用 Mars.jar 运行 (常驻服务或子进程；只有子进程方式支持边运行边比较)"""
+        if self._mars_pool is not None:
+            result = yield Call(self._run_mars_server, (input_file, worker_dir), stage="mars")
+            if result is not None:
+                return result
+        
+        input_data = self._read_input(input_file)
+        capture = self._new_capture()
+        
+        def on_stdout(text: str) -> bool:
+            return capture.write(text) and (comparator is None or comparator.feed(text))
+        
+        try:
+            yield Exec(
+                self._mars_command(worker_dir), input_data, self.config.timeout.mars, worker_dir, on_stdout,
+                stage="mars"
             )
-            return result.stdout, ""
         except subprocess.TimeoutExpired:
-            return None, "Mars执行超时"
+            capture.discard()
+            return None, MARS_TIMEOUT
         except Exception as e:
+            capture.discard()
+            if isinstance(e, TestCancelled):
+                raise
             return None, str(e)
+        except BaseException:
+            # 异步引擎中被取消
+            capture.discard()
+            raise
+        return self._finish_mars(capture, comparator)
+    
+    def _mars_command(self, worker_dir: Path) -> List[str]:
+        """以子进程方式运行 Mars.jar 的命令"""
+        mips_path = worker_dir / "mips.txt"
+        return self.jvm.command(self.mars_jar, ["nc", str(mips_path)])
+    
+    @staticmethod
+    def _read_input(input_file: Optional[Path]) -> str:
+        """读取用例输入，没有输入文件时为空串"""
+        if input_file and input_file.exists():
+            return read_file_safe(input_file)
+        return ""
     
-    def _run_gcc(self, source_file: Path, input_file: Optional[Path], worker_dir: Path) -> Tuple[Optional[str], str]:
+    def _run_mars_server(self, input_file: Optional[Path],
+                         worker_dir: Path) -> Optional[Tuple[Optional[OutputCapture], str]]:
+        """在当前线程的常驻 Mars JVM 中运行，服务不可用时停用常驻服务并返回 None (改用子进程)"""
+        pool = self._mars_pool
+        if pool is None:
+            return None
+        ok, msg = pool.ensure_built()
+        if ok:
+            input_data = self._read_input(input_file)
+            try:
+                stdout, status = pool.run(
+                    worker_dir / "mips.txt", input_data.encode("utf-8"), self.config.timeout.mars
+                )
+            except ServiceStartError as e:
+                self._check_cancelled()
+                msg = str(e)
+            except Exception as e:
+                return None, str(e)
+            else:
+                if stdout is None:
+                    return None, MARS_TIMEOUT if status == STATUS_TIMEOUT else f"Mars服务异常: {status}"
+                # 常驻服务在运行结束后一次性返回输出，这里只能事后截断
+                capture = self._new_capture()
+                capture.write(stdout)
+                return self._finish_mars(capture, None)
+        if self._mars_pool is pool:
+            print(f"{msg}\n回退到子进程方式运行Mars")
+            self._mars_pool = None
+        return None
+    
+    def _get_gcc_identity(self) -> str:
+        """g++ 的路径和版本信息，作为参考输出缓存键的一部分 (获取失败返回空串)"""
+        with self._gcc_identity_lock:
+            if self._gcc_identity is None:
+                gcc = self.config.tools.get_gcc()
+                identity = ""
+                try:
+                    result = subprocess.run(
+                        [gcc, "--version"], capture_output=True, text=True, errors="replace",
+                        timeout=self.config.timeout.gcc_compile
+                    )
+                    if result.returncode == 0:
+                        identity = f"{shutil.which(gcc) or gcc}\n{result.stdout}"
+                except Exception:
+                    pass
+                self._gcc_identity = identity
+            return self._gcc_identity
+    
+    def _run_reference(self, source_file: Path, input_file: Optional[Path], worker_dir: Path,
+                       clock: Optional[PhaseClock] = None) -> Tuple[Optional[OutputCapture], str]:
+        """获取期望结果，命中缓存时跳过g++"""
+        return drive(self._reference_stage(source_file, input_file, worker_dir, clock or PhaseClock()), self._perform)
+    
+    def _reference_stage(self, source_file: Path, input_file: Optional[Path], worker_dir: Path,
+                         clock: PhaseClock) -> Stage[Tuple[Optional[OutputCapture], str]]:
+        """期望输出阶段，命中参考输出缓存时跳过g++"""
+        source_code = read_file_safe(source_file)
+        input_data = self._read_input(input_file)
+        # 首次调用会执行 g++ --version
+        key = yield Call(self._reference_key, (source_code, input_data))
+        if key is not None:
+            cached = self.ref_cache.get(key)
+            if cached is not None and isinstance(cached.get("stdout"), str):
+                return OutputCapture.from_text(cached["stdout"]), ""
+        
+        gcc_out, gcc_err = yield from self._gcc_stage(source_code, input_data, worker_dir, clock)
+        yield StageFinished(gcc_err == GCC_TIMEOUT)
+        self._store_reference(key, gcc_out)
+        return gcc_out, gcc_err
+    
+    def _store_reference(self, key: Optional[str], gcc_out: Optional[OutputCapture]):
+        """缓存参考输出 (只缓存能整段放在内存中的输出)"""
+        if key is None or gcc_out is None:
+            return
+        text = gcc_out.text()
+        if text is not None:
+            self.ref_cache.put(key, {"stdout": text})
+    
+    def _reference_key(self, source_code: str, input_data: str) -> Optional[str]:
+        """参考输出的缓存键，缓存关闭或无法确定 g++ 版本时返回 None"""
+        if self.ref_cache.max_bytes <= 0:
+            return None
+        gcc_identity = self._get_gcc_identity()
+        if not gcc_identity:
+            return None
+        return hash_parts(source_code, self.config.c_header, input_data, gcc_identity)
+    
+    def _gcc_stage(self, source_code: str, input_data: str, worker_dir: Path,
+                   clock: PhaseClock) -> Stage[Tuple[Optional[OutputCapture], str]]:
         """使用g++编译运行获取期望结果"""
         tmp_src = worker_dir / "tmp_test.c"
         tmp_exe = worker_dir / "tmp_test.exe"
-        
-        source_code = read_file_safe(source_file)
-        full_code = self.config.c_header + source_code
-        
-        tools = self.config.tools
-        gcc = tools.get_gcc()
+        gcc = self.config.tools.get_gcc()
+        timeout = self.config.timeout
         
         try:
-            with open(tmp_src, "w", encoding="utf-8", newline="\n") as f:
-                f.write(full_code)
-            
             # 编译
-            compile_result = subprocess.run(
-                [gcc, str(tmp_src), "-o", str(tmp_exe)],
-                capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.gcc_compile
-            )
+            with clock.phase("ref_compile"):
+                with open(tmp_src, "w", encoding="utf-8", newline="\n") as f:
+                    f.write(self.config.c_header + source_code)
+                compile_result = yield Exec(
+                    [gcc, str(tmp_src), "-o", str(tmp_exe)], timeout=timeout.gcc_compile, stage="gcc"
+                )
             
             if compile_result.returncode != 0:
                 return None, f"g++编译失败:\n{compile_result.stderr}"
             
             # 运行
-            input_data = ""
-            if input_file and input_file.exists():
-                input_data = read_file_safe(input_file)
-            
-            run_result = subprocess.run(
-                [str(tmp_exe)], input=input_data, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.gcc_run
-            )
-            
-            return run_result.stdout, ""
+            capture = self._new_capture()
+            try:
+                with clock.phase("ref_run"):
+                    yield Exec([str(tmp_exe)], input_data, timeout.gcc_run, None, capture.write, stage="gcc")
+            except BaseException:
+                capture.discard()
+                raise
+            capture.close()
+            if capture.truncated:
+                capture.discard()
+                return None, self._output_limit_message("g++")
+            return capture, ""
             
         except subprocess.TimeoutExpired:
-            return None, "g++执行超时"
+            return None, GCC_TIMEOUT
+        except TestCancelled:
+            raise
         except FileNotFoundError:
             return None, f"找不到{gcc}，请确保已安装或在config.yaml中配置路径"
         except Exception as e:
@@ -528,8 +1187,9 @@ class CompilerTester:
         else:
             return self.compiler_exe.exists()
 
-    def test(self, testfile: Path, input_file: Optional[Path] = None, worker_id: int = 0) -> TestResult:
-        """测试单个用例 (强制使用g++对拍)"""
+    def test(self, testfile: Path, input_file: Optional[Path] = None,
+             token: Optional[CancelToken] = None) -> TestResult:
+        """测试单个用例 (强制使用g++对拍)，token 被取消时结束子进程并返回 SKIPPED"""
         if not testfile.exists():
             return TestResult(TestStatus.SKIPPED, f"找不到测试文件: {testfile}")
         
@@ -537,101 +1197,350 @@ class CompilerTester:
         if not self._is_compiler_ready():
             return TestResult(TestStatus.SKIPPED, "请先编译项目")
         
-        # 获取工作目录
-        worker_dir = self._get_worker_dir(worker_id)
+        if token is not None:
+            # 常驻 JVM 中的任务无法单独结束，取消时直接关闭
+            token.add_callback(self.close)
+        self._local.token = token
+        try:
+            # 租用独占的工作目录
+            with self.workspaces.lease() as worker_dir:
+                return self._test_in(testfile, input_file, worker_dir)
+        except TestCancelled:
+            return TestResult(TestStatus.SKIPPED, "测试已取消")
+        finally:
+            self._local.token = None
+            if token is not None:
+                token.remove_callback(self.close)
+    
+    def _token(self) -> Optional[CancelToken]:
+        """当前线程正在执行的用例的取消令牌"""
+        return getattr(self._local, "token", None)
+    
+    def _call_with_token(self, token: Optional[CancelToken], func: Callable, *args):
+        """以 token 作为当前线程的取消令牌调用 func (供引擎线程池中执行的同步方法使用)"""
+        self._local.token = token
+        try:
+            return func(*args)
+        finally:
+            self._local.token = None
+    
+    def _check_cancelled(self):
+        token = self._token()
+        if token is not None and token.cancelled:
+            raise TestCancelled()
+    
+    def _test_in(self, testfile: Path, input_file: Optional[Path], worker_dir: Path) -> TestResult:
+        """在给定工作目录中完成编译、运行与对拍 (结果附带各阶段耗时和 MIPS 摘要)"""
+        clock = PhaseClock()
+        result = self._run_phases(testfile, input_file, worker_dir, clock)
+        if result.status != TestStatus.COMPILE_ERROR:
+            result.mips_digest = file_digest(worker_dir / "mips.txt")
+        result.phases = clock.durations()
+        result.timeline = dict(clock.spans)
+        return result
+    
+    def _run_phases(self, testfile: Path, input_file: Optional[Path], worker_dir: Path,
+                    clock: PhaseClock) -> TestResult:
+        # g++ 参考输出不依赖被测编译器，在另一个线程和工作目录中同时进行；
+        # 编译或运行失败时不再需要，直接取消
+        from concurrent.futures import ThreadPoolExecutor
+        
+        ref_token = CancelToken()
+        parent = self._token()
+        if parent is not None:
+            parent.add_callback(ref_token.cancel)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            reference = pool.submit(self._reference_task, testfile, input_file, ref_token, clock)
+            # Mars 的输出边读边与期望比较，期望输出就绪前先暂存
+            comparator = StreamComparator()
+            reference.add_done_callback(lambda future: _feed_expected(future, comparator))
+            
+            def perform(request):
+                if isinstance(request, AwaitReference):
+                    value = reference.result()
+                    self._check_cancelled()
+                    return value
+                return self._perform(request)
+            
+            try:
+                return drive(self._phases(testfile, input_file, worker_dir, clock, comparator), perform)
+            finally:
+                comparator.close()
+                if not reference.done():
+                    ref_token.cancel()
+                if parent is not None:
+                    parent.remove_callback(ref_token.cancel)
+    
+    def _phases(self, testfile: Path, input_file: Optional[Path], worker_dir: Path,
+                clock: PhaseClock, comparator: StreamComparator) -> Stage[TestResult]:
+        """
+        一个用例的编译、运行与对拍，判定用例结果 (同步接口与异步引擎共用)
         
+        期望输出由执行方与编译、运行并行获取，yield AwaitReference() 等待它
+        """
         # 1. 编译
-        success, msg = self._run_compiler(testfile, worker_dir)
+        success, msg = yield from self._compile_stage(testfile, worker_dir, clock)
         if not success:
             return TestResult(TestStatus.COMPILE_ERROR, msg)
         
         # 2. 运行Mars
-        mars_out, mars_err = self._run_mars(input_file, worker_dir)
+        with clock.phase("mars"):
+            mars_out, mars_err = yield from self._mars_stage(input_file, worker_dir, comparator)
+        if comparator.diverged:
+            return comparator.failure()
         if mars_out is None:
             return TestResult(TestStatus.RUNTIME_ERROR, f"Mars运行失败: {mars_err}")
         
-        # 3. 使用g++获取期望结果
-        gcc_out, gcc_err = self._run_gcc(testfile, input_file, worker_dir)
+        # 3. 等待g++期望结果
+        gcc_out, gcc_err = yield AwaitReference()
         if gcc_out is None:
             return TestResult(TestStatus.SKIPPED, f"g++运行失败: {gcc_err}")
         
         # 4. 比较结果
-        if compare_outputs(mars_out, gcc_out):
-            return TestResult(TestStatus.PASSED)
-        else:
-            return TestResult(
-                TestStatus.FAILED, "输出不匹配",
-                actual_output=mars_out, expected_output=gcc_out
+        with clock.phase("compare"):
+            return self._judge(mars_out, gcc_out)
+    
+    def _reference_task(self, testfile: Path, input_file: Optional[Path],
+                        token: CancelToken, clock: PhaseClock) -> Tuple[Optional[OutputCapture], str]:
+        """在独立工作目录中获取期望结果 (供 _test_in 在后台线程调用)"""
+        self._local.token = token
+        try:
+            with clock.phase("reference"), self.workspaces.lease() as ref_dir:
+                return self._run_reference(testfile, input_file, ref_dir, clock)
+        except TestCancelled:
+            return None, "测试已取消"
+        finally:
+            self._local.token = None
+    
+    @staticmethod
+    def _judge(mars_out: OutputCapture, gcc_out: OutputCapture) -> TestResult:
+        """
+        按标准化输出的摘要比较 Mars 输出与期望输出
+        
+        不通过时结果中只放有界的片段，完整输出较大时保留在 output_dir 中 (actual_path / expected_path)
+        """
+        if mars_out.digest == gcc_out.digest:
+            return TestResult(TestStatus.PASSED, actual_digest=mars_out.digest, expected_digest=gcc_out.digest)
+        actual_path, expected_path = mars_out.keep(), gcc_out.keep()
+        return TestResult(
+            TestStatus.FAILED, "输出不匹配",
+            actual_output=mars_out.excerpt(), expected_output=gcc_out.excerpt(),
+            actual_digest=mars_out.digest, expected_digest=gcc_out.digest,
+            actual_path=actual_path, expected_path=expected_path
+        )
+    
+    def iter_parallel(
+        self,
+        cases: Iterable[TestCase],
+        max_workers: int = 4,
+        token: Optional[CancelToken] = None,
+        buffer: int = 0,
+        failures_first: bool = False
+    ) -> Iterator[Tuple[TestCase, TestResult]]:
+        """
+        并行测试多个用例，按完成顺序逐个产出 (用例, 结果)，不保留已产出的结果
+        
+        事件循环在后台线程中运行 AsyncTestEngine，结果经容量为 buffer (默认 max_workers)
+        的队列交给调用方；队列满时引擎暂停启动新用例，调用方处理得慢也只占用固定内存。
+        cases 为列表时按历史耗时从长到短调度 (failures_first 时上次未通过的用例排在最前)，
+        也可以传入边生成边测试的生成器。
+        提前结束迭代 (break / close) 与取消 token 一样会结束所有子进程。
+        迭代结束后运行摘要 (含各阶段耗时的分布和最慢用例) 保存在 last_summary；
+        每个结果同时记入 .tmp/results.db。
+        
+        Args:
+            cases: 测试用例
+            max_workers: 最大并行数
+            token: 取消令牌，取消后结束所有子进程，迭代随即结束
+            buffer: 已完成但调用方尚未取走的结果数上限
+            failures_first: 先运行上次未通过的用例，尽早看到修复是否生效
+        """
+        if not self._is_compiler_ready():
+            for case in cases:
+                yield case, TestResult(TestStatus.SKIPPED, "请先编译项目")
+            return
+        
+        # asyncio 导入较慢，只在真正批量运行时加载
+        import asyncio
+        import queue
+        import sqlite3
+        from .engine import AsyncTestEngine
+        from .results_db import default_store
+        
+        for msg in self.prepare_jvm_archives():
+            print(msg)
+        # 之前批次保留的失败用例输出只留最近的一部分
+        prune_outputs(self.output_dir)
+        
+        ref_hits_before, ref_misses_before = self.ref_cache.stats()
+        mips_hits_before, mips_misses_before = self.mips_cache.stats()
+        leases_before, wait_before, _ = self.workspaces.stats()
+        # 每个用例同时占用两个目录 (编译+运行 / g++参考输出)
+        self.workspaces.resize(2 * max_workers)
+        
+        # 预计耗时最长的先跑，避免慢用例排在最后形成长尾
+        known = 0
+        failed_before: List[TestCase] = []
+        if isinstance(cases, list):
+            if failures_first:
+                failed_before = self.failed_last_time(cases)
+            failed_ids = {id(case) for case in failed_before}
+            first, known_first = self.durations.order(failed_before)
+            rest, known = self.durations.order([case for case in cases if id(case) not in failed_ids])
+            cases, known = first + rest, known + known_first
+        engine = AsyncTestEngine(self, max_workers, history=self.durations)
+        
+        # 运行记录由数据库的写线程成批写入，不影响用例执行
+        store = default_store(self.test_dir)
+        try:
+            run_id = store.begin_run(
+                str(self.project_dir), self._get_artifact_hash(), len(cases) if isinstance(cases, list) else None
             )
+        except (sqlite3.Error, OSError) as e:
+            print(f"[结果数据库] 无法打开 {store.path}: {e}")
+            store = None
+        
+        # 调用方提前结束迭代时由这里取消
+        inner = CancelToken()
+        if token is not None:
+            token.add_callback(inner.cancel)
+        results: queue.Queue = queue.Queue(maxsize=buffer or max_workers)
+        finished = object()
+        
+        async def produce():
+            loop = asyncio.get_running_loop()
+            async for item in engine.run(cases, inner):
+                # 队列满时在这里等待，引擎随之暂停
+                await loop.run_in_executor(None, results.put, item)
+        
+        def run_loop():
+            try:
+                asyncio.run(produce())
+            except BaseException as e:
+                results.put(e)
+            else:
+                results.put(finished)
+        
+        thread = threading.Thread(target=run_loop, name="test-engine-loop", daemon=True)
+        thread.start()
+        count = passed = failed = 0
+        phase_stats = PhaseStats()
+        completed = False
+        try:
+            while True:
+                item = results.get()
+                if item is finished:
+                    completed = True
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                count += 1
+                case, result = item
+                if result.passed:
+                    passed += 1
+                elif result.status != TestStatus.SKIPPED:
+                    failed += 1
+                if result.phases:
+                    phase_stats.add(f"{case.testfile.parent.name}/{case.name}", result.phases)
+                if store is not None:
+                    store.record(run_id, case, result)
+                yield item
+        finally:
+            inner.cancel()
+            # 取走剩余结果，让后台线程从 put 中返回
+            while thread.is_alive():
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+            if token is not None:
+                token.remove_callback(inner.cancel)
+            # 本批用例结束后常驻 JVM 不再使用
+            self.close()
+            self.durations.save()
+            if store is not None:
+                store.end_run(run_id, passed, failed, count, stopped=not completed)
+                store.close()
+            limiter = engine.limiter
+            if limiter is not None:
+                ref_hits, ref_misses = self.ref_cache.stats()
+                mips_hits, mips_misses = self.mips_cache.stats()
+                leases, wait, dirs = self.workspaces.stats()
+                self.last_summary = RunSummary(
+                    total=len(cases) if isinstance(cases, list) else count,
+                    ref_cache_hits=ref_hits - ref_hits_before,
+                    ref_cache_misses=ref_misses - ref_misses_before,
+                    mips_cache_hits=mips_hits - mips_hits_before,
+                    mips_cache_misses=mips_misses - mips_misses_before,
+                    workspace_leases=leases - leases_before,
+                    workspace_wait=wait - wait_before,
+                    workspace_dirs=dirs,
+                    concurrency_adaptive=limiter.adaptive,
+                    concurrency_final=limiter.limit,
+                    concurrency_peak=limiter.peak,
+                    concurrency_decreases=sum(1 for d in limiter.decisions if d.new < d.old),
+                    concurrency_decisions=[d.format() for d in limiter.decisions],
+                    idle_worker_seconds=limiter.idle_seconds,
+                    history_known=known,
+                    failures_first=len(failed_before),
+                    phase_stats=phase_stats
+                )
     
     def test_parallel(
         self,
         cases: List[TestCase],
         max_workers: int = 4,
         callback=None,
-        ramp_up_time: float = 5.0,
-        ramp_up_threshold: int = 64
+        token: Optional[CancelToken] = None,
+        failures_first: bool = False
     ) -> List[Tuple[TestCase, TestResult]]:
         """
-        并行测试多个用例
+        并行测试多个用例，收集全部结果后返回 (iter_parallel 的收集封装)
         
         Args:
             cases: 测试用例列表
             max_workers: 最大并行数
             callback: 回调函数 callback(case, result, progress)
-            ramp_up_time: 渐进启动总时间（秒）
-            ramp_up_threshold: 测试用例数量阈值，低于此值立即全部启动
+            token: 取消令牌，取消后结束所有子进程并返回已完成的部分结果
+            failures_first: 先运行上次未通过的用例
         
         Returns:
             [(case, result), ...]
         """
-        import time
-        
         if not self._is_compiler_ready():
             return [(c, TestResult(TestStatus.SKIPPED, "请先编译项目")) for c in cases]
         
-        results = []
         total = len(cases)
-        completed = 0
-        lock = threading.Lock()
-        
-        def run_test(task: TestTask) -> Tuple[TestCase, TestResult]:
-            result = self.test(task.case.testfile, task.case.input_file, task.worker_id)
-            return task.case, result
-        
-        # 分配 worker_id
-        tasks = [TestTask(case, i % max_workers) for i, case in enumerate(cases)]
-        
-        # 决定是否渐进启动
-        use_ramp_up = total >= ramp_up_threshold
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {}
-            
-            if use_ramp_up:
-                # 渐进式启动：在 ramp_up_time 秒内均匀提交所有任务
-                interval = ramp_up_time / total if total > 0 else 0
-                for i, task in enumerate(tasks):
-                    futures[executor.submit(run_test, task)] = task
-                    if i < total - 1:  # 最后一个不需要等待
-                        time.sleep(interval)
-            else:
-                # 立即全部启动
-                futures = {executor.submit(run_test, task): task for task in tasks}
-            
-            for future in as_completed(futures):
-                case, result = future.result()
-                with lock:
-                    results.append((case, result))
-                    completed += 1
-                
-                if callback:
-                    callback(case, result, completed / total * 100)
-        
+        results = []
+        for case, result in self.iter_parallel(cases, max_workers, token, failures_first=failures_first):
+            results.append((case, result))
+            if callback:
+                callback(case, result, len(results) / total * 100)
         return results
     
+    def failed_last_time(self, cases: List[TestCase]) -> List[TestCase]:
+        """cases 中最近一次运行 (.tmp/results.db，跳过的不算) 未通过的用例，保持原顺序"""
+        import sqlite3
+        from .results_db import default_store
+        
+        try:
+            return default_store(self.test_dir).failed_cases(cases)
+        except sqlite3.Error as e:
+            print(f"[结果数据库] 读取失败: {e}")
+            return []
+    
+    def close(self):
+        """释放常驻进程"""
+        if self._mars_pool is not None:
+            self._mars_pool.close_all()
+        if self._harness_pool is not None:
+            self._harness_pool.close_all()
+    
     def cleanup_workers(self):
-        """清理所有工作目录"""
+        """清理所有工作目录 (程序退出时自动调用)"""
+        if self._owns_scratch:
+            shutil.rmtree(self.scratch_root, ignore_errors=True)
         if self.work_dir.exists():
             for item in self.work_dir.iterdir():
                 if item.is_dir() and item.name.startswith("worker_"):
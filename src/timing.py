@@ -0,0 +1,126 @@
+"""
+阶段计时 - 记录每个用例各阶段的起止时间 (time.monotonic)，批量运行结束后汇总各阶段耗时分布
+
+每个阶段只多两次 time.monotonic 调用，汇总时每个用例每个阶段记一个 double，可以常开。
+"""
+import heapq
+import time
+from array import array
+from contextlib import contextmanager
+from itertools import count
+from typing import Dict, Iterator, List, Tuple
+
+
+# 汇总中各阶段的显示顺序和名称
+PHASE_LABELS = (
+    ("staging", "准备用例"),       # 写入 testfile.txt、查询 MIPS 产物缓存
+    ("compile", "编译"),           # 被测编译器 (命中缓存时没有)
+    ("mars", "Mars"),
+    ("ref_compile", "g++编译"),    # 命中参考输出缓存时没有
+    ("ref_run", "g++运行"),
+    ("reference", "参考输出"),     # 整个参考输出任务 (含缓存查询和等待工作目录)
+    ("compare", "比较"),
+    ("total", "整个用例"),
+)
+
+
+class PhaseClock:
+    """
+    一个用例的阶段计时器，spans 为 {阶段: (开始, 结束)}，时间是相对用例开始的秒数
+
+    参考输出在另一个线程中计时，各阶段写入不同的键，不需要加锁。
+    """
+
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.spans: Dict[str, Tuple[float, float]] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """计时一个阶段 (异常退出时同样记录)"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.spans[name] = (start - self.origin, time.monotonic() - self.origin)
+
+    def durations(self) -> Dict[str, float]:
+        """{阶段: 秒数}，并带上从开始到现在的 total"""
+        phases = {name: end - start for name, (start, end) in self.spans.items()}
+        phases["total"] = time.monotonic() - self.origin
+        return phases
+
+
+class PhaseStats:
+    """
+    批量运行中各阶段耗时的汇总: 合计、分位数和最慢的几个用例
+
+    每个阶段的耗时存在 array('d') 中 (每个用例 8 字节)，最慢的用例用小顶堆只保留 SLOWEST 个。
+    """
+
+    SLOWEST = 3
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self):
+        self._samples: Dict[str, array] = {}
+        self._slowest: Dict[str, List[Tuple[float, int, str]]] = {}
+        self._seq = count()
+
+    def add(self, name: str, phases: Dict[str, float]):
+        """记入一个用例的各阶段耗时"""
+        seq = next(self._seq)
+        for phase, seconds in phases.items():
+            samples = self._samples.get(phase)
+            if samples is None:
+                samples = self._samples[phase] = array("d")
+                self._slowest[phase] = []
+            samples.append(seconds)
+            heap = self._slowest[phase]
+            if len(heap) < self.SLOWEST:
+                heapq.heappush(heap, (seconds, seq, name))
+            elif seconds > heap[0][0]:
+                heapq.heapreplace(heap, (seconds, seq, name))
+
+    def __bool__(self) -> bool:
+        return bool(self._samples)
+
+    def phases(self) -> List[str]:
+        """有记录的阶段，按 PHASE_LABELS 的顺序 (未知阶段排在最后)"""
+        order = [phase for phase, _ in PHASE_LABELS if phase in self._samples]
+        return order + sorted(phase for phase in self._samples if phase not in order)
+
+    def summary(self, phase: str) -> Dict[str, object]:
+        """{"count", "total", "p50", "p90", "p99", "max", "slowest": [(用例, 秒数), ...]}"""
+        values = sorted(self._samples.get(phase, ()))
+        info: Dict[str, object] = {"count": len(values), "total": sum(values)}
+        for p in self.PERCENTILES:
+            info[f"p{p}"] = _percentile(values, p)
+        info["max"] = values[-1] if values else 0.0
+        info["slowest"] = [(name, seconds) for seconds, _, name in sorted(self._slowest.get(phase, []), reverse=True)]
+        return info
+
+    def format_lines(self) -> List[str]:
+        """格式化为日志行"""
+        if not self:
+            return []
+        labels = dict(PHASE_LABELS)
+        lines = ["阶段耗时 (参考输出与编译/运行同时进行，各阶段之和不等于整个用例):"]
+        for phase in self.phases():
+            info = self.summary(phase)
+            percentiles = " | ".join(f"p{p} {info[f'p{p}']:.3f}s" for p in self.PERCENTILES)
+            lines.append(
+                f"  {labels.get(phase, phase)}: {info['count']} 次 | 合计 {info['total']:.2f}s | "
+                f"{percentiles} | 最大 {info['max']:.3f}s"
+            )
+            slowest = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in info["slowest"])
+            if slowest:
+                lines.append(f"    最慢: {slowest}")
+        return lines
+
+
+def _percentile(values: List[float], p: int) -> float:
+    """已排序数据的 p 分位数 (最近秩)"""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * p // 100))
+    return values[rank - 1]
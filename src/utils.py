@@ -1,6 +1,7 @@
 """
 工具函数模块
 """
+import hashlib
 from pathlib import Path
 from typing import Optional
 
@@ -32,6 +33,19 @@ def normalize_output(output: Optional[str]) -> str:
     return '\n'.join(lines)
 
 
+def text_digest(text: str) -> str:
+    """文本的 SHA-256 (对标准化后的输出使用，行尾空白不影响结果)"""
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+def file_digest(filepath: Path) -> Optional[str]:
+    """文件内容的 SHA-256，读取失败时返回 None"""
+    try:
+        return hashlib.sha256(filepath.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
 def compare_outputs(actual: str, expected: str) -> bool:
     """比较两个输出是否相同"""
     return normalize_output(actual) == normalize_output(expected)
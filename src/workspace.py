@@ -0,0 +1,92 @@
+"""
+工作目录池 - 每个用例执行期间独占一个目录，结束后归还复用
+"""
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+
+class WorkspacePool:
+    """
+    按租约分配的工作目录池
+
+    lease() 取出一个空闲目录 (没有则新建)，退出时归还。
+    归还时不清理，下次被租出时才清空上一个用例留下的文件。
+    设置 capacity 时最多同时存在 capacity 个目录，超出的租用请求等待。
+    """
+
+    def __init__(self, root: Path, prefix: str = "worker_", capacity: Optional[int] = None):
+        self.root = Path(root)
+        self.prefix = prefix
+        self.capacity = capacity
+        self._free: List[Path] = []
+        self._count = 0
+        self._cond = threading.Condition()
+        self._leases = 0
+        self._wait_time = 0.0
+
+    @contextmanager
+    def lease(self) -> Iterator[Path]:
+        """租用一个工作目录"""
+        path = self.acquire()
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def release(self, path: Path):
+        """归还 acquire 租用的目录"""
+        with self._cond:
+            self._free.append(path)
+            self._cond.notify()
+
+    def acquire(self, waited: float = 0.0) -> Path:
+        """
+        租用一个工作目录 (没有空闲名额时阻塞)，用完后调用 release
+
+        Args:
+            waited: 调用方在别处已经等待名额的秒数，一并计入等待统计
+        """
+        start = time.perf_counter() - waited
+        with self._cond:
+            while not self._free and self.capacity is not None and self._count >= self.capacity:
+                self._cond.wait()
+            self._leases += 1
+            self._wait_time += time.perf_counter() - start
+            if self._free:
+                # 后进先出: 最近用过的目录更可能还在页缓存中
+                path = self._free.pop()
+            else:
+                path = self.root / f"{self.prefix}{self._count}"
+                self._count += 1
+        self._scrub(path)
+        return path
+
+    @staticmethod
+    def _scrub(path: Path):
+        """清空目录 (新建目录也可能残留上次运行的文件)"""
+        if not path.exists():
+            path.mkdir(parents=True, exist_ok=True)
+            return
+        for item in path.iterdir():
+            try:
+                if item.is_dir() and not item.is_symlink():
+                    shutil.rmtree(item)
+                else:
+                    item.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Tuple[int, float, int]:
+        """(累计租用次数, 累计等待秒数, 已创建目录数)"""
+        with self._cond:
+            return self._leases, self._wait_time, self._count
+
+    def resize(self, capacity: Optional[int]):
+        """调整容量上限 (只影响之后的租用)"""
+        with self._cond:
+            self.capacity = capacity
+            self._cond.notify_all()
@@ -0,0 +1,103 @@
+import os
+import shutil
+
+import pytest
+
+from src.config import Config
+from src.models import TestCase
+from src.tester import CompilerTester
+
+
+@pytest.fixture
+def make_case(tmp_path):
+    """在 tmp_path/cases 下创建 testfile (和可选的输入文件)，返回 TestCase"""
+    def make(name: str, source: str = "int main() { return 0; }\n", input_data=None) -> TestCase:
+        directory = tmp_path / "cases"
+        directory.mkdir(exist_ok=True)
+        testfile = directory / f"{name}.sy"
+        testfile.write_text(source, encoding="utf-8")
+        input_file = None
+        if input_data is not None:
+            input_file = directory / f"{name}.in"
+            input_file.write_text(input_data, encoding="utf-8")
+        return TestCase(name, testfile, input_file)
+    return make
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """默认配置 (不读 config.yaml)，测试结束后恢复全局单例"""
+    cfg = Config()
+    monkeypatch.setattr(Config, "_instance", cfg)
+    return cfg
+
+
+# 代替被测编译器、Mars 和 g++ 的脚本: 行为由用例源码中的指令行决定，
+# 各阶段进程的开始与结束记入 {log} ("start|end 阶段 pid")
+FAKE_COMPILER = """#!/bin/sh
+echo "start compile $$" >> "{log}"
+if grep -q '^hang$' testfile.txt; then exec sleep 30; fi
+seconds=$(sed -n 's/^compile_sleep //p' testfile.txt)
+[ -n "$seconds" ] && sleep "$seconds"
+echo "end compile $$" >> "{log}"
+if grep -q '^compile_error$' testfile.txt; then echo "syntax error" >&2; exit 1; fi
+cp testfile.txt mips.txt
+"""
+FAKE_MARS = """#!/bin/sh
+echo "start mars $$" >> "{log}"
+seconds=$(sed -n 's/^mars_sleep //p' "$1")
+[ -n "$seconds" ] && sleep "$seconds"
+sed -n 's/^out: //p' "$1"
+echo "end mars $$" >> "{log}"
+"""
+FAKE_GCC = """#!/bin/sh
+if [ "$1" = "--version" ]; then echo "fake g++ 1.0"; exit 0; fi
+echo "start gcc $$" >> "{log}"
+seconds=$(sed -n 's/^gcc_sleep //p' "$1")
+[ -n "$seconds" ] && sleep "$seconds"
+echo "end gcc $$" >> "{log}"
+if grep -q '^gcc_error$' "$1"; then echo "fake g++ error" >&2; exit 1; fi
+{ echo '#!/bin/sh'; sed -n "s/^expect: \\(.*\\)/echo '\\1'/p" "$1"; } > "$3"
+chmod +x "$3"
+"""
+
+
+@pytest.fixture
+def fake_tester(tmp_path, config, monkeypatch):
+    """
+    各阶段命令都换成 shell 脚本的 CompilerTester (C 语言项目，不使用缓存和 AppCDS)
+
+    用例源码中的指令行: compile_sleep/mars_sleep/gcc_sleep 秒数、compile_error、gcc_error、
+    hang (编译器 exec sleep 30)、"out: 文本" (Mars 输出)、"expect: 文本" (期望输出)。
+    tester.stage_log 为各阶段进程的记录文件
+    """
+    if os.name == "nt":
+        pytest.skip("需要 /bin/sh")
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "stages.log"
+    log.touch()
+
+    def script(name: str, body: str):
+        path = bin_dir / name
+        path.write_text(body.replace("{log}", str(log)), encoding="utf-8")
+        path.chmod(0o755)
+        return path
+
+    project = tmp_path / "project"
+    (project / "src").mkdir(parents=True)
+    (project / "src" / "config.json").write_text('{"programming language": "c"}', encoding="utf-8")
+    config.cache.enabled = False
+    config.tools.jvm_options.enabled = False
+    config.parallel.adaptive = False
+    config.tools.gcc_path = str(script("g++", FAKE_GCC))
+
+    tester = CompilerTester(project, tmp_path / "tests")
+    tester.work_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(script("compiler", FAKE_COMPILER), tester.compiler_exe)
+    mars = script("mars", FAKE_MARS)
+    monkeypatch.setattr(tester, "_mars_command", lambda worker_dir: [str(mars), str(worker_dir / "mips.txt")])
+    tester.stage_log = log
+    yield tester
+    tester.close()
+    tester.cleanup_workers()
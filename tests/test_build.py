@@ -0,0 +1,429 @@
+"""src/build.py: 增量构建的依赖解析与跳过/重编决策"""
+import json
+import os
+import struct
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from src import build
+from src.build import (
+    CMakeBuildState, CxxBuild, JavaBuild, choose_executable, cmake_executables, cmake_file_api_query,
+    parse_depfile, read_class_file,
+)
+
+
+# ========== Java ==========
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def class_bytes(name, refs=(), source_file=None, descriptors=()):
+    """
+    生成只有常量池和 SourceFile 属性的最小 class 文件
+
+    refs 为 Class 常量引用的类，descriptors 为额外的 Utf8 常量 (字段描述符等)；
+    常量池开头放一个 Long，检查解析时跳过了它的第二个槽位
+    """
+    entries = []
+
+    def add(entry, slots=1):
+        entries.append(entry)
+        entries.extend([None] * (slots - 1))
+        return len(entries)
+
+    def utf8(text):
+        data = text.encode("utf-8")
+        return add(b"\x01" + struct.pack(">H", len(data)) + data)
+
+    add(b"\x05" + struct.pack(">q", 7), slots=2)
+    this_class = add(b"\x07" + struct.pack(">H", utf8(name)))
+    super_class = add(b"\x07" + struct.pack(">H", utf8("java/lang/Object")))
+    for ref in refs:
+        add(b"\x07" + struct.pack(">H", utf8(ref)))
+    for text in descriptors:
+        utf8(text)
+    attributes = b""
+    if source_file is not None:
+        attr_name, value = utf8("SourceFile"), utf8(source_file)
+        attributes = struct.pack(">HIH", attr_name, 2, value)
+
+    out = b"\xca\xfe\xba\xbe" + struct.pack(">HHH", 0, 52, len(entries) + 1)
+    out += b"".join(entry for entry in entries if entry is not None)
+    out += struct.pack(">HHHHHH", 0x21, this_class, super_class, 0, 0, 0)
+    out += struct.pack(">H", 1 if attributes else 0) + attributes
+    return out
+
+
+def test_read_class_file_fixture():
+    # Constants.class: pkg/Constants，常量池中有 Long/Double (各占两个槽位)、Integer、Float、String，
+    # 引用 pkg/Helper、数组类 [Lpkg/Node;，字段描述符 Lpkg/Token;，SourceFile 为 Constants.java
+    name, source_file, refs = read_class_file(FIXTURES / "Constants.class")
+    assert name == "pkg/Constants"
+    assert source_file == "Constants.java"
+    assert refs == {"java/lang/Object", "pkg/Helper", "pkg/Node", "pkg/Token"}
+
+
+def test_read_class_file_rejects_other_files(tmp_path):
+    path = tmp_path / "A.class"
+    path.write_bytes(b"PK\x03\x04")
+    with pytest.raises(ValueError):
+        read_class_file(path)
+
+
+def test_class_bytes_round_trip(tmp_path):
+    path = tmp_path / "B.class"
+    path.write_bytes(class_bytes("p/B", ["p/A"], "B.java", ["(Lp/C;)V"]))
+    assert read_class_file(path) == ("p/B", "B.java", {"java/lang/Object", "p/A", "p/C"})
+
+
+@pytest.fixture
+def java_project(tmp_path):
+    """
+    src 下 A <- B <- C 依赖链 (由 class 文件的常量池给出)，D 独立，
+    E 的源码提到 Consts (常量被内联，class 文件中没有引用)
+    """
+    src, classes = tmp_path / "src", tmp_path / "classes"
+    src.mkdir()
+    classes.mkdir()
+    sources = {
+        "A.java": ("A", [], "class A { int f() { return 1; } }"),
+        "B.java": ("B", ["A"], "class B { int g(X x) { return x.f(); } }"),
+        "C.java": ("C", ["B"], "class C { Object b = new Y(); }"),
+        "D.java": ("D", [], "class D {}"),
+        "Consts.java": ("Consts", [], "class Consts { static final int MAX = 3; }"),
+        "E.java": ("E", [], "class E { int m = Consts.MAX; }"),
+    }
+    for file_name, (name, refs, text) in sources.items():
+        (src / file_name).write_text(text, encoding="utf-8")
+        (classes / f"{name}.class").write_bytes(class_bytes(name, refs, file_name))
+
+    def plan(changed=(), removed=()):
+        java_build = JavaBuild(src, classes, tmp_path / "Compiler.jar", tmp_path / "state.json",
+                               "javac", "jar", timeout=10)
+        old = {name: [0, 0, "old"] for name in sources}
+        new = {name: [0, 0, "new" if name in changed else "old"] for name in sources if name not in removed}
+        result = java_build._plan_incremental(old, new)
+        if result is None:
+            return None
+        dirty, stale = result
+        return dirty, {path.name for path in stale}
+
+    return plan, src, classes
+
+
+def test_plan_closes_over_dependents(java_project):
+    plan, _, _ = java_project
+    assert plan(changed=["A.java"]) == ({"A.java", "B.java", "C.java"}, {"A.class", "B.class", "C.class"})
+    assert plan(changed=["C.java"]) == ({"C.java"}, {"C.class"})
+    assert plan() == (set(), set())
+
+
+def test_plan_removed_source_rebuilds_dependents(java_project):
+    plan, _, _ = java_project
+    assert plan(removed=["B.java"]) == ({"C.java"}, {"B.class", "C.class"})
+
+
+def test_plan_includes_sources_mentioning_inlined_constants(java_project):
+    plan, _, _ = java_project
+    assert plan(changed=["Consts.java"]) == ({"Consts.java", "E.java"}, {"Consts.class", "E.class"})
+
+
+def test_plan_without_source_file_attribute_gives_up(java_project):
+    plan, _, classes = java_project
+    (classes / "D.class").write_bytes(class_bytes("D", []))
+    assert plan(changed=["A.java"]) is None
+
+
+@pytest.mark.parametrize("debug_info", [True, False])
+def test_missing_source_file_attribute_falls_back_to_full_build(java_project, tmp_path, monkeypatch, debug_info):
+    _, src, classes = java_project
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        if cmd[0] == "javac":
+            # debug_info 为 False 时生成没有 SourceFile 属性的 class 文件 (相当于 javac -g:none)
+            for arg in cmd:
+                if arg.endswith(".java"):
+                    source_file = Path(arg).name if debug_info else None
+                    (classes / Path(arg).with_suffix(".class").name).write_bytes(
+                        class_bytes(Path(arg).stem, [], source_file)
+                    )
+        else:
+            (tmp_path / "Compiler.jar").write_bytes(b"jar")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    monkeypatch.setattr(build.subprocess, "run", fake_run)
+    monkeypatch.setattr(build, "tool_identity", lambda cmd: cmd)
+
+    def run():
+        calls.clear()
+        ok, msg = JavaBuild(src, classes, tmp_path / "Compiler.jar", tmp_path / "state.json",
+                            "javac", "jar", timeout=10).build()
+        assert ok, msg
+        javac = [cmd for cmd in calls if cmd[0] == "javac"]
+        return msg, sum(arg.endswith(".java") for cmd in javac for arg in cmd)
+
+    assert run() == ("[Java] 成功编译 6 个文件 -> Compiler.jar", 6)
+    assert run()[0].startswith("[Java] 源码未变化")
+    (src / "D.java").write_text("class D { int x; }", encoding="utf-8")
+    if debug_info:
+        assert run() == ("[Java] 增量编译 1/6 个文件 -> Compiler.jar", 1)
+    else:
+        assert run() == ("[Java] 成功编译 6 个文件 -> Compiler.jar", 6)
+
+
+# ========== C/C++ ==========
+
+def test_parse_depfile_continuations_and_escaped_spaces():
+    text = "obj/main.cpp.o: /src/main.cpp /src/a.h \\\n  /src/dir\\ with\\ space/b.h \\\r\n /src/c$$.h\n"
+    assert parse_depfile(text) == ["/src/main.cpp", "/src/a.h", "/src/dir with space/b.h", "/src/c$.h"]
+
+
+def test_parse_depfile_ignores_mp_phony_rules():
+    text = "main.o: main.cpp util.h \\\n lexer.h\n\nutil.h:\n\nlexer.h:\n"
+    assert parse_depfile(text) == ["main.cpp", "util.h", "lexer.h"]
+
+
+def test_parse_depfile_windows_drive_letters_and_empty():
+    assert parse_depfile("C:/obj/a.o: C:/src/a.cpp C:/src/a.h\n") == ["C:/src/a.cpp", "C:/src/a.h"]
+    assert parse_depfile("") == []
+
+
+class FakeGxx:
+    """代替 subprocess.run 的 g++: 编译时写目标文件和依赖文件，链接时写可执行文件"""
+
+    def __init__(self, includes=None, fail=()):
+        self.includes = includes or {}   # {源文件名: [头文件路径, ...]}
+        self.fail = set(fail)            # 编译失败的源文件名
+        self.compiled = []
+        self.links = 0
+
+    def __call__(self, cmd, **kwargs):
+        if "-c" in cmd:
+            source = Path(cmd[cmd.index("-c") + 1])
+            self.compiled.append(source.name)
+            if source.name in self.fail:
+                return subprocess.CompletedProcess(cmd, 1, "", f"{source.name}: error")
+            obj = Path(cmd[cmd.index("-o") + 1])
+            obj.write_bytes(source.read_bytes())
+            deps = " ".join([str(source)] + [str(h).replace(" ", "\\ ") for h in self.includes.get(source.name, [])])
+            Path(cmd[cmd.index("-MF") + 1]).write_text(f"{obj}: {deps}\n" + "".join(
+                f"{h}:\n" for h in self.includes.get(source.name, [])
+            ))
+        else:
+            self.links += 1
+            Path(cmd[cmd.index("-o") + 1]).write_bytes(b"exe")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+
+@pytest.fixture
+def cxx(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "main.cpp").write_text("int main() {}\n")
+    (src / "lexer.cpp").write_text("// lexer\n")
+    (src / "util.cpp").write_text("// util\n")
+    (src / "lexer.h").write_text("// header\n")
+    fake = FakeGxx(includes={"main.cpp": [src / "lexer.h"], "lexer.cpp": [src / "lexer.h"]})
+    monkeypatch.setattr(build.subprocess, "run", fake)
+    monkeypatch.setattr(build, "tool_identity", lambda cmd: cmd)
+
+    def make(flags=("-O2",)):
+        return CxxBuild(src, tmp_path / "obj", tmp_path / "Compiler", tmp_path / "state.json",
+                        "g++", list(flags), timeout=10, jobs=2)
+
+    def sources():
+        return sorted(src.glob("*.cpp"))
+
+    return make, sources, fake, src
+
+
+def test_first_build_compiles_and_links_everything(cxx):
+    make, sources, fake, _ = cxx
+    ok, msg = make().build(sources(), "C++")
+    assert ok, msg
+    assert sorted(fake.compiled) == ["lexer.cpp", "main.cpp", "util.cpp"]
+    assert fake.links == 1
+    assert "成功编译 3 个文件" in msg
+
+
+def test_unchanged_tree_skips_compile_and_link(cxx):
+    make, sources, fake, _ = cxx
+    make().build(sources(), "C++")
+    fake.compiled.clear()
+    ok, msg = make().build(sources(), "C++")
+    assert ok and "跳过编译" in msg
+    assert fake.compiled == [] and fake.links == 1
+
+
+def test_header_change_recompiles_only_includers(cxx):
+    make, sources, fake, src = cxx
+    make().build(sources(), "C++")
+    fake.compiled.clear()
+    (src / "lexer.h").write_text("// header changed, longer\n")
+    ok, msg = make().build(sources(), "C++")
+    assert ok
+    assert sorted(fake.compiled) == ["lexer.cpp", "main.cpp"]
+    assert fake.links == 2
+    assert "重新编译 2/3 个文件" in msg
+
+
+def test_flag_change_rebuilds_everything(cxx):
+    make, sources, fake, _ = cxx
+    make().build(sources(), "C++")
+    fake.compiled.clear()
+    make(flags=("-O0",)).build(sources(), "C++")
+    assert len(fake.compiled) == 3
+
+
+def test_missing_executable_relinks_without_recompiling(cxx, tmp_path):
+    make, sources, fake, _ = cxx
+    make().build(sources(), "C++")
+    fake.compiled.clear()
+    (tmp_path / "Compiler").unlink()
+    ok, msg = make().build(sources(), "C++")
+    assert ok and "重新链接" in msg
+    assert fake.compiled == [] and fake.links == 2
+
+
+def test_removed_source_drops_object_and_relinks(cxx, tmp_path):
+    make, sources, fake, src = cxx
+    make().build(sources(), "C++")
+    (src / "util.cpp").unlink()
+    ok, _ = make().build(sources(), "C++")
+    assert ok and fake.links == 2
+    assert not (tmp_path / "obj" / "util.cpp.o").exists()
+
+
+def test_compile_error_keeps_good_objects(cxx):
+    make, sources, fake, src = cxx
+    fake.fail = {"util.cpp"}
+    ok, msg = make().build(sources(), "C++")
+    assert not ok and "util.cpp: error" in msg
+    assert fake.links == 0
+
+    fake.fail = set()
+    fake.compiled.clear()
+    ok, _ = make().build(sources(), "C++")
+    assert ok
+    assert fake.compiled == ["util.cpp"]
+    assert fake.links == 1
+
+
+# ========== CMake ==========
+
+def _reply(build_dir, targets, configs=("Debug", "Release")):
+    """按 CMake file API 的格式生成 .cmake/api/v1/reply (index -> codemodel -> target)"""
+    reply = build_dir / ".cmake" / "api" / "v1" / "reply"
+    reply.mkdir(parents=True)
+    refs = []
+    for name, kind, artifact in targets:
+        json_file = f"target-{name}.json"
+        (reply / json_file).write_text(json.dumps({
+            "name": name, "type": kind, "artifacts": [{"path": artifact}],
+        }))
+        refs.append({"name": name, "jsonFile": json_file})
+    (reply / "codemodel-v2-abc.json").write_text(json.dumps({
+        "paths": {"build": str(build_dir), "source": str(build_dir.parent)},
+        "configurations": [{"name": config, "targets": refs} for config in configs],
+    }))
+    (reply / "index-2024-01-01T00-00-00-0000.json").write_text(json.dumps({
+        "objects": [{"kind": "cache", "jsonFile": "cache-v2.json"},
+                    {"kind": "codemodel", "jsonFile": "codemodel-v2-abc.json"}],
+    }))
+    return reply
+
+
+def test_cmake_executables_from_file_api_reply(tmp_path):
+    build_dir = tmp_path / "build"
+    _reply(build_dir, [
+        ("Compiler", "EXECUTABLE", "bin/Compiler"),
+        ("frontend", "STATIC_LIBRARY", "libfrontend.a"),
+        ("tool", "EXECUTABLE", str(tmp_path / "abs" / "tool")),
+    ])
+    assert cmake_executables(build_dir) == [build_dir / "bin" / "Compiler", tmp_path / "abs" / "tool"]
+
+
+def test_cmake_executables_without_reply(tmp_path):
+    assert cmake_executables(tmp_path) is None
+    reply = _reply(tmp_path / "build", [("Compiler", "EXECUTABLE", "Compiler")])
+    (reply / "codemodel-v2-abc.json").write_text("{broken")
+    assert cmake_executables(tmp_path / "build") is None
+
+
+def test_cmake_file_api_query(tmp_path):
+    cmake_file_api_query(tmp_path)
+    assert (tmp_path / ".cmake" / "api" / "v1" / "query" / "codemodel-v2").exists()
+
+
+def test_choose_executable(tmp_path):
+    def exe(name, mtime):
+        path = tmp_path / name
+        path.write_bytes(b"")
+        os.utime(path, (mtime, mtime))
+        return path
+
+    old, new = exe("tool_a", 1000), exe("tool_b", 2000)
+    assert choose_executable([tmp_path / "missing"]) is None
+    assert choose_executable([old]) == old
+    assert choose_executable([old, new]) == new
+    compiler = exe("Compiler", 500)
+    assert choose_executable([old, new, compiler]) == compiler
+
+
+@pytest.fixture
+def cmake_project(tmp_path):
+    src = tmp_path / "project"
+    (src / "include").mkdir(parents=True)
+    (src / "CMakeLists.txt").write_text("add_executable(Compiler main.cpp)\n")
+    (src / "main.cpp").write_text('#include "lexer.h"\nint main() {}\n')
+    (src / "include" / "lexer.h").write_text("// lexer\n")
+    (src / "README.md").write_text("not a build input\n")
+    (src / "cmake-build-debug").mkdir()
+    (src / "cmake-build-debug" / "generated.cpp").write_text("// build output\n")
+    artifact = tmp_path / "build" / "Compiler"
+    artifact.parent.mkdir()
+    artifact.write_bytes(b"exe v1")
+    target = tmp_path / "Compiler.exe"
+
+    def state():
+        return CMakeBuildState(tmp_path / "state.json", src, "cmake 3.28", "g++ 13")
+
+    return state, src, artifact, target
+
+
+def test_cmake_state_round_trip(cmake_project):
+    state, src, artifact, target = cmake_project
+    first = state()
+    assert sorted(first.files) == ["CMakeLists.txt", "include/lexer.h", "main.cpp"]
+    assert first.cached_artifact(target) is None
+    assert first.record(artifact, target) is True
+    assert target.read_bytes() == b"exe v1"
+
+    assert state().cached_artifact(target) == artifact
+    # 重新构建出相同内容时不复制，保持 target 的修改时间
+    assert state().record(artifact, target) is False
+
+
+def test_cmake_state_invalidated_by_header_edit(cmake_project):
+    state, src, artifact, target = cmake_project
+    state().record(artifact, target)
+    (src / "include" / "lexer.h").write_text("// lexer changed\n")
+    assert state().cached_artifact(target) is None
+
+
+def test_cmake_state_invalidated_by_touched_outputs_or_tools(cmake_project, tmp_path):
+    state, src, artifact, target = cmake_project
+    state().record(artifact, target)
+    (src / "README.md").write_text("docs only\n")
+    assert state().cached_artifact(target) == artifact
+
+    target.write_bytes(b"replaced by hand")
+    assert state().cached_artifact(target) is None
+    state().record(artifact, target)
+    artifact.write_bytes(b"exe v2")
+    assert state().cached_artifact(target) is None
+    assert CMakeBuildState(tmp_path / "state.json", src, "cmake 3.29", "g++ 13").cached_artifact(target) is None
@@ -0,0 +1,58 @@
+"""src/cache.py: 组合哈希与磁盘缓存的读写、淘汰"""
+import os
+
+from src.cache import DiskCache, hash_parts
+
+
+def test_hash_parts_has_no_concatenation_ambiguity():
+    assert hash_parts("ab", "c") != hash_parts("a", "bc")
+    assert hash_parts("abc") != hash_parts("ab", "c")
+
+
+def test_hash_parts_accepts_str_bytes_and_none():
+    assert hash_parts("中文") == hash_parts("中文".encode("utf-8"))
+    assert hash_parts(None, "x") == hash_parts(b"", "x")
+    assert hash_parts("x") == hash_parts("x")
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = DiskCache(tmp_path, 1 << 20)
+    key = hash_parts("source", "input")
+    assert cache.get(key) is None
+    cache.put(key, {"output": "1 2 3\n", "ok": True})
+    assert cache.get(key) == {"output": "1 2 3\n", "ok": True}
+    assert cache.stats() == (1, 1)
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = DiskCache(tmp_path, 1 << 20)
+    key = hash_parts("k")
+    cache.put(key, {"v": 1})
+    next(tmp_path.glob("*/*.json")).write_text("{not json", encoding="utf-8")
+    assert cache.get(key) is None
+
+
+def test_zero_budget_disables_writes(tmp_path):
+    cache = DiskCache(tmp_path, 0)
+    cache.put(hash_parts("k"), {"v": 1})
+    assert cache.get(hash_parts("k")) is None
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    payload = {"data": "x" * 100}
+    entry_size = len(b'{"data": "' + b"x" * 100 + b'"}')
+    cache = DiskCache(tmp_path, entry_size * 3)
+    keys = [hash_parts(str(i)) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, payload)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    # 命中刷新 mtime，最旧的变成 keys[1]
+    assert cache.get(keys[0]) == payload
+
+    # 超出预算后降到 80% (2.4 个条目)，从最旧的开始删两个
+    cache.put(hash_parts("new"), payload)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is None
+    assert cache.get(keys[0]) == payload
+    assert cache.get(hash_parts("new")) == payload
@@ -0,0 +1,143 @@
+"""src/capture.py: 有界输出收集与流式摘要"""
+import os
+import random
+import time
+
+import pytest
+
+from src.capture import SPILL_PREFIX, LineSplitter, OutputCapture, prune_outputs
+from src.utils import normalize_output, text_digest
+
+SAMPLES = [
+    "",
+    "\n\n\n",
+    "1 2 3",
+    "a \nb\t\n\n",
+    "x\r\ny\r\rz \r\n\r\n",
+    "  leading\n\n  \n middle \n\n\nend  \n \n",
+    "中文 输出\n第二行  \n",
+]
+
+
+def _capture(text, sizes, **kwargs):
+    capture = OutputCapture(**kwargs)
+    pos = 0
+    for size in sizes:
+        if pos >= len(text):
+            break
+        capture.write(text[pos:pos + size])
+        pos += size
+    capture.write(text[pos:])
+    capture.close()
+    return capture
+
+
+def _random_text(rng, length):
+    return "".join(rng.choice("ab \t\r\n\n") for _ in range(length))
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+@pytest.mark.parametrize("size", [1, 2, 3, 1000])
+def test_digest_equals_full_output_digest(text, size):
+    capture = _capture(text, [size] * len(text))
+    assert capture.digest == text_digest(normalize_output(text))
+
+
+def test_digest_with_random_chunking():
+    rng = random.Random(1234)
+    for _ in range(300):
+        text = _random_text(rng, rng.randint(0, 40))
+        sizes = [rng.randint(1, 6) for _ in range(len(text))]
+        assert _capture(text, sizes).digest == text_digest(normalize_output(text)), repr(text)
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_line_splitter_matches_normalize_output(text):
+    for size in (1, 2, 1000):
+        splitter = LineSplitter()
+        lines = []
+        for start in range(0, len(text), size):
+            carried, chunk_lines = splitter.feed(text[start:start + size])
+            lines.extend([""] * carried + chunk_lines)
+        carried, chunk_lines = splitter.finish()
+        lines.extend([""] * carried + chunk_lines)
+        assert "\n".join(lines) == normalize_output(text)
+
+
+def test_small_output_stays_in_memory():
+    capture = OutputCapture.from_text("1\n2\n")
+    assert capture.text() == "1\n2\n"
+    assert capture.excerpt() == "1\n2\n"
+    assert capture.path is None and capture.complete
+    assert list(capture.iter_lines()) == ["1", "2"]
+
+
+def test_large_output_spills_to_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(OutputCapture, "MEMORY_CHARS", 100)
+    monkeypatch.setattr(OutputCapture, "EXCERPT_CHARS", 10)
+    text = "".join(f"{i} \n" for i in range(200))
+    capture = _capture(text, [7] * len(text), spill_dir=tmp_path)
+    assert capture.path is not None and capture.path.name.startswith(SPILL_PREFIX)
+    assert capture.text() is None and capture.complete
+    assert capture.path.read_text(encoding="utf-8") == text
+    assert "\n".join(capture.iter_lines()) == normalize_output(text)
+    assert capture.digest == text_digest(normalize_output(text))
+    excerpt = capture.excerpt()
+    assert excerpt.startswith(text[:10]) and excerpt.endswith(text[-10:])
+    assert str(capture.path) in excerpt
+
+    kept = capture.keep()
+    assert kept == str(tmp_path / f"{capture.digest[:16]}.txt")
+    del capture
+    assert os.path.exists(kept)
+
+
+def test_discard_removes_spill_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(OutputCapture, "MEMORY_CHARS", 10)
+    capture = _capture("x" * 100, [10] * 10, spill_dir=tmp_path)
+    path = capture.path
+    assert path.exists()
+    capture.discard()
+    assert not path.exists()
+
+
+def test_without_spill_dir_middle_is_elided(monkeypatch):
+    monkeypatch.setattr(OutputCapture, "MEMORY_CHARS", 50)
+    monkeypatch.setattr(OutputCapture, "EXCERPT_CHARS", 5)
+    text = "".join(f"{i}\n" for i in range(100))
+    capture = _capture(text, [9] * len(text))
+    assert capture.elided and not capture.complete
+    assert capture.text() is None
+    assert list(capture.iter_lines()) == []
+    assert capture.digest == text_digest(normalize_output(text))
+    assert capture.excerpt().endswith(text[-5:])
+
+
+def test_limit_truncates_and_asks_to_stop():
+    capture = OutputCapture(limit=10)
+    assert capture.write("12345")
+    assert not capture.write("678901234")
+    assert not capture.write("more")
+    capture.close()
+    assert capture.truncated and capture.size == 10
+    assert capture.text() == "1234567890"
+    assert capture.digest == text_digest(normalize_output("1234567890"))
+    assert "已截断" in capture.excerpt()
+
+
+def test_prune_outputs(tmp_path):
+    now = time.time()
+    for i in range(5):
+        path = tmp_path / f"{i:016x}.txt"
+        path.write_text("x")
+        os.utime(path, (now - i, now - i))
+    stale = tmp_path / f"{SPILL_PREFIX}old.txt"
+    stale.write_text("x")
+    os.utime(stale, (now - 10 * 86400, now - 10 * 86400))
+    fresh = tmp_path / f"{SPILL_PREFIX}new.txt"
+    fresh.write_text("x")
+
+    prune_outputs(tmp_path, keep=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [f"{0:016x}.txt", f"{1:016x}.txt", fresh.name]
+    )
@@ -0,0 +1,173 @@
+"""src/cli.py: 无界面运行的用例筛选、JSON 行输出、JUnit 报告和退出码"""
+import json
+import threading
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from src import cli, tester as tester_module
+# 别名避免 pytest 把 Test* 类当作测试收集
+from src.models import TestResult as Result, TestStatus as Status
+
+
+def _tree(root):
+    """两个测试库: A/lib1 (3 个用例)、B (2 个用例)"""
+    for lib, count in (("A/lib1", 3), ("B", 2)):
+        for num in range(1, count + 1):
+            path = root / lib / f"testfile{num}.txt"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("int main() { return 0; }\n", encoding="utf-8")
+    (root / "B" / "input1.txt").write_text("1\n", encoding="utf-8")
+    return root
+
+
+class FakeTester:
+    """代替 CompilerTester: 按 "测试库/文件名" 给出预设的结果"""
+
+    outcomes = {}          # {"A/lib1/testfile1.txt": Status}，没有列出的为 PASSED
+    compile_ok = True
+    stall_after = None     # 产出这么多结果后等待取消 (模拟长时间运行)
+    failed_before = ()
+
+    def __init__(self, project_dir, test_dir):
+        self.last_summary = None
+        self.runs = []
+
+    def failed_last_time(self, cases):
+        return [case for case in cases if case.name in self.failed_before]
+
+    def compile_project(self):
+        return self.compile_ok, "编译成功" if self.compile_ok else "编译失败"
+
+    def iter_parallel(self, cases, max_workers=4, token=None, failures_first=False):
+        FakeTester.ran = [case.name for case in cases]
+        for index, case in enumerate(cases):
+            if token is not None and token.cancelled:
+                return
+            if self.stall_after is not None and index == self.stall_after:
+                stopped = threading.Event()
+                token.add_callback(stopped.set)
+                stopped.wait(5)
+                return
+            key = f"{case.testfile.parent.name}/{case.name}"
+            status = next((s for k, s in self.outcomes.items() if k.endswith(key)), Status.PASSED)
+            yield case, Result(status, status.value)
+
+
+@pytest.fixture
+def run_cli(tmp_path, monkeypatch, capsys):
+    testfiles = _tree(tmp_path / "testfiles")
+    monkeypatch.setattr(cli, "TEST_DIR", tmp_path)
+    monkeypatch.setattr(tester_module, "CompilerTester", FakeTester)
+    for name in ("outcomes", "compile_ok", "stall_after", "failed_before"):
+        monkeypatch.setattr(FakeTester, name, getattr(FakeTester, name))
+    junit = tmp_path / "junit.xml"
+
+    def run(*args, **fake):
+        for name, value in fake.items():
+            setattr(FakeTester, name, value)
+        with pytest.raises(SystemExit) as exit_info:
+            cli.main(["run", "--testfiles", str(testfiles), "--project", str(tmp_path),
+                      "--junit", str(junit), *args])
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        return exit_info.value.code, lines
+
+    run.junit = junit
+    return run
+
+
+def _junit_counts(path):
+    root = ET.parse(str(path)).getroot()
+    return {suite.get("name"): {key: int(suite.get(key)) for key in ("tests", "failures", "errors", "skipped")}
+            for suite in root.iter("testsuite")}
+
+
+def test_select_cases(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "TEST_DIR", tmp_path)
+    root = _tree(tmp_path / "testfiles")
+
+    def names(libs, cases):
+        return [f"{lib}/{case.name}" for lib, case in cli.select_cases(root, libs, cases)]
+
+    assert names([], []) == [
+        "A/lib1/testfile1.txt", "A/lib1/testfile2.txt", "A/lib1/testfile3.txt",
+        "B/testfile1.txt", "B/testfile2.txt",
+    ]
+    assert names(["A/*"], ["testfile2"]) == ["A/lib1/testfile2.txt"]
+    assert names([], ["B/testfile1.txt", "*3.txt"]) == ["A/lib1/testfile3.txt", "B/testfile1.txt"]
+    assert names(["C"], []) == []
+    inputs = [case.input_file for _, case in cli.select_cases(root, ["B"], [])]
+    assert inputs == [root.resolve() / "B" / "input1.txt", None]
+
+
+def test_all_passed(run_cli):
+    code, lines = run_cli()
+    assert code == cli.EXIT_OK
+    results = [line for line in lines if line["event"] == "result"]
+    assert [(r["lib"], r["case"], r["status"]) for r in results][:2] == [
+        ("A/lib1", "testfile1.txt", "PASSED"), ("A/lib1", "testfile2.txt", "PASSED"),
+    ]
+    assert results[-1]["progress"] == "5/5"
+    assert lines[-1] == {**lines[-1], "event": "summary", "total": 5, "passed": 5, "failed": 0,
+                         "skipped": 0, "not_run": 0, "stopped": ""}
+    assert _junit_counts(run_cli.junit) == {
+        "A/lib1": {"tests": 3, "failures": 0, "errors": 0, "skipped": 0},
+        "B": {"tests": 2, "failures": 0, "errors": 0, "skipped": 0},
+    }
+
+
+def test_failures_errors_and_skips(run_cli):
+    code, lines = run_cli(outcomes={
+        "lib1/testfile2.txt": Status.FAILED,
+        "B/testfile1.txt": Status.TIMEOUT,
+        "B/testfile2.txt": Status.SKIPPED,
+    })
+    assert code == cli.EXIT_FAILED
+    summary = lines[-1]
+    assert (summary["passed"], summary["failed"], summary["skipped"], summary["not_run"]) == (2, 2, 1, 0)
+    assert _junit_counts(run_cli.junit) == {
+        "A/lib1": {"tests": 3, "failures": 1, "errors": 0, "skipped": 0},
+        "B": {"tests": 2, "failures": 0, "errors": 1, "skipped": 1},
+    }
+
+
+def test_fail_fast_stops_and_counts_not_run(run_cli):
+    code, lines = run_cli("--fail-fast", outcomes={"lib1/testfile1.txt": Status.FAILED})
+    assert code == cli.EXIT_FAILED
+    summary = lines[-1]
+    assert summary["not_run"] == 4 and "--fail-fast" in summary["stopped"]
+    assert _junit_counts(run_cli.junit)["B"] == {"tests": 2, "failures": 0, "errors": 0, "skipped": 2}
+    skipped = ET.parse(str(run_cli.junit)).getroot().find(".//testsuite[@name='B']/testcase/skipped")
+    assert "--fail-fast" in skipped.get("message")
+
+
+def test_time_budget_with_cases_not_run_is_not_success(run_cli):
+    code, lines = run_cli("--time-budget", "0.1", stall_after=2)
+    assert code == cli.EXIT_INCOMPLETE
+    summary = lines[-1]
+    assert (summary["passed"], summary["failed"], summary["not_run"]) == (2, 0, 3)
+    assert "时间预算" in summary["stopped"]
+    counts = _junit_counts(run_cli.junit)
+    assert counts["A/lib1"]["skipped"] == 1 and counts["B"]["skipped"] == 2
+
+
+def test_no_matching_cases_or_compile_failure_is_an_error(run_cli):
+    assert run_cli("--lib", "nothing")[0] == cli.EXIT_ERROR
+    code, lines = run_cli(compile_ok=False)
+    assert code == cli.EXIT_ERROR
+    assert lines == []
+
+
+def test_last_failed_runs_only_previous_failures(run_cli):
+    code, _ = run_cli("--lf", failed_before=("testfile3.txt",))
+    assert code == cli.EXIT_OK
+    assert FakeTester.ran == ["testfile3.txt"]
+    run_cli("--lf", failed_before=())
+    assert len(FakeTester.ran) == 5
+
+
+def test_keyboard_interrupt(run_cli, monkeypatch):
+    def interrupted(self, *args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(FakeTester, "compile_project", interrupted)
+    assert run_cli()[0] == cli.EXIT_INTERRUPTED
@@ -0,0 +1,112 @@
+"""src/compare.py: 边读边比较，出现不同立即停止"""
+import pytest
+
+from src.capture import OutputCapture
+from src.compare import StreamComparator
+
+EXPECTED = "1\n2\n\n3 4\n" + "".join(f"line {i}\n" for i in range(100))
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _comparator(expected=EXPECTED):
+    comparator = StreamComparator()
+    comparator.set_expected(OutputCapture.from_text(expected))
+    return comparator
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 4096])
+def test_matching_output_never_diverges(size):
+    comparator = _comparator()
+    # 换行风格和行尾空白不影响比较
+    actual = EXPECTED.replace("\n", " \r\n") + "\n\n"
+    assert all(comparator.feed(chunk) for chunk in _chunks(actual, size))
+    assert not comparator.diverged
+
+
+@pytest.mark.parametrize("size", [1, 5, 4096])
+def test_stops_at_first_divergence(size):
+    comparator = _comparator()
+    actual = EXPECTED.replace("line 10\n", "line 1O\n") + "".join(f"more {i}\n" for i in range(1000))
+    fed = 0
+    for chunk in _chunks(actual, size):
+        fed += len(chunk)
+        if not comparator.feed(chunk):
+            break
+    assert comparator.diverged
+    # 读到出错的那一行 (或所在的块) 就停止，不会读完后面的输出
+    assert fed < actual.index("line 1O") + len("line 1O\n") + size
+    assert not comparator.feed("anything\n")
+
+    message = comparator.failure().message
+    assert "第 15 行不同" in message
+    assert "期望: line 10" in message and "实际: line 1O" in message
+    assert "14: line 9" in message
+    assert comparator.failure().expected_digest == OutputCapture.from_text(EXPECTED).digest
+
+
+def test_partial_line_is_rejected_before_newline():
+    comparator = _comparator("12345\n")
+    assert comparator.feed("123")
+    assert not comparator.feed("9")
+    assert "第 1 行不同" in comparator.failure().message
+
+
+def test_extra_output_diverges():
+    comparator = _comparator("a\nb\n")
+    assert comparator.feed("a\nb\n")
+    assert comparator.feed("\n \n")      # 末尾空行不算多出的输出
+    assert not comparator.feed("c")
+    assert "期望输出只有 2 行" in comparator.failure().message
+
+
+def test_shorter_output_is_not_a_divergence():
+    comparator = _comparator()
+    assert comparator.feed("1\n2\n")
+    assert not comparator.diverged
+
+
+def test_expected_arriving_late_checks_pending_lines():
+    comparator = StreamComparator()
+    assert comparator.feed("1\n2\n")
+    assert comparator.feed("x\n")
+    comparator.set_expected(OutputCapture.from_text(EXPECTED))
+    assert comparator.diverged
+    assert "第 3 行不同" in comparator.failure().message
+
+
+def test_gives_up_when_too_much_output_before_expected(monkeypatch):
+    monkeypatch.setattr(StreamComparator, "MAX_PENDING_CHARS", 10)
+    comparator = StreamComparator()
+    assert comparator.feed("0123456789\nabc\n")
+    comparator.set_expected(OutputCapture.from_text("different\n"))
+    assert comparator.feed("still running\n")
+    assert not comparator.diverged
+
+
+def test_restart_discards_previous_output():
+    comparator = _comparator()
+    assert comparator.feed("1\n2\n")
+    comparator.restart()
+    assert comparator.feed("1\n2\n\n3 4\n")
+    assert not comparator.diverged
+    assert not comparator.feed("line 5\n")
+    assert "第 5 行不同" in comparator.failure().message
+
+
+def test_expected_from_spill_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(OutputCapture, "MEMORY_CHARS", 64)
+    expected = OutputCapture(spill_dir=tmp_path)
+    for chunk in _chunks(EXPECTED, 10):
+        expected.write(chunk)
+    expected.close()
+    assert expected.path is not None
+
+    comparator = StreamComparator()
+    comparator.set_expected(expected)
+    assert comparator.feed(EXPECTED[:-20])
+    assert not comparator.feed("oops\n")
+    comparator.close()
+    expected.discard()
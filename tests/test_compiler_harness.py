@@ -0,0 +1,124 @@
+import shutil
+import subprocess
+
+import pytest
+
+from src import build
+from src.compiler_harness import (
+    CompilerHarnessPool, STATUS_ERROR, STATUS_LEAK, STATUS_OK, STATUS_TIMEOUT
+)
+from src.tester import CompilerTester
+
+
+# testfile.txt 的内容决定行为: error 抛异常，loop 死循环，leak 留下非守护线程
+COMPILER_SOURCE = """\
+import java.nio.file.*;
+
+public class Compiler {
+    public static void main(String[] args) throws Exception {
+        String src = new String(Files.readAllBytes(Paths.get("testfile.txt")), "UTF-8").trim();
+        if (src.equals("error")) {
+            throw new IllegalStateException("bad input");
+        }
+        if (src.equals("loop")) {
+            while (true) {
+                Thread.sleep(10);
+            }
+        }
+        if (src.equals("leak")) {
+            new Thread(() -> {
+                try {
+                    Thread.sleep(60000);
+                } catch (InterruptedException e) {
+                }
+            }).start();
+        }
+        System.out.println("compiled " + src);
+        Files.write(Paths.get("mips.txt"), ("# " + src + "\\n").getBytes("UTF-8"));
+    }
+}
+"""
+
+
+@pytest.fixture
+def tester(tmp_path, config):
+    config.execution.compiler_harness = True
+    project = tmp_path / "project"
+    (project / "src").mkdir(parents=True)
+    (project / "src" / "Compiler.java").write_text(COMPILER_SOURCE, encoding="utf-8")
+    tester = CompilerTester(project, tmp_path / "tests")
+    yield tester
+    tester.close()
+    tester.cleanup_workers()
+
+
+def test_rebuild_reenables_harness_after_leak(tester, monkeypatch):
+    monkeypatch.setattr(CompilerHarnessPool, "ensure_built", lambda self, timeout=120: (True, ""))
+    monkeypatch.setattr(CompilerHarnessPool, "compile", lambda self, worker_dir, timeout: (STATUS_LEAK, ""))
+    monkeypatch.setattr(build, "single_flight", lambda key, fn: (True, "[Java] 无需重新编译"))
+    monkeypatch.setattr(tester, "prepare_jvm_archives", lambda: [])
+
+    assert tester._harness_pool is not None
+    assert tester._invoke_compiler_harness(tester.work_dir) is None
+    assert tester._harness_pool is None
+
+    ok, _ = tester.compile_java_project()
+    assert ok
+    assert tester._harness_pool is not None
+
+
+def test_rebuild_keeps_harness_off_when_disabled(tester, config, monkeypatch):
+    config.execution.compiler_harness = False
+    monkeypatch.setattr(build, "single_flight", lambda key, fn: (True, "[Java] 无需重新编译"))
+    monkeypatch.setattr(tester, "prepare_jvm_archives", lambda: [])
+
+    ok, _ = tester.compile_java_project()
+    assert ok
+    assert tester._harness_pool is None
+
+
+@pytest.mark.skipif(not (shutil.which("javac") and shutil.which("jar")), reason="需要 JDK")
+def test_harness_protocol(tmp_path):
+    classes = tmp_path / "classes"
+    classes.mkdir()
+    source = tmp_path / "Compiler.java"
+    source.write_text(COMPILER_SOURCE, encoding="utf-8")
+    subprocess.run(["javac", "-d", str(classes), str(source)], check=True)
+    jar = tmp_path / "Compiler.jar"
+    subprocess.run(["jar", "cf", str(jar), "-C", str(classes), "."], check=True)
+
+    pool = CompilerHarnessPool("java", jar, tmp_path / "work", "javac")
+    assert pool.ensure_built() == (True, "")
+    worker = tmp_path / "worker"
+    worker.mkdir()
+
+    def run(source: str, timeout: float = 30):
+        (worker / "mips.txt").unlink(missing_ok=True)
+        (worker / "testfile.txt").write_text(source, encoding="utf-8")
+        return pool.compile(worker, timeout)
+
+    try:
+        status, output = run("first")
+        assert status == STATUS_OK
+        assert "compiled first" in output
+        assert (worker / "mips.txt").read_text(encoding="utf-8") == "# first\n"
+
+        status, output = run("error")
+        assert status == STATUS_ERROR
+        assert "bad input" in output
+        assert not (worker / "mips.txt").exists()
+
+        # 同一个 JVM 继续处理下一个用例
+        assert run("second")[0] == STATUS_OK
+        service = pool.get()
+
+        assert run("leak")[0] == STATUS_LEAK
+        assert run("third")[0] == STATUS_OK
+        assert pool.get() is service  # 服务对象不变，JVM 已被重启
+
+        assert run("loop", timeout=1)[0] == STATUS_TIMEOUT
+        status, output = run("fourth")
+        assert status == STATUS_OK
+        assert "compiled fourth" in output
+    finally:
+        pool.close_all()
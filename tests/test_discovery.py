@@ -0,0 +1,141 @@
+"""src/discovery.py: TestDiscovery 与 CorpusIndex 的增量刷新"""
+import os
+import time
+
+import pytest
+
+from src.discovery import CorpusIndex, TestDiscovery
+
+OLD = time.time() - 3600
+
+
+def _write(path, text="int main() { return 0; }\n"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _age(root):
+    """把所有目录的 mtime 调到一小时前 (在 racy window 之外)"""
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (OLD, OLD))
+
+
+def _from_discovery(root):
+    return {
+        lib.relative_to(root).as_posix(): [
+            (case.name, case.testfile, case.input_file) for case in TestDiscovery.discover_in_dir(lib)
+        ]
+        for lib in TestDiscovery.discover_test_libs(root)
+    }
+
+
+def _from_index(index):
+    return {
+        lib: [(case.name, case.testfile, case.input_file) for case in index.cases(lib)]
+        for lib, _ in index.libs()
+    }
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "testfiles"
+    for lib in ("A/lib1", "A/lib2", "B"):
+        for num in (1, 2, 10):
+            _write(root / lib / f"testfile{num}.txt")
+        _write(root / lib / "input1.txt", "1\n")
+    _write(root / "A" / "nested" / "deeper" / "testfile1.txt")
+    _write(root / "B" / "sub" / "testfile1.txt")   # 测试库下面的目录不再查找
+    _write(root / "empty" / "notes.md", "")
+    _age(root)
+    return root
+
+
+def _index(tmp_path, root):
+    index = CorpusIndex.for_root(root, tmp_path / "cache")
+    index.refresh()
+    return index
+
+
+def test_index_matches_discovery(tmp_path, corpus):
+    index = _index(tmp_path, corpus)
+    expected = _from_discovery(corpus.resolve())
+    assert list(expected) == ["A/lib1", "A/lib2", "A/nested/deeper", "B"]
+    assert _from_index(index) == expected
+    assert [name for name, _, _ in expected["B"]] == ["testfile1.txt", "testfile2.txt", "testfile10.txt"]
+    assert index.libs()[0] == ("A/lib1", 3)
+
+
+def test_unchanged_tree_is_not_rescanned(tmp_path, corpus):
+    index = _index(tmp_path, corpus)
+    assert index.refresh() is False
+    assert index.last_stats[0] == 0
+
+    reloaded = CorpusIndex.for_root(corpus, tmp_path / "cache")
+    assert reloaded.load()
+    assert _from_index(reloaded) == _from_index(index)
+    assert reloaded.refresh() is False
+    assert reloaded.last_stats[0] == 0
+
+
+def test_add_remove_rename_match_discovery(tmp_path, corpus):
+    index = _index(tmp_path, corpus)
+    root = corpus.resolve()
+
+    _write(corpus / "A" / "lib1" / "testfile3.txt")
+    _write(corpus / "A" / "lib1" / "input3.txt", "3\n")
+    assert index.refresh() is True
+    assert index.last_stats[0] == 1
+    assert _from_index(index) == _from_discovery(root)
+
+    (corpus / "A" / "lib2" / "testfile2.txt").unlink()
+    (corpus / "B" / "input1.txt").unlink()
+    assert index.refresh() is True
+    assert _from_index(index) == _from_discovery(root)
+
+    (corpus / "B" / "testfile10.txt").rename(corpus / "B" / "testfile11.txt")
+    assert index.refresh() is True
+    assert _from_index(index) == _from_discovery(root)
+
+    (corpus / "A" / "lib2").rename(corpus / "A" / "lib3")
+    _write(corpus / "C" / "testfile1.txt")
+    assert index.refresh() is True
+    libs = _from_index(index)
+    assert libs == _from_discovery(root)
+    assert "A/lib3" in libs and "A/lib2" not in libs and "C" in libs
+
+    assert index.refresh() is False
+
+
+def test_recent_directory_is_rescanned_within_racy_window(tmp_path, corpus):
+    index = _index(tmp_path, corpus)
+    lib = corpus / "A" / "lib1"
+    _write(lib / "testfile4.txt")
+    assert index.refresh() is True
+    stamp = os.stat(lib).st_mtime_ns
+
+    # 同一时间戳内的后续修改: mtime 不变，但目录刚修改过，仍会重新列出
+    _write(lib / "testfile5.txt")
+    os.utime(lib, ns=(stamp, stamp))
+    assert index.refresh() is True
+    assert "testfile5.txt" in [case.name for case in index.cases("A/lib1")]
+    assert _from_index(index) == _from_discovery(corpus.resolve())
+
+
+def test_deep_refresh_rehashes_modified_files(tmp_path, corpus):
+    index = _index(tmp_path, corpus)
+    testfile = corpus / "B" / "testfile1.txt"
+    manifest_before = index.manifest_path.read_text(encoding="utf-8")
+    testfile.write_text("int main() { return 1; }\n", encoding="utf-8")
+    _age(corpus)
+    index.refresh()
+    assert index.manifest_path.read_text(encoding="utf-8") == manifest_before
+    index.refresh(deep=True)
+    assert index.manifest_path.read_text(encoding="utf-8") != manifest_before
+
+
+def test_stale_manifest_is_ignored(tmp_path, corpus):
+    index = _index(tmp_path, corpus)
+    other = CorpusIndex(tmp_path / "elsewhere", index.manifest_path)
+    assert other.load() is False
+    index.manifest_path.write_text("{", encoding="utf-8")
+    assert CorpusIndex.for_root(corpus, tmp_path / "cache").load() is False
@@ -0,0 +1,96 @@
+"""src/engine.py: AsyncTestEngine 与同步接口共用阶段层，各阶段命令用 conftest 中的假脚本"""
+import asyncio
+import time
+
+from src.engine import AsyncTestEngine
+from src.models import TestStatus as Status
+
+
+def source(*lines: str) -> str:
+    return "\n".join(lines) + "\n"
+
+
+def run_engine(tester, cases, max_workers: int = 4):
+    """运行一批用例，按产出顺序返回 [(用例名, 结果, 产出时刻)]"""
+    async def collect():
+        items = []
+        async for case, result in AsyncTestEngine(tester, max_workers).run(cases):
+            items.append((case.name, result, time.monotonic()))
+        return items
+    return asyncio.run(collect())
+
+
+def peak(log, stage: str) -> int:
+    """stage 阶段同时运行的进程数的最大值"""
+    running = highest = 0
+    for line in log.read_text(encoding="utf-8").splitlines():
+        event, name, _ = line.split()
+        if name != stage:
+            continue
+        running += 1 if event == "start" else -1
+        highest = max(highest, running)
+    return highest
+
+
+def test_outcomes_match_sync_path(fake_tester, make_case):
+    cases = [
+        make_case("pass", source("out: 1", "expect: 1")),
+        make_case("wrong", source("out: 1", "expect: 2")),
+        make_case("compile_error", source("compile_error", "expect: 1")),
+        make_case("gcc_error", source("out: 1", "gcc_error")),
+    ]
+    expected = {
+        "pass": Status.PASSED, "wrong": Status.FAILED,
+        "compile_error": Status.COMPILE_ERROR, "gcc_error": Status.SKIPPED,
+    }
+
+    results = {name: result for name, result, _ in run_engine(fake_tester, cases)}
+    assert {name: result.status for name, result in results.items()} == expected
+    assert "syntax error" in results["compile_error"].message
+    assert "fake g++ error" in results["gcc_error"].message
+
+    for case in cases:
+        result = fake_tester.test(case.testfile, case.input_file)
+        assert result.status == expected[case.name]
+        if result.status != Status.FAILED:
+            # 输出不匹配的信息取决于期望输出是否先于 Mars 输出就绪
+            assert result.message == results[case.name].message
+
+
+def test_results_are_yielded_as_they_complete(fake_tester, make_case):
+    cases = [
+        make_case("slow", source("mars_sleep 1", "out: 1", "expect: 1")),
+        make_case("fast", source("out: 1", "expect: 1")),
+    ]
+    start = time.monotonic()
+    items = run_engine(fake_tester, cases, max_workers=2)
+    assert [name for name, _, _ in items] == ["fast", "slow"]
+    assert items[0][2] - start < 0.9
+    assert items[1][2] - items[0][2] > 0.3
+
+
+def test_stage_semaphores_bound_processes(fake_tester, make_case):
+    parallel = fake_tester.config.parallel
+    parallel.compile_workers, parallel.mars_workers, parallel.gcc_workers = 1, 2, 1
+    cases = [
+        make_case(f"case{i}", source("compile_sleep 0.1", "mars_sleep 0.2", "gcc_sleep 0.1", "out: 1", "expect: 1"))
+        for i in range(6)
+    ]
+    items = run_engine(fake_tester, cases, max_workers=4)
+    assert all(result.status == Status.PASSED for _, result, _ in items)
+    assert peak(fake_tester.stage_log, "compile") == 1
+    assert peak(fake_tester.stage_log, "gcc") == 1
+    assert 1 <= peak(fake_tester.stage_log, "mars") <= 2
+
+
+def test_reference_temp_files_removed(fake_tester, make_case):
+    cases = [
+        make_case("pass", source("out: 1", "expect: 1")),
+        # 编译失败时取消仍在编译的 g++
+        make_case("cancelled_reference", source("compile_error", "gcc_sleep 1", "expect: 1")),
+    ]
+    items = run_engine(fake_tester, cases)
+    assert {name: result.status for name, result, _ in items} == {
+        "pass": Status.PASSED, "cancelled_reference": Status.COMPILE_ERROR,
+    }
+    assert list(fake_tester.scratch_root.rglob("tmp_test.*")) == []
@@ -0,0 +1,85 @@
+"""src/history.py: 耗时记录与按耗时从长到短调度"""
+import json
+
+from src.history import DurationHistory, case_fingerprint
+
+
+def test_orders_known_cases_longest_first(tmp_path, make_case):
+    history = DurationHistory(tmp_path / "history.json")
+    fast, slow, medium = make_case("fast"), make_case("slow"), make_case("medium")
+    history.record(fast, 0.1)
+    history.record(slow, 3.0)
+    history.record(medium, 1.0)
+    ordered, known = history.order([fast, slow, medium])
+    assert [case.name for case in ordered] == ["slow", "medium", "fast"]
+    assert known == 3
+
+
+def test_unknown_cases_are_estimated_by_size(tmp_path, make_case):
+    history = DurationHistory(tmp_path / "history.json")
+    known = make_case("known", "x" * 100)
+    history.record(known, 1.0)
+    small = make_case("small", "x" * 10)
+    large = make_case("large", "x" * 1000)
+    ordered, count = history.order([small, known, large])
+    assert [case.name for case in ordered] == ["large", "known", "small"]
+    assert count == 1
+
+
+def test_without_history_larger_files_go_first_and_ties_keep_order(tmp_path, make_case):
+    history = DurationHistory(tmp_path / "history.json")
+    a, b, c = make_case("a", "xx"), make_case("b", "xxxx"), make_case("c", "xx")
+    ordered, known = history.order([a, b, c])
+    assert [case.name for case in ordered] == ["b", "a", "c"]
+    assert known == 0
+
+
+def test_same_content_is_smoothed_and_changed_content_replaced(tmp_path, make_case):
+    path = tmp_path / "history.json"
+    case = make_case("case")
+    history = DurationHistory(path)
+    history.record(case, 1.0)
+    history.record(case, 3.0)
+    history.save()
+    entry = json.loads(path.read_text(encoding="utf-8"))[str(case.testfile.resolve())]
+    assert entry == [case_fingerprint(case), 2.0]
+
+    case.testfile.write_text("int main() { return 1; }\n", encoding="utf-8")
+    history = DurationHistory(path)
+    history.record(case, 5.0)
+    history.save()
+    entry = json.loads(path.read_text(encoding="utf-8"))[str(case.testfile.resolve())]
+    assert entry == [case_fingerprint(case), 5.0]
+
+
+def test_fingerprint_covers_input(make_case):
+    assert case_fingerprint(make_case("a", input_data="1\n")) != case_fingerprint(make_case("b", input_data="2\n"))
+
+
+def test_malformed_entries_are_dropped_at_load(tmp_path, make_case):
+    path = tmp_path / "history.json"
+    good, bad = make_case("good"), make_case("bad", "x")
+    path.write_text(json.dumps({
+        str(good.testfile.resolve()): ["abc", 2],
+        str(bad.testfile.resolve()): ["abc", "slow"],
+        "negative": ["abc", -1.0],
+        "boolean": ["abc", True],
+        "short": ["abc"],
+        "not-a-list": 3.0,
+    }), encoding="utf-8")
+    history = DurationHistory(path)
+    ordered, known = history.order([bad, good])
+    assert known == 1
+    assert ordered[0].name == "good"
+    assert set(history._load()) == {str(good.testfile.resolve())}
+
+
+def test_unreadable_file_starts_empty(tmp_path, make_case):
+    path = tmp_path / "history.json"
+    path.write_text("[1, 2", encoding="utf-8")
+    history = DurationHistory(path)
+    case = make_case("case")
+    assert history.order([case]) == ([case], 0)
+    history.record(case, 1.0)
+    history.save()
+    assert json.loads(path.read_text(encoding="utf-8"))
@@ -0,0 +1,101 @@
+"""CompilerTester.iter_parallel: 取消与背压，各阶段命令用 conftest 中的假脚本"""
+import os
+import threading
+import time
+
+import pytest
+
+from src.models import TestStatus as Status
+from src.tester import CancelToken
+
+
+def source(*lines: str) -> str:
+    return "\n".join(lines) + "\n"
+
+
+def counting(cases, pulled: list):
+    """逐个交出用例，并记下引擎已经取走 (即已启动) 的用例"""
+    for case in cases:
+        pulled.append(case.name)
+        yield case
+
+
+def engine_threads() -> list:
+    return [thread for thread in threading.enumerate() if thread.name == "test-engine-loop"]
+
+
+def unfinished_compilers(log) -> set:
+    """已启动但没有结束的编译器进程 (hang 用例的 sleep 30)"""
+    started, ended = set(), set()
+    for line in log.read_text(encoding="utf-8").splitlines():
+        event, stage, pid = line.split()
+        if stage == "compile":
+            (started if event == "start" else ended).add(int(pid))
+    return started - ended
+
+
+def test_cancel_stops_sleeping_stages(fake_tester, make_case):
+    hanging = [make_case(f"hang{i}", source("hang")) for i in range(2)]
+    quick = [make_case(f"quick{i}", source("out: 1", "expect: 1")) for i in range(2)]
+    token = CancelToken()
+    results = []
+    cancelled_at = None
+    pids = set()
+
+    for case, result in fake_tester.iter_parallel(hanging + quick, max_workers=4, token=token):
+        results.append((case.name, result.status))
+        if len(results) == len(quick):
+            deadline = time.monotonic() + 5
+            while len(pids) < len(hanging) and time.monotonic() < deadline:
+                time.sleep(0.02)
+                pids = unfinished_compilers(fake_tester.stage_log)
+            cancelled_at = time.monotonic()
+            token.cancel()
+    returned_at = time.monotonic()
+
+    assert cancelled_at is not None
+    assert returned_at - cancelled_at < 1.0
+    assert sorted(results) == [("quick0", Status.PASSED), ("quick1", Status.PASSED)]
+    assert len(pids) == len(hanging)
+    for pid in pids:
+        # 编译器以独立进程组启动 (进程组号即 pid)
+        with pytest.raises(ProcessLookupError):
+            os.killpg(pid, 0)
+
+
+def test_consumer_stopping_early_closes_engine(fake_tester, make_case):
+    max_workers, buffer, wanted = 2, 2, 3
+    cases = [make_case(f"case{i}", source("out: 1", "expect: 1")) for i in range(30)]
+    pulled = []
+
+    results = fake_tester.iter_parallel(counting(cases, pulled), max_workers=max_workers, buffer=buffer)
+    for count, _ in enumerate(results, 1):
+        if count == wanted:
+            break
+    # 调用方不再取结果时引擎停在队列满的位置，不会继续启动用例
+    time.sleep(0.5)
+    assert len(pulled) <= wanted + buffer + max_workers
+
+    results.close()
+    assert engine_threads() == []
+    assert len(pulled) <= wanted + buffer + max_workers
+
+
+def test_slow_consumer_bounds_launched_cases(fake_tester, make_case):
+    max_workers, buffer = 2, 1
+    cases = [make_case(f"case{i}", source("out: 1", "expect: 1")) for i in range(10)]
+    pulled = []
+    ahead = 0
+
+    count = 0
+    for count, (_, result) in enumerate(
+        fake_tester.iter_parallel(counting(cases, pulled), max_workers=max_workers, buffer=buffer), 1
+    ):
+        assert result.status == Status.PASSED
+        time.sleep(0.1)
+        ahead = max(ahead, len(pulled) - count)
+        assert len(pulled) - count <= buffer + max_workers
+
+    assert count == len(cases)
+    assert ahead >= 1
+    assert engine_threads() == []
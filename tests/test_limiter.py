@@ -0,0 +1,133 @@
+"""src/limiter.py: AIMD 并发上限"""
+import asyncio
+
+import pytest
+
+from src import limiter as limiter_module
+from src.limiter import AdaptiveLimiter
+
+
+@pytest.fixture(autouse=True)
+def quiet_host(monkeypatch):
+    """测试不受本机负载和内存影响"""
+    monkeypatch.setattr(limiter_module, "_load_per_cpu", lambda: 0.0)
+    monkeypatch.setattr(limiter_module, "_available_memory", lambda: None)
+
+
+async def _round(lim: AdaptiveLimiter, timed_out=False, backlog=False):
+    """跑满一轮 (与当前上限相同数量的用例)，backlog 时整轮都有用例在排队"""
+    n = lim.limit
+    for _ in range(n):
+        await lim.acquire()
+    waiters = [asyncio.ensure_future(lim.acquire()) for _ in range(n + 1 if backlog else 0)]
+    await asyncio.sleep(0)
+    for _ in range(n):
+        lim.observe(timed_out)
+        lim.release()
+    await asyncio.sleep(0)
+    for task in waiters:
+        await task
+        lim.release()
+    # 排队任务的 release 不计入下一轮
+    lim._completed = 0
+
+
+def test_starts_at_ceiling():
+    assert AdaptiveLimiter(2, 8).limit == 8
+    assert AdaptiveLimiter(2, 8, adaptive=False).limit == 8
+    lim = AdaptiveLimiter(10, 4)
+    assert (lim.floor, lim.limit) == (4, 4)
+
+
+def test_backs_off_on_timeouts_and_stays_above_floor():
+    async def main():
+        lim = AdaptiveLimiter(2, 8)
+        await _round(lim, timed_out=True)
+        assert lim.limit == 5
+        assert "超时率" in lim.decisions[-1].reason
+        for _ in range(5):
+            await _round(lim, timed_out=True)
+        assert lim.limit == 2
+        assert lim.peak == 8
+    asyncio.run(main())
+
+
+def test_slow_workload_is_not_overload():
+    """一轮恰好都是慢用例 (阶段耗时是之前的几十倍) 不应降低上限"""
+    async def main():
+        lim = AdaptiveLimiter(1, 4)
+        await lim.acquire()
+        lim.observe()
+        lim.release()
+        for _ in range(3):
+            for _ in range(lim.limit):
+                await lim.acquire()
+            await asyncio.sleep(0.02)   # 比上一轮慢得多，但没有超时
+            for _ in range(lim.limit):
+                lim.observe()
+                lim.release()
+        assert lim.limit == 4
+        assert lim.decisions == []
+    asyncio.run(main())
+
+
+def test_backs_off_on_low_memory(monkeypatch):
+    monkeypatch.setattr(limiter_module, "_available_memory", lambda: 1024)
+
+    async def main():
+        lim = AdaptiveLimiter(1, 4)
+        await _round(lim)
+        assert lim.limit == 2
+    asyncio.run(main())
+
+
+def test_grows_additively_after_backoff_while_cases_wait():
+    async def main():
+        lim = AdaptiveLimiter(2, 8)
+        await _round(lim, timed_out=True)
+        assert lim.limit == 5
+        await _round(lim)
+        assert lim.limit == 5          # 没有排队的用例时不增长
+        await _round(lim, backlog=True)
+        assert lim.limit == 6
+        assert lim.decisions[-1].reason == "加性增长"
+    asyncio.run(main())
+
+
+def test_high_load_pauses_growth(monkeypatch):
+    monkeypatch.setattr(limiter_module, "_load_per_cpu", lambda: 10.0)
+
+    async def main():
+        lim = AdaptiveLimiter(2, 8)
+        await _round(lim, timed_out=True)
+        await _round(lim, backlog=True)
+        assert lim.limit == 5
+    asyncio.run(main())
+
+
+def test_fixed_limit_when_not_adaptive():
+    async def main():
+        lim = AdaptiveLimiter(2, 4, adaptive=False)
+        await _round(lim, timed_out=True)
+        assert lim.limit == 4
+        assert lim.decisions == []
+    asyncio.run(main())
+
+
+def test_waiters_are_served_in_order():
+    async def main():
+        lim = AdaptiveLimiter(1, 1, adaptive=False)
+        await lim.acquire()
+        order = []
+
+        async def worker(i):
+            await lim.acquire()
+            order.append(i)
+            lim.release()
+
+        tasks = [asyncio.ensure_future(worker(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        lim.release()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from src.jvm_service import JvmService
+from src.mars_server import MarsServerPool, STATUS_OK, STATUS_TIMEOUT
+
+
+pytestmark = pytest.mark.skipif(not (shutil.which("java") and shutil.which("javac")), reason="需要 JDK")
+
+MARS_JAR = (Path(__file__).parent.parent / "src" / "Mars.jar").resolve()
+
+# 名称 -> (MIPS 程序, 输入)
+PROGRAMS = {
+    "echo": (
+        ".data\nmsg: .asciiz \"\\n\"\n.text\n"
+        "li $v0, 5\nsyscall\nsll $a0, $v0, 1\nli $v0, 1\nsyscall\n"
+        "la $a0, msg\nli $v0, 4\nsyscall\nli $v0, 10\nsyscall\n",
+        b"21\n",
+    ),
+    "sum_input": (
+        ".text\nli $t1, 0\nli $t2, 3\n"
+        "loop:\nli $v0, 5\nsyscall\naddu $t1, $t1, $v0\naddiu $t2, $t2, -1\nbgtz $t2, loop\n"
+        "move $a0, $t1\nli $v0, 1\nsyscall\nli $a0, 10\nli $v0, 11\nsyscall\nli $v0, 10\nsyscall\n",
+        b"1\n2\n3\n",
+    ),
+    # 运行错误: 输出一部分后访问非法地址
+    "runtime_error": (
+        ".data\nmsg: .asciiz \"before\\n\"\n.text\n"
+        "la $a0, msg\nli $v0, 4\nsyscall\nlw $t0, 1($zero)\nli $v0, 10\nsyscall\n",
+        b"",
+    ),
+    # 汇编错误: 未知指令
+    "assemble_error": (
+        ".text\nli $a0, 1\nli $v0, 1\nsyscall\nfoo $t0, $t1\n",
+        b"",
+    ),
+}
+LOOP_PROGRAM = ".text\nloop:\nj loop\n"
+
+
+@pytest.fixture(scope="module")
+def programs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("mips")
+    paths = {}
+    for name, (source, _) in list(PROGRAMS.items()) + [("loop", (LOOP_PROGRAM, b""))]:
+        paths[name] = directory / f"{name}.txt"
+        paths[name].write_text(source, encoding="utf-8")
+    return paths
+
+
+@pytest.fixture(scope="module")
+def pool(tmp_path_factory):
+    pool = MarsServerPool("java", MARS_JAR, tmp_path_factory.mktemp("work"), "javac")
+    ok, msg = pool.ensure_built()
+    assert ok, msg
+    yield pool
+    pool.close_all()
+
+
+def run_subprocess(path: Path, input_data: bytes) -> str:
+    result = subprocess.run(
+        ["java", "-jar", str(MARS_JAR), "nc", str(path)],
+        input=input_data, capture_output=True, timeout=60
+    )
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+@pytest.mark.parametrize("name", list(PROGRAMS))
+def test_output_matches_subprocess(pool, programs, name):
+    input_data = PROGRAMS[name][1]
+    stdout, status = pool.run(programs[name], input_data, 10)
+    assert status == STATUS_OK
+    assert stdout == run_subprocess(programs[name], input_data)
+
+
+def test_error_output_is_reported(pool, programs):
+    stdout, _ = pool.run(programs["runtime_error"], b"", 10)
+    assert stdout.startswith("before\n")
+    assert "Processing terminated due to errors." in stdout
+    stdout, _ = pool.run(programs["assemble_error"], b"", 10)
+    assert "Processing terminated due to errors." in stdout
+
+
+def test_programs_share_one_jvm(pool, programs):
+    """同一线程的多次运行复用一个 JVM，上一个程序的输入不会影响下一个"""
+    pool.run(programs["echo"], b"1\n", 10)
+    proc = pool.get().proc
+    assert pool.run(programs["sum_input"], b"4\n5\n6\n", 10) == ("15\n", STATUS_OK)
+    assert pool.run(programs["echo"], b"7\n", 10) == ("14\n", STATUS_OK)
+    assert pool.get().proc is proc
+
+
+def test_timeout_restarts_server(pool, programs):
+    pool.run(programs["echo"], b"1\n", 10)
+    proc = pool.get().proc
+
+    start = time.monotonic()
+    assert pool.run(programs["loop"], b"", 1) == (None, STATUS_TIMEOUT)
+    assert time.monotonic() - start < 1 + JvmService.WATCHDOG_GRACE
+    assert proc.poll() is not None
+
+    # 下一次运行自动启动新的 JVM
+    assert pool.run(programs["echo"], b"5\n", 10) == ("10\n", STATUS_OK)
+    assert pool.get().proc is not proc
@@ -0,0 +1,121 @@
+"""src/mips_sim.py: 汇编器与执行器"""
+import pytest
+
+from src.mips_sim import (
+    STACK_INITIAL_BYTES, SimulationCancelled, SimulationError, StepLimitExceeded,
+    UnsupportedProgram, assemble, run, simulate,
+)
+
+
+def test_print_string_int_and_char():
+    source = """
+.data
+msg: .asciiz "sum="
+.text
+main:
+    la $a0, msg
+    li $v0, 4
+    syscall
+    li $t0, 40
+    addiu $t1, $t0, 2
+    move $a0, $t1
+    li $v0, 1
+    syscall
+    li $a0, 10
+    li $v0, 11
+    syscall
+    li $v0, 10
+    syscall
+"""
+    assert simulate(source) == "sum=42\n"
+
+
+def test_read_int_and_branches():
+    source = """
+.text
+main:
+    li $v0, 5
+    syscall
+    move $t0, $v0
+    li $t1, 0
+loop:
+    ble $t0, $zero, done
+    addu $t1, $t1, $t0
+    addiu $t0, $t0, -1
+    j loop
+done:
+    move $a0, $t1
+    li $v0, 1
+    syscall
+    li $v0, 10
+    syscall
+"""
+    assert simulate(source, "10\n") == "55"
+
+
+def test_words_in_data_segment():
+    source = """
+.data
+arr: .word 3, -4, 5
+.text
+    la $t0, arr
+    lw $t1, 4($t0)
+    mul $t1, $t1, $t1
+    sw $t1, 8($t0)
+    lw $a0, arr+8
+    li $v0, 1
+    syscall
+"""
+    assert simulate(source) == "16"
+
+
+def test_deep_stack_grows_beyond_initial_allocation():
+    depth = STACK_INITIAL_BYTES // 4 * 2
+    source = f"""
+.text
+main:
+    li $t0, {depth}
+push:
+    addiu $sp, $sp, -4
+    sw $t0, 0($sp)
+    addiu $t0, $t0, -1
+    bgtz $t0, push
+    lw $a0, 0($sp)
+    li $v0, 1
+    syscall
+    li $v0, 10
+    syscall
+"""
+    assert simulate(source) == "1"
+
+
+def test_unsupported_instruction_falls_back():
+    with pytest.raises(UnsupportedProgram):
+        assemble(".text\n    mul.s $f0, $f1, $f2\n")
+
+
+def test_runtime_errors_fall_back():
+    with pytest.raises(SimulationError):
+        simulate(".text\n    li $t0, 0x7fffffff\n    addi $t0, $t0, 1\n")
+    with pytest.raises(SimulationError):
+        simulate(".text\n    li $v0, 5\n    syscall\n", "")
+    with pytest.raises(SimulationError):
+        simulate(".text\n    li $t0, 0x40\n    lw $t1, 0($t0)\n")
+
+
+def test_step_budget():
+    program = assemble(".text\nloop:\n    j loop\n")
+    with pytest.raises(StepLimitExceeded):
+        run(program, max_steps=1000)
+
+
+def test_cancel_stops_unlimited_run():
+    program = assemble(".text\nloop:\n    j loop\n")
+    calls = []
+
+    def cancelled():
+        calls.append(1)
+        return len(calls) > 2
+
+    with pytest.raises(SimulationCancelled):
+        run(program, max_steps=0, cancelled=cancelled)
@@ -0,0 +1,140 @@
+"""src/results_db.py: 运行记录的写入与查询"""
+import pytest
+
+# 别名避免 pytest 把 Test* 类当作测试收集
+from src.models import TestResult as Result, TestStatus as Status
+from src.results_db import ResultStore, case_location
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ResultStore, "LINGER", 0.01)
+    store = ResultStore(tmp_path / ".tmp" / "results.db", tmp_path)
+    yield store
+    store.close()
+
+
+def _run(store, results, stopped=False):
+    """记录一次运行，results 为 [(用例, 状态, 输出摘要, {阶段: 秒数}), ...]"""
+    run_id = store.begin_run("project", "artifact", len(results))
+    for case, status, digest, phases in results:
+        store.record(run_id, case, Result(status, phases=dict(phases), actual_digest=digest))
+    passed = sum(status == Status.PASSED for _, status, _, _ in results)
+    store.end_run(run_id, passed, len(results) - passed, len(results), stopped)
+    store.close()
+    return run_id
+
+
+def test_case_location(tmp_path):
+    root = str(tmp_path)
+    assert case_location(str(tmp_path / "A" / "lib" / "testfile1.txt"), root) == ("A/lib/testfile1.txt", "A/lib")
+    assert case_location(str(tmp_path / "testfile1.txt"), root) == ("testfile1.txt", "")
+    path, _ = case_location("/elsewhere/testfile1.txt", root)
+    assert path == "/elsewhere/testfile1.txt"
+
+
+def test_empty_store(store):
+    assert store.latest_run() is None
+    assert store.changes() == []
+    assert store.slowest() == []
+    assert store.timeline("cases") == {}
+
+
+def test_changes_against_previous_result(store, make_case):
+    a, b, c, d = (make_case(name) for name in "abcd")
+    first = _run(store, [
+        (a, Status.PASSED, "aaaa", {}),
+        (b, Status.PASSED, "bbbb", {}),
+        (c, Status.FAILED, "cccc", {}),
+    ])
+    assert {change["name"] for change in store.changes(first)} == {"a.sy", "b.sy", "c.sy"}
+    assert all(change["before"] is None and not change["output_changed"] for change in store.changes(first))
+
+    second = _run(store, [
+        (a, Status.PASSED, "aaaa", {}),     # 没有变化
+        (b, Status.FAILED, "bbbb", {}),     # 状态变化
+        (c, Status.FAILED, "cc00", {}),     # 仍失败但输出变化
+        (d, Status.PASSED, "dddd", {}),     # 首次运行
+    ])
+    assert store.latest_run() == second
+    changes = {change["name"]: change for change in store.changes()}
+    assert set(changes) == {"b.sy", "c.sy", "d.sy"}
+    assert (changes["b.sy"]["before"], changes["b.sy"]["after"]) == ("PASSED", "FAILED")
+    assert changes["c.sy"]["output_changed"] and changes["c.sy"]["before"] == "FAILED"
+    assert changes["d.sy"]["before"] is None
+    assert changes["d.sy"]["path"] == "cases/d.sy" and changes["d.sy"]["lib"] == "cases"
+
+
+def test_slowest_by_total_and_phase(store, make_case):
+    a, b, c = (make_case(name) for name in "abc")
+    _run(store, [
+        (a, Status.PASSED, None, {"total": 0.5, "mars": 0.4}),
+        (b, Status.PASSED, None, {"total": 2.0, "mars": 0.1}),
+        (c, Status.SKIPPED, None, {}),
+    ])
+    assert store.slowest() == [("cases/b.sy", 2000.0), ("cases/a.sy", 500.0)]
+    assert store.slowest(limit=1) == [("cases/b.sy", 2000.0)]
+    assert store.slowest(phase="mars") == [("cases/a.sy", 400.0), ("cases/b.sy", 100.0)]
+    assert store.slowest(phase="compile") == []
+
+
+def test_timeline_and_pruning(store, make_case, monkeypatch):
+    monkeypatch.setattr(ResultStore, "KEEP_RUNS", 2)
+    a, b = make_case("a"), make_case("b")
+    runs = [
+        _run(store, [(a, Status.FAILED, None, {})]),
+        _run(store, [(a, Status.PASSED, None, {}), (b, Status.PASSED, None, {})]),
+        _run(store, [(a, Status.SKIPPED, None, {}), (b, Status.TIMEOUT, None, {})]),
+    ]
+    timeline = store.timeline("cases")
+    assert timeline == {
+        "a.sy": [(runs[1], "PASSED"), (runs[2], "SKIPPED")],
+        "b.sy": [(runs[1], "PASSED"), (runs[2], "TIMEOUT")],
+    }
+    assert store.timeline("cases", runs=1) == {"a.sy": [(runs[2], "SKIPPED")], "b.sy": [(runs[2], "TIMEOUT")]}
+    assert store.timeline("other") == {}
+
+
+def test_failed_cases_selects_last_decisive_failures(store, make_case):
+    cases = [make_case(name) for name in ("passed", "failed", "compile", "runtime", "timeout", "skipped", "new")]
+    assert store.failed_cases(cases) == []
+    _run(store, [
+        (cases[0], Status.PASSED, None, {}),
+        (cases[1], Status.FAILED, None, {}),
+        (cases[2], Status.COMPILE_ERROR, None, {}),
+        (cases[3], Status.RUNTIME_ERROR, None, {}),
+        (cases[4], Status.TIMEOUT, None, {}),
+        (cases[5], Status.SKIPPED, None, {}),
+    ])
+    selected = store.failed_cases(list(reversed(cases)))
+    assert [case.name for case in selected] == ["timeout", "runtime", "compile", "failed"]
+
+
+def test_skipped_run_keeps_previous_failure(store, make_case):
+    flaky, fixed = make_case("flaky"), make_case("fixed")
+    _run(store, [(flaky, Status.FAILED, None, {}), (fixed, Status.FAILED, None, {})])
+    # --fail-fast / 取消跳过的用例仍要被 --lf 选中
+    _run(store, [(flaky, Status.SKIPPED, None, {}), (fixed, Status.PASSED, None, {})], stopped=True)
+    assert store.failed_cases([flaky, fixed]) == [flaky]
+
+    run_id = _run(store, [(flaky, Status.PASSED, None, {})])
+    assert store.failed_cases([flaky, fixed]) == []
+    assert [(change["before"], change["after"]) for change in store.changes(run_id)] == [("FAILED", "PASSED")]
+
+
+def test_missing_digest_is_not_an_output_change(store, make_case):
+    compile_error, no_digest, changed = make_case("compile_error"), make_case("no_digest"), make_case("changed")
+    _run(store, [
+        (compile_error, Status.COMPILE_ERROR, None, {}),
+        (no_digest, Status.PASSED, "aaaa", {}),
+        (changed, Status.FAILED, "bbbb", {}),
+    ])
+    run_id = _run(store, [
+        (compile_error, Status.FAILED, "cccc", {}),   # 状态变化，之前没有输出
+        (no_digest, Status.PASSED, None, {}),         # 状态未变，这次没有摘要
+        (changed, Status.FAILED, "dddd", {}),
+    ])
+    changes = {change["name"]: change for change in store.changes(run_id)}
+    assert set(changes) == {"compile_error.sy", "changed.sy"}
+    assert not changes["compile_error.sy"]["output_changed"]
+    assert changes["changed.sy"]["output_changed"]
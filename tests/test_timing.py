@@ -0,0 +1,62 @@
+"""src/timing.py: 阶段计时与汇总"""
+import pytest
+
+from src.timing import PhaseClock, PhaseStats, _percentile
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 11)]
+    assert _percentile(values, 50) == 5.0
+    assert _percentile(values, 90) == 9.0
+    assert _percentile(values, 99) == 10.0
+    assert _percentile([3.0], 50) == 3.0
+    assert _percentile([], 90) == 0.0
+
+
+def test_clock_records_phases_even_on_error():
+    clock = PhaseClock()
+    with clock.phase("compile"):
+        pass
+    with pytest.raises(RuntimeError):
+        with clock.phase("mars"):
+            raise RuntimeError
+    durations = clock.durations()
+    assert set(durations) == {"compile", "mars", "total"}
+    start, end = clock.spans["mars"]
+    assert 0 <= start <= end
+    assert durations["total"] >= durations["compile"] + durations["mars"]
+
+
+def test_summary_and_slowest():
+    stats = PhaseStats()
+    assert not stats
+    assert stats.format_lines() == []
+    for i in range(1, 101):
+        stats.add(f"case{i}", {"compile": i / 100, "total": i / 10})
+    stats.add("cached", {"total": 0.0})
+    assert stats
+    info = stats.summary("compile")
+    assert info["count"] == 100
+    assert info["total"] == pytest.approx(50.5)
+    assert (info["p50"], info["p90"], info["p99"], info["max"]) == (0.5, 0.9, 0.99, 1.0)
+    assert info["slowest"] == [("case100", 1.0), ("case99", 0.99), ("case98", 0.98)]
+    assert stats.summary("total")["count"] == 101
+    assert stats.summary("mars") == {"count": 0, "total": 0, "p50": 0.0, "p90": 0.0, "p99": 0.0,
+                                     "max": 0.0, "slowest": []}
+
+
+def test_phases_follow_label_order():
+    stats = PhaseStats()
+    stats.add("a", {"total": 1.0, "custom": 0.1, "compare": 0.1, "compile": 0.5})
+    assert stats.phases() == ["compile", "compare", "total", "custom"]
+    lines = stats.format_lines()
+    assert lines[1].startswith("  编译: 1 次")
+    assert any(line.startswith("  custom:") for line in lines)
+    assert "    最慢: a 0.500s" in lines
+
+
+def test_slowest_ties_keep_first_seen():
+    stats = PhaseStats()
+    for name in ("a", "b", "c", "d"):
+        stats.add(name, {"mars": 1.0})
+    assert [name for name, _ in stats.summary("mars")["slowest"]] == ["c", "b", "a"]
@@ -0,0 +1,47 @@
+"""src/workspace.py: 工作目录租约"""
+import threading
+import time
+
+from src.workspace import WorkspacePool
+
+
+def test_lease_reuses_and_scrubs_directories(tmp_path):
+    pool = WorkspacePool(tmp_path, "w_")
+    with pool.lease() as first:
+        assert first == tmp_path / "w_0" and first.is_dir()
+        (first / "mips.txt").write_text("x")
+        (first / "sub").mkdir()
+        (first / "sub" / "f").write_text("y")
+        with pool.lease() as second:
+            assert second == tmp_path / "w_1"
+    with pool.lease() as again:
+        assert again == first
+        assert list(again.iterdir()) == []
+    assert pool.stats()[0] == 3 and pool.stats()[2] == 2
+
+
+def test_capacity_blocks_until_release(tmp_path):
+    pool = WorkspacePool(tmp_path, capacity=1)
+    held = pool.acquire()
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    thread.start()
+    time.sleep(0.05)
+    assert acquired == []
+    pool.release(held)
+    thread.join(5)
+    assert acquired == [held]
+    assert pool.stats()[2] == 1
+    assert pool.stats()[1] > 0
+
+
+def test_resize_wakes_waiters(tmp_path):
+    pool = WorkspacePool(tmp_path, capacity=1)
+    pool.acquire()
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    thread.start()
+    time.sleep(0.05)
+    pool.resize(2)
+    thread.join(5)
+    assert acquired == [tmp_path / "worker_1"]